@@ -1,13 +1,22 @@
+import os
 import re
 import sys
 import json
 import time
+import fcntl
 import argparse
 import logging
-import requests
-from requests.auth import HTTPBasicAuth
+import threading
+import http_budget
 
 retry_time_in_seconds = 10
+# after a notification the queue is re-checked once more this soon, in case
+# the builds API has not caught up with the completed build yet
+notification_recheck_seconds = 2
+# exit status of a run that --supersede exit ended early
+SUPERSEDED_EXIT_CODE = 3
+# build statuses of runs that are queued or running
+WAITING_STATUSES = ("inProgress", "notStarted")
 
 parser = argparse.ArgumentParser(description="Prevent parallel ADO Pipeline run")
 
@@ -33,6 +42,39 @@ parser.add_argument(
 parser.add_argument(
     "--buildid", type=int, help="Current ADO run build id", required=True
 )
+parser.add_argument(
+    "--baseurl",
+    type=str,
+    help="ADO base URL (default: https://dev.azure.com)",
+    default="https://dev.azure.com",
+)
+parser.add_argument(
+    "--metricsfile",
+    type=str,
+    help="Merge polling and API metrics of this run into an OpenMetrics text file at exit",
+    default=os.getenv("ADO_BUILD_CHECK_METRICS_FILE"),
+)
+parser.add_argument(
+    "--notifyport",
+    type=int,
+    help="Listen on 127.0.0.1:PORT for build-completed notifications (e.g. relayed ADO service hooks) "
+         "and re-check the queue as soon as one arrives, polling only every --safetypoll seconds",
+    default=int(os.getenv("ADO_BUILD_CHECK_NOTIFY_PORT")) if os.getenv("ADO_BUILD_CHECK_NOTIFY_PORT") else None,
+)
+parser.add_argument(
+    "--safetypoll",
+    type=float,
+    help="Seconds between polls while waiting for notifications (default: 60)",
+    default=60,
+)
+parser.add_argument(
+    "--supersede",
+    choices=("off", "exit", "cancel"),
+    help="While waiting behind runs for the same source branch: 'exit' ends this run with exit status "
+         f"{SUPERSEDED_EXIT_CODE} once a newer run is queued, 'cancel' cancels the older runs still waiting "
+         "(default: off)",
+    default=os.getenv("ADO_BUILD_CHECK_SUPERSEDE", "off"),
+)
 parser.add_argument(
     "-d",
     "--debug",
@@ -59,8 +101,9 @@ pat = args.pat
 buildid = args.buildid
 pipelineid = args.pipelineid
 
+ado_build_url = f"{args.baseurl.rstrip('/')}/{organization}/{project}/_apis/build/builds"
 ado_definition_url = (
-    "https://dev.azure.com/"
+    f"{args.baseurl.rstrip('/')}/"
     + f"{organization}/"
     + f"{project}"
     + "/_apis/build/builds?api-version=5.1&definitions="
@@ -68,6 +111,211 @@ ado_definition_url = (
 )
 
 
+class BuildCheckMetrics:
+    """
+    Counters and histograms of one run, labelled with the pipeline definition.
+
+    write() merges them into an OpenMetrics text file: counters and histograms
+    are added to the values already in the file, so it accumulates polls,
+    latency and waiting time per definition across runs on the agent.
+    """
+
+    # family -> (type, help, extra label, histogram buckets)
+    FAMILIES = {
+        "ado_build_check_polls": ("counter", "Polls of the builds API", None, None),
+        "ado_build_check_api_responses": ("counter", "Builds API responses by HTTP status", "status", None),
+        "ado_build_check_api_request_duration_seconds": (
+            "histogram", "Builds API request latency", None, (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)),
+        "ado_build_check_queue_depth": (
+            "histogram", "In-progress builds queued ahead of this build, per poll", None, (0, 1, 2, 3, 5, 10, 20)),
+        "ado_build_check_wait_seconds": ("counter", "Time spent waiting for other builds", None, None),
+        "ado_build_check_wakeups": ("counter", "Queue re-checks by what triggered them", "reason", None),
+        "ado_build_check_cancelled_builds": ("counter", "Older runs for the same branch cancelled", None, None),
+        "ado_build_check_runs": ("counter", "Runs by result", "result", None),
+    }
+
+    def __init__(self, organization, project, definition):
+        self.labels = f'organization="{organization}",project="{project}",definition="{definition}"'
+        self.samples = {}
+
+    def _add(self, sample, labels, value):
+        key = (sample, labels)
+        self.samples[key] = self.samples.get(key, 0) + value
+
+    def inc(self, family, value=1, label=None):
+        extra = self.FAMILIES[family][2]
+        labels = self.labels + (f',{extra}="{label}"' if extra else "")
+        self._add(f"{family}_total", labels, value)
+
+    def observe(self, family, value):
+        for bound in self.FAMILIES[family][3]:
+            self._add(f"{family}_bucket", f'{self.labels},le="{float(bound)}"', int(value <= bound))
+        self._add(f"{family}_bucket", f'{self.labels},le="+Inf"', 1)
+        self._add(f"{family}_count", self.labels, 1)
+        self._add(f"{family}_sum", self.labels, value)
+
+    @staticmethod
+    def parse(text):
+        """{(sample name, labels): value} of an OpenMetrics text file written by write()."""
+        samples = {}
+        for line in text.splitlines():
+            match = re.match(r"^([a-z_]+)\{(.*)\} (\S+)$", line)
+            if match:
+                samples[(match.group(1), match.group(2))] = float(match.group(3))
+        return samples
+
+    SUFFIX_ORDER = {"total": 0, "bucket": 0, "count": 1, "sum": 2}
+
+    @classmethod
+    def _sort_key(cls, key):
+        # samples of one label set together: buckets in increasing le order, then _count and _sum
+        sample, labels = key
+        match = re.search(r',le="([^"]+)"$', labels)
+        if match:
+            return labels[:match.start()], 0, float(match.group(1))
+        return labels, cls.SUFFIX_ORDER[sample.rsplit("_", 1)[1]], 0.0
+
+    def render(self, samples):
+        lines = []
+        for family, (metric_type, help_text, _, _) in self.FAMILIES.items():
+            lines.append(f"# TYPE {family} {metric_type}")
+            lines.append(f"# HELP {family} {help_text}")
+            if family.endswith("_seconds"):
+                lines.append(f"# UNIT {family} seconds")
+            for key in sorted((k for k in samples if k[0].rsplit("_", 1)[0] == family), key=self._sort_key):
+                value = samples[key]
+                lines.append(f"{key[0]}{{{key[1]}}} {int(value) if value == int(value) else repr(value)}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Merge this run into path under an exclusive lock, so concurrent runs do not lose counts."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(f"{path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(path, "r") as f:
+                    samples = self.parse(f.read())
+            except OSError:
+                samples = {}
+            for key, value in self.samples.items():
+                samples[key] = samples.get(key, 0) + value
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(self.render(samples))
+            os.replace(tmp_path, path)
+
+
+class NotificationListener:
+    """
+    Local HTTP endpoint for build-completed notifications.
+
+    Any POST wakes the waiting checker, except ADO service hook payloads for
+    other events or other pipeline definitions: build.complete
+    (resource.definition.id) and ms.vss-pipelines.run-state-changed-event
+    (resource.pipeline.id) are recognised.
+    """
+
+    COMPLETION_EVENTS = ("build.complete", "ms.vss-pipelines.run-state-changed-event")
+
+    def __init__(self, port, definition):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.definition = str(definition)
+        self.event = threading.Event()
+        listener = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                relevant = listener.is_relevant(self.rfile.read(length))
+                self.send_response(202 if relevant else 204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                if relevant:
+                    listener.event.set()
+
+            def log_message(self, format, *args):
+                logger.debug(f"Notification endpoint: {format % args}")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def is_relevant(self, body):
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return True
+        if not isinstance(payload, dict) or "eventType" not in payload:
+            return True
+        if payload["eventType"] not in self.COMPLETION_EVENTS:
+            return False
+        resource = payload.get("resource") or {}
+        definition = (resource.get("definition") or resource.get("pipeline") or {}).get("id")
+        return definition is None or str(definition) == self.definition
+
+    def wait(self, timeout):
+        """Wait for a notification; returns False if timeout passed without one."""
+        notified = self.event.wait(timeout)
+        self.event.clear()
+        return notified
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# Set when --metricsfile is given
+metrics = BuildCheckMetrics(organization, project, pipelineid) if args.metricsfile else None
+# Returned by get_builds when --supersede exit finds a newer run for the same branch
+SUPERSEDED = object()
+# Builds already cancelled by --supersede cancel
+cancelled_builds = set()
+
+
+def same_branch_builds(builds, buildid):
+    """Queued or running builds for the source branch of buildid, other than buildid itself."""
+    branch = next((build.get("sourceBranch") for build in builds if build["id"] == buildid), None)
+    if branch is None:
+        return []
+    return [
+        build for build in builds
+        if build["id"] != buildid and build.get("sourceBranch") == branch and build["status"] in WAITING_STATUSES
+    ]
+
+
+def cancel_builds(build_ids):
+    """
+    Ask ADO to cancel builds; failures are logged and the run keeps waiting
+    for them, asking again on the next check.
+    """
+    import requests
+
+    for build_id in build_ids:
+        try:
+            response = http_budget.request(
+                "PATCH",
+                f"{ado_build_url}/{build_id}?api-version=5.1",
+                headers={'Authorization': 'Bearer ' + pat, 'Content-Type': 'application/json'},
+                json={"status": "cancelling"},
+            )
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Unable to cancel build id {build_id}: {e}")
+            continue
+        if response.ok:
+            cancelled_builds.add(build_id)
+            logger.info(f"Cancelled build id {build_id}, superseded by build id {buildid}.")
+            if metrics is not None:
+                metrics.inc("ado_build_check_cancelled_builds")
+        else:
+            logger.warning(f"Unable to cancel build id {build_id}: {response.status_code} {response.text}")
+
+
 def get_builds(buildid, ado_definition_url):
     """
     This function takes a build ID and an ADO Definition URL and returns a list of builds
@@ -95,7 +343,16 @@ def get_builds(buildid, ado_definition_url):
     """
     
     try:
-        builds = requests.get(ado_definition_url, headers={'Authorization': 'Bearer ' + pat, 'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        try:
+            builds = http_budget.get(ado_definition_url, headers={'Authorization': 'Bearer ' + pat, 'Content-Type': 'application/json'})
+        except Exception:
+            if metrics is not None:
+                metrics.inc("ado_build_check_api_responses", label="error")
+            raise
+        if metrics is not None:
+            metrics.observe("ado_build_check_api_request_duration_seconds", time.perf_counter() - start)
+            metrics.inc("ado_build_check_api_responses", label=builds.status_code)
         if builds:
             builds = builds.json()
             logger.info(f"Provided builds.json is : {builds}")
@@ -109,10 +366,25 @@ def get_builds(buildid, ado_definition_url):
                 build_ids_in_progress = [
                     build["id"] for build in builds if "inProgress" in build["status"]
                 ]
+                if metrics is not None:
+                    metrics.observe("ado_build_check_queue_depth", sum(1 for i in build_ids_in_progress if i < buildid))
                 if min(build_ids_in_progress) == buildid:
                     logger.info(f"Build id {buildid} is next in queue. Exiting...")
                     return
 
+                if args.supersede == "exit":
+                    newer = [build["id"] for build in same_branch_builds(builds, buildid) if build["id"] > buildid]
+                    if newer:
+                        logger.info(f"Build id {max(newer)} is queued for the same branch, build id {buildid} is superseded. Exiting...")
+                        return SUPERSEDED
+                elif args.supersede == "cancel":
+                    # the oldest build in progress has passed this check and is never cancelled
+                    running = min(build_ids_in_progress)
+                    cancel_builds([
+                        build["id"] for build in same_branch_builds(builds, buildid)
+                        if build["id"] < buildid and build["id"] != running and build["id"] not in cancelled_builds
+                    ])
+
                 return [
                     {
                         "id": build["id"],
@@ -166,21 +438,60 @@ def main():
       None
     """
 
-    while True:
-        builds_in_progress = get_builds(buildid, ado_definition_url)
-        if isinstance(builds_in_progress, list):
-            if len(builds_in_progress) > 0:
-                logger.info(
-                    f"There is currently {len(builds_in_progress)} builds in progress..."
-                )
-                logger.info(json.dumps(builds_in_progress, indent=4))
-                logger.info(f"Re-trying in {retry_time_in_seconds} seconds...")
-                time.sleep(retry_time_in_seconds)
+    result = "error"
+    listener = None
+    if args.notifyport is not None:
+        listener = NotificationListener(args.notifyport, pipelineid)
+        logger.info(f"Listening for build-completed notifications on 127.0.0.1:{listener.port}")
+    timeout = args.safetypoll
+    try:
+        while True:
+            if metrics is not None:
+                metrics.inc("ado_build_check_polls")
+            builds_in_progress = get_builds(buildid, ado_definition_url)
+            if builds_in_progress is SUPERSEDED:
+                break
+            if isinstance(builds_in_progress, list):
+                if len(builds_in_progress) > 0:
+                    logger.info(
+                        f"There is currently {len(builds_in_progress)} builds in progress..."
+                    )
+                    logger.info(json.dumps(builds_in_progress, indent=4))
+                    start = time.perf_counter()
+                    if listener is None:
+                        logger.info(f"Re-trying in {retry_time_in_seconds} seconds...")
+                        time.sleep(retry_time_in_seconds)
+                        reason = "poll"
+                    else:
+                        logger.info(f"Waiting for a build-completed notification, re-trying in {timeout:g} seconds at the latest...")
+                        if listener.wait(timeout):
+                            reason = "notification"
+                        else:
+                            reason = "recheck" if timeout == notification_recheck_seconds else "poll"
+                        timeout = notification_recheck_seconds if reason == "notification" else args.safetypoll
+                    if metrics is not None:
+                        metrics.inc("ado_build_check_wait_seconds", time.perf_counter() - start)
+                        metrics.inc("ado_build_check_wakeups", label=reason)
+                else:
+                    logger.info("There are no other builds in progress...")
+                    break
             else:
-                logger.info("There are no other builds in progress...")
                 break
+        if builds_in_progress is SUPERSEDED:
+            result = "superseded"
         else:
-            break
+            result = "not_found" if builds_in_progress is False else "proceeded"
+    finally:
+        if listener is not None:
+            listener.close()
+        if metrics is not None:
+            metrics.inc("ado_build_check_runs", label=result)
+            try:
+                metrics.write(args.metricsfile)
+            except OSError as e:
+                logger.warning(f"Unable to write metrics to {args.metricsfile}: {e}")
+    if result == "superseded":
+        raise SystemExit(SUPERSEDED_EXIT_CODE)
 
 
 if __name__ == "__main__":
@@ -5,15 +5,22 @@ import re
 import sys
 import datetime
 import json
-import yaml
 import logging
 import argparse
-import requests
 import subprocess
-import fnmatch
-from packaging import version
+import threading
+import time
+import contextlib
+import resource
+import signal
+import functools
+import concurrent.futures
 from json.decoder import JSONDecodeError
 
+# yaml, requests (with http_budget) and packaging are imported where they are
+# used: together they cost more interpreter startup than the rest of the
+# script, and runs without Slack work never need requests.
+
 # Global variable used to exit with error at the end of all checks.
 # To be updated from default value by logging function.
 errors_detected = False
@@ -35,6 +42,71 @@ parser.add_argument(
     dest="filepath",
     required=True,
 )
+parser.add_argument(
+    "-t",
+    "--trace",
+    help="Write per-phase timings as a Chrome trace-event JSON file and log a summary table",
+    dest="trace_file",
+    default=os.getenv("NAGGER_TRACE_FILE"),
+)
+parser.add_argument(
+    "-w",
+    "--workers",
+    help="Number of components analysed in parallel",
+    dest="workers",
+    type=int,
+    default=int(os.getenv("NAGGER_WORKERS", "1")),
+)
+parser.add_argument(
+    "--component-timeout",
+    help="Seconds allowed per component before it is recorded as timed out",
+    dest="component_timeout",
+    type=float,
+    default=float(os.getenv("NAGGER_COMPONENT_TIMEOUT", "600")),
+)
+parser.add_argument(
+    "--time-budget",
+    help="Overall seconds allowed for the nagger; components not finished in time are recorded as timed out",
+    dest="time_budget",
+    type=float,
+    default=float(os.getenv("NAGGER_TIME_BUDGET")) if os.getenv("NAGGER_TIME_BUDGET") else None,
+)
+parser.add_argument(
+    "--discovery-depth",
+    help="How many directory levels below the working directory are searched for components "
+         "(directories containing *.tf files); components are not searched further",
+    dest="discovery_depth",
+    type=int,
+    default=int(os.getenv("NAGGER_DISCOVERY_DEPTH", "1")),
+)
+parser.add_argument(
+    "--repos",
+    help="Batch mode: analyse these local repository checkouts in one run instead of "
+         "$SYSTEM_DEFAULT_WORKING_DIRECTORY/$BUILD_REPO_SUFFIX, writing one report per repository",
+    dest="repos",
+    nargs="+",
+    default=[],
+)
+parser.add_argument(
+    "--repos-file",
+    help="Batch mode: file listing repository checkouts to analyse, one path per line",
+    dest="repos_file",
+    default=os.getenv("NAGGER_REPOS_FILE"),
+)
+parser.add_argument(
+    "--report-dir",
+    help="Batch mode: directory the per-repository JSON reports are written to",
+    dest="report_dir",
+    default=os.getenv("NAGGER_REPORT_DIR", "nagger-reports"),
+)
+parser.add_argument(
+    "--plugin-cache-dir",
+    help="Batch mode: terraform provider plugin cache shared by every component, with one subdirectory "
+         "per worker when --workers > 1 "
+         "(default: $TF_PLUGIN_CACHE_DIR, else plugin-cache in the nagger cache directory)",
+    dest="plugin_cache_dir",
+    default=os.getenv("TF_PLUGIN_CACHE_DIR"),
+)
 args = parser.parse_args()
 
 logging.basicConfig(
@@ -52,50 +124,254 @@ semver_regex = (
     "(?:\\.[0-9A-Za-z-]|[1-9A-Za-z-][0-9A-Za-z-]*)*))?"
     "(?:\\+(?P<meta>[0-9A-Za-z-]+(?:\\.[0-9A-Za-z-]+)*))?\\s*$"
 )
+# "terraform version" output of terraform < 0.13
+legacy_terraform_regex = f"^([Tt]erraform(\\s))(?P<semver>{semver_regex})"
+# tfswitch output naming the terraform version it installed
+switched_terraform_regex = '[Ss]witched\\sterraform\\sto\\sversion\\s"v?(?P<semver>\\d+\\.\\d+\\.\\d+[^"\\s]*)"'
+
+# GitHub -> Slack user mappings, cached on disk and revalidated with ETag.
+# The cache directory also holds historical component durations.
+slack_mappings_url = os.getenv(
+    "GITHUB_SLACK_MAPPINGS_URL",
+    "https://raw.githubusercontent.com/hmcts/github-slack-user-mappings/master/slack.json",
+)
+nagger_cache_dir = os.getenv(
+    "NAGGER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "cnp-nagger")
+)
+slack_mappings_timeout = 10
+
+
+class PhaseTracer:
+    """
+    Records wall and CPU time of nagger phases (subprocesses, YAML loading,
+    HTTP calls) and exports them as Chrome trace events.
+
+    Phases nest: a phase started while a "component" phase is open is
+    attributed to that component in the summary table.
 
+    CPU time is that of the thread running the phase. CPU used by
+    subprocesses (terraform, tfswitch) can only be read for the whole
+    process, so it is recorded per phase only when one worker runs at a
+    time (per_phase_child_cpu) and otherwise for the whole run alone.
+    """
 
-def run_tf_init(command, working_directory):
-    os.chdir(working_directory)
-    output = subprocess.run(command, capture_output=True)
-    return output.stdout.decode("utf-8"), output.stderr.decode("utf-8")
+    def __init__(self, per_phase_child_cpu=True):
+        self.events = []
+        self.per_phase_child_cpu = per_phase_child_cpu
+        self._origin = time.perf_counter()
+        self._start_child_cpu = self._child_cpu_time()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name, component=None):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        if component is None and stack:
+            component = stack[-1]
+        stack.append(component)
+        start_cpu = time.thread_time()
+        start_child_cpu = self._child_cpu_time() if self.per_phase_child_cpu else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.thread_time() - start_cpu
+            stack.pop()
+            event = {
+                "name": name,
+                "cat": "nagger",
+                "ph": "X",
+                "ts": round((start - self._origin) * 1e6),
+                "dur": round(wall * 1e6),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {
+                    "component": component,
+                    "cpu_ms": round(cpu * 1000, 3),
+                },
+            }
+            if start_child_cpu is not None:
+                event["args"]["child_cpu_ms"] = round((self._child_cpu_time() - start_child_cpu) * 1000, 3)
+            with self._lock:
+                self.events.append(event)
+
+    @staticmethod
+    def _child_cpu_time():
+        # CPU used by terminated subprocesses (terraform, tfswitch)
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    def run_child_cpu_ms(self):
+        """CPU used by subprocesses since the tracer was created."""
+        return round((self._child_cpu_time() - self._start_child_cpu) * 1000, 3)
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms",
+                       "otherData": {"child_cpu_ms": self.run_child_cpu_ms()}}, f)
+
+    def summary_rows(self):
+        """Aggregate events by phase name and by (component, phase)."""
+        by_phase = {}
+        by_component = {}
+        for event in self.events:
+            name = event["name"]
+            component = event["args"]["component"]
+            targets = [by_phase.setdefault(name, [0, 0.0, 0.0, 0.0])]
+            if component is not None:
+                targets.append(by_component.setdefault((component, name), [0, 0.0, 0.0, 0.0]))
+            for entry in targets:
+                entry[0] += 1
+                entry[1] += event["dur"] / 1000
+                entry[2] += event["args"]["cpu_ms"]
+                entry[3] += event["args"].get("child_cpu_ms", 0.0)
+        return by_phase, by_component
+
+    def log_summary(self):
+        by_phase, by_component = self.summary_rows()
+        child_column = self.per_phase_child_cpu
+
+        def row(label, calls, wall, cpu, child_cpu):
+            line = f"{label:<40} {calls:>5} {wall:>10.1f} {cpu:>10.1f}"
+            return f"{line} {child_cpu:>12.1f}" if child_column else line
+
+        header = f"{'phase':<40} {'calls':>5} {'wall ms':>10} {'cpu ms':>10}"
+        if child_column:
+            header += f" {'child cpu ms':>12}"
+        lines = ["Nagger timings by phase:", header]
+        for name, totals in sorted(by_phase.items(), key=lambda i: -i[1][1]):
+            lines.append(row(name, *totals))
+        lines.extend(["Nagger timings by component:", header])
+        for (component, name), totals in sorted(by_component.items()):
+            lines.append(row(f"{component}: {name}", *totals))
+        lines.append(f"Subprocess CPU for the whole run: {self.run_child_cpu_ms():.1f} ms")
+        logger.info("\n".join(lines))
+
+
+# Set in main() when --trace is given. When tracing is disabled every
+# timed_phase() call returns the same no-op context manager.
+tracer = None
+_untraced_phase = contextlib.nullcontext()
+
+
+def timed_phase(name, component=None):
+    if tracer is None:
+        return _untraced_phase
+    return tracer.phase(name, component)
+
+
+def command_phase_name(command):
+    """Phase name for a command, e.g. "terraform init" or "tfswitch"."""
+    if len(command) > 1 and not command[1].startswith("-"):
+        return f"{command[0]} {command[1]}"
+    return command[0]
+
+
+class ComponentTimeout(Exception):
+    """Raised when a component is still running at its deadline."""
+
+
+def command_timeout(deadline, limit=None):
+    """
+    Seconds a command may run before `deadline` (a time.monotonic() value),
+    capped at `limit`. Raises ComponentTimeout if the deadline has passed.
+    """
+    if deadline is None:
+        return limit
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise ComponentTimeout()
+    return remaining if limit is None else min(limit, remaining)
 
 
-def run_command(command, working_directory, is_tf_switch=False):
+def terminate_process_group(process, grace_period=5):
+    """Terminate a process and anything it started, escalating to SIGKILL."""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            pass
+        try:
+            process.communicate(timeout=grace_period)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+
+# Subprocesses started by the current worker thread, reported per component.
+subprocess_counter = threading.local()
+
+
+def run_process(command, working_directory, timeout=None, env=None):
+    """
+    Run a command in its own process group and return (stdout, stderr).
+    `env` replaces the environment of the command when given.
+    On timeout the whole group is terminated (terraform init leaves provider
+    plugin processes behind otherwise) and subprocess.TimeoutExpired is raised.
+    """
+    subprocess_counter.value = getattr(subprocess_counter, "value", 0) + 1
+    process = subprocess.Popen(
+        command,
+        cwd=working_directory,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+        env=env,
+    )
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        terminate_process_group(process)
+        raise
+    return stdout.decode("utf-8"), stderr.decode("utf-8")
+
+
+def run_tf_init(command, working_directory, deadline=None, env=None):
+    with timed_phase(command_phase_name(command)):
+        try:
+            return run_process(command, working_directory, command_timeout(deadline), env)
+        except subprocess.TimeoutExpired:
+            raise ComponentTimeout()
+
+
+def run_command(command, working_directory, is_tf_switch=False, deadline=None):
     """Run a command and return the output.
     Args:
         command (list): A list of command arguments.
+        working_directory (str): Directory to run the command in.
+        is_tf_switch (bool): Limit the command to 15 seconds and fall back to
+            the latest stable terraform if tfswitch hangs.
+        deadline (float): Optional time.monotonic() deadline for the command.
     Returns:
-        dict: The output of the command.
+        str: The output of the command; for tfswitch, stdout and stderr.
     Raises:
-        subprocess.CalledProcessError: If the command returns a non-zero exit code.
+        ComponentTimeout: If the command is still running at the deadline.
         Exception: If any other error occurs.
-    Note:
-        This function will attempt to run the command using the `capture_output`
-        parameter, which is only available in Python 3.7 or later. If this fails,
-        it will fall back to using the `stdout` and `stderr` parameters instead.
-
     """
-    os.chdir(working_directory)
-    try:
-        if is_tf_switch:
-            run_command = subprocess.run(command, capture_output=True, timeout=15)
-        else:
-            run_command = subprocess.run(command, capture_output=True)
-        return run_command.stdout.decode("utf-8")
-    except subprocess.TimeoutExpired:
-        # get latest stable version if tfswitch hangs
-        command = ["tfswitch", "--latest"]
-        run_command = subprocess.run(command, capture_output=True, timeout=15)
-        return run_command.stdout.decode("utf-8")
-    except TypeError:
-        run_command = subprocess.run(
-            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
-        return run_command.stdout.decode("utf-8")
-    except subprocess.CalledProcessError as e:
-        raise subprocess.CalledProcessError(e.returncode, e.cmd, e.output, e.stderr)
-    except Exception as e:
-        raise Exception(f"An error occurred: {e}")
+    with timed_phase(command_phase_name(command)):
+        try:
+            try:
+                timeout = command_timeout(deadline, 15 if is_tf_switch else None)
+                if is_tf_switch:
+                    # newer tfswitch releases log to stderr
+                    return "".join(run_process(command, working_directory, timeout))
+                return run_process(command, working_directory, timeout)[0]
+            except subprocess.TimeoutExpired:
+                if not is_tf_switch:
+                    raise ComponentTimeout()
+                # get latest stable version if tfswitch hangs
+                command = ["tfswitch", "--latest", *command[1:]]
+                timeout = command_timeout(deadline, 15)
+                return "".join(run_process(command, working_directory, timeout))
+        except subprocess.TimeoutExpired:
+            raise ComponentTimeout()
+        except ComponentTimeout:
+            raise
+        except Exception as e:
+            raise Exception(f"An error occurred: {e}")
 
 
 def load_file(filename, repo_url=None):
@@ -111,6 +387,8 @@ def load_file(filename, repo_url=None):
     Raises:
         FileNotFoundError: If the specified file does not exist.
     """
+    import yaml
+
     # Get the path of the script
     script_dir = os.path.dirname(os.path.abspath(__file__))
     # Construct the path to the file
@@ -119,27 +397,16 @@ def load_file(filename, repo_url=None):
 
     try:
         # Open and parse the file
-        with open(file_path, "r") as f:
+        with timed_phase("load_file"), open(file_path, "r") as f:
             contents = yaml.safe_load(f)
         
         # If no repo_url is provided, return the raw contents
         if not repo_url:
             return contents
 
-        # Normalize repo_url to lowercase for comparison
-        normalized_repo_url = repo_url.strip().lower()
-
         # Process exceptions for the given repo_url
-        processed_contents = yaml.safe_load(yaml.dump(contents))
-        for category, dependencies in processed_contents.items():
-            for dependency, details in dependencies.items():
-                exceptions = details.get("exceptions", [])
-                for exception in exceptions:
-                    normalized_exception_repo = exception.get("repo").strip().lower()
-                    if normalized_repo_url == normalized_exception_repo:
-                        details["date_deadline"] = exception.get("date_deadline")
-
-        return processed_contents
+        with timed_phase("load_file exceptions"):
+            return apply_repo_exceptions(contents, index_repo_exceptions(contents), repo_url)
 
     except FileNotFoundError:
         raise FileNotFoundError(f"The file '{filename}' does not exist.")
@@ -148,6 +415,42 @@ def load_file(filename, repo_url=None):
     except Exception as e:
         logger.error(f"Error loading {filename}: {e}")
 
+def index_repo_exceptions(contents):
+    """
+    Index the per-repository deadline exceptions of a deprecation map.
+
+    Returns:
+        dict: [(category, dependency, date_deadline)] keyed by lower-cased repository URL,
+            in the order the exceptions appear in the map.
+    """
+    exceptions_index = {}
+    for category, dependencies in contents.items():
+        for dependency, details in dependencies.items():
+            for exception in details.get("exceptions", []):
+                repo = exception.get("repo").strip().lower()
+                exceptions_index.setdefault(repo, []).append((category, dependency, exception.get("date_deadline")))
+    return exceptions_index
+
+
+def apply_repo_exceptions(contents, exceptions_index, repo_url):
+    """
+    Return the deprecation map as seen by repo_url, with its exception deadlines
+    in place of the default ones. Entries without an exception for the
+    repository are shared with contents, which is never modified.
+    """
+    overrides = exceptions_index.get((repo_url or "").strip().lower())
+    if not overrides:
+        return contents
+    processed_contents = dict(contents)
+    for category, dependency, date_deadline in overrides:
+        if processed_contents[category] is contents[category]:
+            processed_contents[category] = dict(contents[category])
+        processed_contents[category][dependency] = {
+            **processed_contents[category][dependency], "date_deadline": date_deadline
+        }
+    return processed_contents
+
+
 def send_slack_message(webhook, channel, username, icon_emoji, build_origin, build_url, build_id, message):
     """
     Sends a message to a Slack channel using a webhook.
@@ -317,7 +620,31 @@ def send_slack_message(webhook, channel, username, icon_emoji, build_origin, bui
             }
         ])
 
-    response = requests.post(webhook, json=slack_data)
+    if message.get('timed_out', {}).get('components'):
+        # Add the warning message block
+        slack_data["blocks"].extend([
+            {
+                "type": "divider"
+            },
+            {
+                "type": "section",
+                "fields": [
+                    {
+                        "type": "mrkdwn",
+                        "text": "*Warning:*\n" + message['timed_out']['error_message']
+                    },
+                    {
+                        "type": "mrkdwn",
+                        "text": "*Components:*\n" + '\n'.join(message['timed_out']['components'])
+                    }
+                ]
+            }
+        ])
+
+    import http_budget
+
+    with timed_phase("http slack webhook"):
+        response = http_budget.post(webhook, json=slack_data)
     if response.status_code:
         return True
     else:
@@ -327,32 +654,109 @@ def send_slack_message(webhook, channel, username, icon_emoji, build_origin, bui
         )
 
 
-def get_hmcts_github_slack_user_mappings():
+def load_cached_slack_user_mappings(cache_dir=nagger_cache_dir):
+    """
+    Load the last copy of slack.json saved by get_hmcts_github_slack_user_mappings().
+
+    Parameters:
+    - cache_dir (str): Directory holding the cached mappings.
+
+    Returns:
+    - tuple: (etag, mappings) where etag may be None, or (None, None) when
+        there is no usable cached copy.
+    """
+    cache_path = os.path.join(cache_dir, "slack.json")
+    try:
+        with open(cache_path, "r") as f:
+            cached = json.load(f)
+        return cached.get("etag"), cached["mappings"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, None
+
+
+def save_cached_slack_user_mappings(etag, mappings, cache_dir=nagger_cache_dir):
+    """
+    Atomically write slack.json and its ETag to the mappings cache.
+    Failing to write the cache is logged but never fails the run.
+    """
+    cache_path = os.path.join(cache_dir, "slack.json")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"etag": etag, "mappings": mappings}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.debug(f"Unable to cache slack user mappings in {cache_dir}: {e}")
+
+
+def get_hmcts_github_slack_user_mappings(
+    url=slack_mappings_url, cache_dir=nagger_cache_dir, timeout=slack_mappings_timeout
+):
     """
     Retrieves a JSON file containing mappings between GitHub usernames and Slack user IDs.
+
+    The last downloaded copy is kept on disk together with its ETag, so that
+    subsequent runs only revalidate it (If-None-Match) instead of downloading
+    the whole file. If the request times out or fails, the cached copy is used.
+
     Returns:
         dict: A dictionary containing the mappings.
     Raises:
-        requests.exceptions.RequestException: If an error occurs while making the request.
+        requests.exceptions.RequestException: If an error occurs while making the
+            request and there is no cached copy to fall back to.
     """
-    url = (
-        "https://raw.githubusercontent.com/"
-        "hmcts/github-slack-user-mappings/master/slack.json"
-    )
-    response = requests.get(url).json()
-    return response
+    import requests
+    import http_budget
+
+    etag, cached_mappings = load_cached_slack_user_mappings(cache_dir)
+    headers = {}
+    if etag and cached_mappings is not None:
+        headers["If-None-Match"] = etag
+
+    try:
+        with timed_phase("http slack user mappings"):
+            response = http_budget.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached_mappings is not None:
+            logger.debug("Slack user mappings not modified, using cached copy")
+            return cached_mappings
+        response.raise_for_status()
+        mappings = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        if cached_mappings is None:
+            raise
+        logger.warning(f"Unable to refresh slack user mappings, using cached copy: {e}")
+        return cached_mappings
+
+    save_cached_slack_user_mappings(response.headers.get("ETag"), mappings, cache_dir)
+    return mappings
+
+
+def index_github_slack_user_mappings(mappings):
+    """
+    Build a GitHub ID -> Slack ID lookup from the slack.json mappings.
+    When a GitHub ID appears more than once, the first entry wins.
+
+    Parameters:
+    - mappings (dict): A dictionary of user mappings containing 'users' key.
+
+    Returns:
+    - dict: Slack IDs keyed by GitHub ID.
+    """
+    index = {}
+    for user in mappings.get("users", []):
+        index.setdefault(user.get("github"), user.get("slack"))
+    return index
 
 
-def get_github_slack_user_mapping(mappings, github_id):
+def get_github_slack_user_mapping(mappings_index, github_id):
     """
     Return the Slack ID of the user with the provided GitHub ID.
     If no user is found with the provided GitHub ID, return None.
 
     Parameters:
-    - mappings (dict): A dictionary of user mappings containing 'users' key,
-        which has a list of dictionaries where each dictionary has 'github'
-        and 'slack' keys representing the GitHub ID and corresponding Slack
-        ID respectively.
+    - mappings_index (dict): Slack IDs keyed by GitHub ID, as built once per
+        run by index_github_slack_user_mappings().
     - github_id (str): A string representing the GitHub ID of the user whose
         Slack ID is to be retrieved.
 
@@ -361,11 +765,7 @@ def get_github_slack_user_mapping(mappings, github_id):
         with the provided GitHub ID, or None if no user is found with the
         provided GitHub ID.
     """
-    # Find the user with the provided GitHub ID and return their Slack ID
-    for user in mappings["users"]:
-        if user["github"] == github_id:
-            return user["slack"]
-    return None
+    return mappings_index.get(github_id)
 
 
 def log_message_slack(slack_recipient=None, slack_webhook_url=None, message=None):
@@ -471,13 +871,21 @@ def extract_version(text, regex):
         return None
 
 
+@functools.lru_cache(maxsize=None)
+def parse_version(text):
+    """packaging's version.parse(); version strings repeat across components and repositories."""
+    from packaging import version
+
+    return version.parse(text)
+
+
 def terraform_version_checker(terraform_version, config, current_date, component):
     # Get the date after which Terraform versions are no longer supported
     end_support_date_str = config["terraform"]["terraform"]["date_deadline"]
     end_support_date = datetime.datetime.strptime(end_support_date_str, "%Y-%m-%d").date()
 
     # Warn if terraform version is lower than specified & not past deadline.
-    if version.parse(terraform_version) < version.parse(
+    if parse_version(terraform_version) < parse_version(
         config["terraform"]["terraform"]["version"]
     ) and current_date <= end_support_date:
         log_message(
@@ -495,7 +903,7 @@ def terraform_version_checker(terraform_version, config, current_date, component
         return 'warning', message
 
     # Error if terraform version lower than specified & passed deadline.
-    if version.parse(terraform_version) < version.parse(
+    if parse_version(terraform_version) < parse_version(
         config["terraform"]["terraform"]["version"]
     ) and current_date > end_support_date:
         log_message(
@@ -521,7 +929,7 @@ def terraform_provider_checker(provider, provider_version, config, current_date,
         end_support_date = datetime.datetime.strptime(end_support_date_str, "%Y-%m-%d").date()
 
         # Warn if terraform provider version is lower than specified & not past deadline.
-        if version.parse(provider_version) < version.parse(
+        if parse_version(provider_version) < parse_version(
             config["terraform"][provider]["version"]
         ) and current_date <= end_support_date:
             log_message(
@@ -540,7 +948,7 @@ def terraform_provider_checker(provider, provider_version, config, current_date,
             return 'warning', message, end_support_date_str
 
         # Error if terraform provider version lower than specified & passed deadline.
-        if version.parse(provider_version) < version.parse(
+        if parse_version(provider_version) < parse_version(
             config["terraform"][provider]["version"]
         ) and current_date > end_support_date:
             log_message(
@@ -562,7 +970,40 @@ def terraform_provider_checker(provider, provider_version, config, current_date,
     return True, 'All providers up to date', ''
 
 
-def create_working_dir_list(base_directory, system_default_working_directory, build_repo_suffix):
+def discover_components(working_directory, max_depth=1):
+    """
+    Find components, directories containing *.tf files, at most max_depth
+    levels below working_directory in one os.scandir pass. A component's
+    subdirectories (local modules) are not searched: the listing of a
+    component stops at its first *.tf file, and entries are only checked for
+    being directories where the walk goes on below them.
+
+    Returns:
+        list: Sorted component paths relative to working_directory.
+    """
+    components = []
+    pending = [('', 0)]
+    while pending:
+        rel_path, depth = pending.pop()
+        candidates = []
+        has_tf = False
+        with os.scandir(os.path.join(working_directory, rel_path)) as entries:
+            for entry in entries:
+                if entry.name.endswith('.tf'):
+                    has_tf = True
+                    if depth > 0:
+                        break
+                elif depth < max_depth:
+                    candidates.append(entry)
+        if depth > 0 and has_tf:
+            components.append(rel_path)
+        elif candidates:
+            pending.extend((os.path.join(rel_path, entry.name), depth + 1)
+                           for entry in candidates if entry.is_dir())
+    return sorted(components)
+
+
+def create_working_dir_list(base_directory, system_default_working_directory, build_repo_suffix, max_depth=1):
     if not base_directory or base_directory == '':
             is_root_dir = True
             working_directory = f"{system_default_working_directory}/{build_repo_suffix}/"
@@ -577,15 +1018,298 @@ def create_working_dir_list(base_directory, system_default_working_directory, bu
     if is_root_dir:
         components_list = ['/']
     else:
-        # Get the list of all child dir in the specified parent directory
-        parent_dir = os.listdir(working_directory)
-        # Filter out entries that are directories
-        components_list = sorted([child_dir for child_dir in parent_dir if os.path.isdir(os.path.join(working_directory, child_dir)) 
-                                  and any(fnmatch.fnmatch(file_name, '*.tf') for file_name in os.listdir(os.path.join(working_directory, child_dir)))])
-        
+        with timed_phase("discover components"):
+            components_list = discover_components(working_directory, max_depth)
+
     return working_directory, components_list
 
 
+def load_duration_history(cache_dir=nagger_cache_dir):
+    """Return {history key: {component: seconds}} recorded by previous runs."""
+    try:
+        with open(os.path.join(cache_dir, "component-durations.json"), "r") as f:
+            history = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return history if isinstance(history, dict) else {}
+
+
+def load_component_durations(history_key, cache_dir=nagger_cache_dir):
+    """Return {component: seconds} recorded by previous runs for history_key."""
+    return load_duration_history(cache_dir).get(history_key, {})
+
+
+def save_component_durations(history_key, durations, cache_dir=nagger_cache_dir):
+    """Merge this run's component durations into the on-disk history."""
+    save_duration_history({history_key: durations}, cache_dir)
+
+
+def save_duration_history(updates, cache_dir=nagger_cache_dir):
+    """Merge {history key: {component: seconds}} into the on-disk history in one write."""
+    path = os.path.join(cache_dir, "component-durations.json")
+    history = load_duration_history(cache_dir)
+    for history_key, durations in updates.items():
+        history.setdefault(history_key, {}).update(durations)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(history, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.debug(f"Unable to save component durations in {cache_dir}: {e}")
+
+
+def recorded_durations(results, durations):
+    """
+    Durations of this run's results to keep in the history, keyed like results.
+
+    Components skipped because the time budget ran out were not measured and
+    keep their history. A component that timed out while running took at
+    least as long as it ran, so it keeps the longer of that and its history.
+    Either way it stays near the front of the next run's schedule.
+    """
+    recorded = {}
+    for key, result in results.items():
+        if result.get('skipped'):
+            continue
+        if result['status'] == 'timed_out':
+            recorded[key] = max(result['duration'], durations.get(key, 0))
+        else:
+            recorded[key] = result['duration']
+    return recorded
+
+
+def schedule_components(components_list, durations):
+    """
+    Order components longest-first by their historical duration so slow
+    components do not end up last. Components without history go first,
+    as their cost is unknown.
+    """
+    return sorted(components_list, key=lambda c: (c in durations, -durations.get(c, 0), c))
+
+
+def analyse_component(component, full_path, terraform_binary_path, terraform_command, deadline,
+                      plugin_cache_dir=None):
+    """
+    Run tfswitch and terraform for a single component and collect the output
+    needed to check it against the deprecation map. Console logging and
+    reporting are left to record_component_result().
+
+    terraform init uses `plugin_cache_dir` as its provider plugin cache when
+    given, instead of $TF_PLUGIN_CACHE_DIR.
+
+    Returns:
+        dict: 'status' is 'analysed', 'below_0.13' or 'timed_out'.
+    """
+    print(f'component: {component}')
+    result = {
+        'component': component,
+        'status': 'analysed',
+        'init_stdout': '',
+        'init_stderr': '',
+        'version': None,
+    }
+    try:
+        # switch to the terraform version required by the component
+        command = ["tfswitch", "-b", terraform_binary_path]
+        switched_version = extract_version(run_command(command, full_path, True, deadline), switched_terraform_regex)
+
+        # terraform < 0.13 cannot report providers, so is not worth an init
+        if switched_version and parse_version(switched_version) < parse_version("0.13.0"):
+            result['status'] = 'below_0.13'
+            result['version'] = f"Terraform v{switched_version}"
+            return result
+
+        ### catch terraform init errors
+        command = [terraform_command, "init", "-backend=false", "-reconfigure", "-upgrade"]
+        env = {**os.environ, "TF_PLUGIN_CACHE_DIR": plugin_cache_dir} if plugin_cache_dir else None
+        result['init_stdout'], result['init_stderr'] = run_tf_init(command, full_path, deadline, env)
+
+        # terraform version and provider selections post init
+        command = [terraform_command, "version", "--json"]
+        output = run_command(command, full_path, deadline=deadline)
+        try:
+            result['version'] = json.loads(output)
+        except JSONDecodeError:
+            ### terraform < 0.13 prints plain text and ignores --json
+            result['status'] = 'below_0.13'
+            result['version'] = output
+            if extract_version(output, legacy_terraform_regex) is None:
+                command = [terraform_command, "version"]
+                result['version'] = run_command(command, full_path, deadline=deadline)
+    except ComponentTimeout:
+        result['status'] = 'timed_out'
+    return result
+
+
+def run_components(components_list, working_directory, terraform_binary_path, durations,
+                   workers=1, component_timeout=None, budget_deadline=None):
+    """
+    Analyse the components of one working directory longest-first on a pool
+    of workers, enforcing the per-component timeout and the overall budget
+    deadline.
+
+    Returns:
+        dict: Results of analyse_component() keyed by component, each with the
+            time spent in 'duration'.
+    """
+    jobs = {component: (component, f'{working_directory}{component}') for component in components_list}
+    return run_component_jobs(jobs, terraform_binary_path, durations, workers, component_timeout, budget_deadline)
+
+
+def run_component_jobs(jobs, terraform_binary_path, durations,
+                       workers=1, component_timeout=None, budget_deadline=None):
+    """
+    Analyse components, possibly from several repositories, longest-first on
+    one pool of workers.
+
+    With more than one worker each worker gets its own terraform binary so
+    concurrent tfswitch calls do not overwrite each other's version, and its
+    own subdirectory of $TF_PLUGIN_CACHE_DIR, as terraform does not support
+    concurrent inits sharing a plugin cache.
+
+    Args:
+        jobs (dict): (label, component path) keyed by job key; the label names
+            the component in logs and traces.
+        durations (dict): Historical seconds keyed by job key.
+    Returns:
+        dict: Results of analyse_component() keyed by job key, each with the
+            time spent in 'duration'.
+    """
+    worker_ids = threading.local()
+    next_worker_id = iter(range(workers))
+    shared_plugin_cache_dir = os.getenv("TF_PLUGIN_CACHE_DIR")
+
+    def init_worker():
+        worker_ids.value = next(next_worker_id)
+
+    def analyse(key):
+        component, full_path = jobs[key]
+        if workers > 1:
+            binary_path = os.path.join(
+                os.path.dirname(terraform_binary_path), f"nagger-worker-{worker_ids.value}", "terraform"
+            )
+            os.makedirs(os.path.dirname(binary_path), exist_ok=True)
+            terraform_command = binary_path
+            plugin_cache_dir = None
+            if shared_plugin_cache_dir:
+                plugin_cache_dir = os.path.join(shared_plugin_cache_dir, f"nagger-worker-{worker_ids.value}")
+                os.makedirs(plugin_cache_dir, exist_ok=True)
+        else:
+            binary_path = terraform_binary_path
+            terraform_command = "terraform"
+            plugin_cache_dir = None
+
+        subprocess_counter.value = 0
+        start = time.monotonic()
+        deadlines = [d for d in (budget_deadline, start + component_timeout if component_timeout else None) if d]
+        deadline = min(deadlines) if deadlines else None
+        with timed_phase("component", component):
+            if budget_deadline is not None and start >= budget_deadline:
+                print(f'component: {component} (skipped, time budget exhausted)')
+                result = {'component': component, 'status': 'timed_out', 'skipped': True}
+            else:
+                result = analyse_component(component, full_path, binary_path, terraform_command, deadline,
+                                           plugin_cache_dir)
+        result['duration'] = time.monotonic() - start
+        result['subprocesses'] = subprocess_counter.value
+        logger.debug(f"{component} - {result['subprocesses']} subprocess(es) in {result['duration']:.1f}s")
+        return result
+
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = {executor.submit(analyse, key): key for key in schedule_components(jobs, durations)}
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                results[futures[future]] = future.result()
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+    return results
+
+
+def record_component_result(result, output_warning, deprecation_map, current_date):
+    """Check one analysed component against the deprecation map and log/report any findings."""
+    component = result['component']
+
+    if result['status'] == 'timed_out':
+        log_message(
+            "warning",
+            f"{component} - Terraform analysis did not finish within the time allowed "
+            f"({result['duration']:.0f}s). Terraform and provider versions were not checked."
+        )
+        output_warning['timed_out']['error_message'] = (
+            "Terraform analysis timed out for specified components. "
+            "Their Terraform and provider versions were not checked."
+        )
+        output_warning['timed_out']['components'].append(component)
+        return
+
+    if result['status'] == 'below_0.13':
+        terraform_version = extract_version(result['version'], legacy_terraform_regex)
+
+        # strip preceding "v" for version comparison
+        if terraform_version[0].lower() == "v":
+            terraform_version = terraform_version[1:]
+
+        # trigger ado console
+        log_message(
+            "error",
+            f"{component} - Detected terraform version {terraform_version} does not support "
+            f"checking provider versions in addition to the main binary. "
+            f"Please upgrade your terraform version to at least v0.13.0"
+        )
+        error_message = (
+                f'Please upgrade your terraform version to at least v0.13.0'
+                )
+        # log error & save to file
+        add_error(output_warning, error_message, component, 'below_0.13')
+        return
+
+    stdout, stderr = result['init_stdout'], result['init_stderr']
+    if not 'Terraform has been successfully initialized!' in stdout:
+        # trigger ado console
+        log_message( 'error',
+            f'{component} - Terraform init failed. Please see docs for further information: '
+            'https://github.com/hmcts/cnp-azuredevops-libraries?tab=readme-ov-file#required-terraform-folder-structure'
+            )
+        # log error & save to file
+        error_message = (
+            f'Terraform init failed for specified components. Please see docs for further information: '
+            f'<https://github.com/hmcts/cnp-azuredevops-libraries?tab=readme-ov-file#required-terraform-folder-structure|Docs>'
+            )
+        add_error(output_warning, error_message, component, 'failed_init')
+
+        print(stdout)
+        logger.error(f"##vso[task.logissue type=error;] Error returned\n{stderr}")
+
+    ### check terraform version against deprecation map
+    terraform_version = result['version']["terraform_version"]
+    # warning/error logging - terraform_version_checker handles console log
+    alert_level, error_message = terraform_version_checker(terraform_version, deprecation_map, current_date, component)
+    if alert_level == 'warning':
+        output_warning['terraform_version']['error_message'] = error_message
+        output_warning['terraform_version']['components'].append(component)
+    if alert_level == 'error':
+        add_error(output_warning, error_message, component)
+
+    ### check provider versions against deprecation map
+    terraform_providers = result['version']["provider_selections"]
+    if terraform_providers:
+        for provider, provider_version in terraform_providers.items():
+            # warning/error logging - terraform_version_checker handles console log
+            alert_level, error_message, end_support_date_str = terraform_provider_checker(provider, provider_version, deprecation_map, current_date, component)
+            provider = provider.split('/')[-1]
+            if alert_level == 'warning':
+                output_warning['terraform_provider']['error_message'] = error_message
+                if provider not in output_warning['terraform_provider']['provider']:
+                    output_warning['terraform_provider']['provider'][provider] = end_support_date_str
+            if alert_level == 'error':
+                add_error(output_warning, error_message, component, 'provider_version', provider, end_support_date_str)
+
+
 def add_error(output_warning, error_message, component, error_type=None, provider=None, end_support_date=None):
     # init error key if needed
     if 'error' not in output_warning:
@@ -630,17 +1354,26 @@ def add_error(output_warning, error_message, component, error_type=None, provide
 def main():
     global slack_user_id
     global slack_webhook_url
+    global tracer
 
-    # parse environment variables
-    system_default_working_directory = os.getenv('SYSTEM_DEFAULT_WORKING_DIRECTORY')
-    build_repo_suffix = os.getenv('BUILD_REPO_SUFFIX')
-    base_directory = os.getenv('BASE_DIRECTORY')
-    github_user = os.getenv("BUILD_SOURCEVERSIONAUTHOR")
-    slack_webhook_url = os.getenv("SLACK_WEBHOOK_URL")
-
-    # initialisation
-    output_file = "nagger_output.json"
-    output_warning = {
+    if args.trace_file:
+        # with several workers, subprocess CPU cannot be told apart per component
+        tracer = PhaseTracer(per_phase_child_cpu=args.workers <= 1)
+    try:
+        with timed_phase("nagger"):
+            if args.repos or args.repos_file:
+                run_batch()
+            else:
+                run_nagger()
+    finally:
+        if tracer is not None:
+            tracer.write_chrome_trace(args.trace_file)
+            tracer.log_summary()
+            logger.info(f"Chrome trace written to {args.trace_file}")
+
+
+def new_output_warning():
+    return {
         'terraform_version': {
             'components': [],
             'error_message': ''
@@ -648,8 +1381,29 @@ def main():
         'terraform_provider': {
             'provider': {},
             'error_message': ''
+        },
+        'timed_out': {
+            'components': [],
+            'error_message': ''
         }
     }
+
+
+def run_nagger():
+    global slack_user_id
+    global slack_webhook_url
+
+    # parse environment variables
+    system_default_working_directory = os.getenv('SYSTEM_DEFAULT_WORKING_DIRECTORY')
+    build_repo_suffix = os.getenv('BUILD_REPO_SUFFIX')
+    base_directory = os.getenv('BASE_DIRECTORY')
+    github_user = os.getenv("BUILD_SOURCEVERSIONAUTHOR")
+    slack_webhook_url = os.getenv("SLACK_WEBHOOK_URL")
+
+    # initialisation
+    budget_deadline = time.monotonic() + args.time_budget if args.time_budget else None
+    output_file = "nagger_output.json"
+    output_warning = new_output_warning()
     current_date = datetime.date.today()
     
     # ado error if slack webhook url missing
@@ -660,108 +1414,40 @@ def main():
     home_dir = os.path.expanduser('~')
     terraform_binary_path = os.path.join(home_dir, '.local', 'bin', 'terraform')
     # construct working directory (./component/ or $baseDirectory)
-    working_directory, components_list = create_working_dir_list(base_directory, system_default_working_directory, build_repo_suffix)
+    working_directory, components_list = create_working_dir_list(
+        base_directory, system_default_working_directory, build_repo_suffix, args.discovery_depth
+    )
     # load deprecation map
     deprecation_map = load_file(args.filepath, os.getenv("BUILD_REPOSITORY_URI"))
     
     print('Analysing components...')
 
-    for component in components_list:
-        try:
-            print(f'component: {component}')
-            full_path = f'{working_directory}{component}'
-            
-             # fail out loop if terraform version <= 0.13.0
-            command = ["tfswitch", "-b", terraform_binary_path]
-            run_command(command, full_path, True)
-
-            # Get terraform version
-            command = ["terraform", "version", "--json"]
-            result = json.loads(run_command(command, full_path))
-
-            ### catch terraform init errors
-            command = ["terraform", "init", "-backend=false" , "-reconfigure", "-upgrade" ]
-            stdout, stderr = run_tf_init(command, full_path)
-            
-            if not 'Terraform has been successfully initialized!' in stdout:
-                # trigger ado console
-                log_message( 'error',
-                    f'{component} - Terraform init failed. Please see docs for further information: '
-                    'https://github.com/hmcts/cnp-azuredevops-libraries?tab=readme-ov-file#required-terraform-folder-structure'
-                    )
-                # log error & save to file
-                error_message = (
-                    f'Terraform init failed for specified components. Please see docs for further information: '
-                    f'<https://github.com/hmcts/cnp-azuredevops-libraries?tab=readme-ov-file#required-terraform-folder-structure|Docs>'
-                    )
-                add_error(output_warning, error_message, component, 'failed_init')
-
-                print(stdout)
-                logger.error(f"##vso[task.logissue type=error;] Error returned\n{stderr}")
-
-            ### rerun version --json to fetch providers post init
-            command = ["terraform", "version", "--json"]
-            result = json.loads(run_command(command, full_path))
-
-            ### check terraform version against deprecation map
-            terraform_version = result["terraform_version"]
-            # warning/error logging - terraform_version_checker handles console log
-            alert_level, error_message = terraform_version_checker(terraform_version, deprecation_map, current_date, component)
-            if alert_level == 'warning':
-                output_warning['terraform_version']['error_message'] = error_message
-                output_warning['terraform_version']['components'].append(component)
-            if alert_level == 'error':
-                add_error(output_warning, error_message, component)
-
-            ### check provider versions against deprecation map
-            terraform_providers = result["provider_selections"]
-            if terraform_providers:
-                for provider, provider_version in terraform_providers.items():
-                    # warning/error logging - terraform_version_checker handles console log
-                    alert_level, error_message, end_support_date_str = terraform_provider_checker(provider, provider_version, deprecation_map, current_date, component)
-                    provider = provider.split('/')[-1]
-                    if alert_level == 'warning':
-                        output_warning['terraform_provider']['error_message'] = error_message
-                        if provider not in output_warning['terraform_provider']['provider']:
-                            output_warning['terraform_provider']['provider'][provider] = end_support_date_str
-                    if alert_level == 'error':
-                        add_error(output_warning, error_message, component, 'provider_version', provider, end_support_date_str)
-
-            # write back to file
-            with open(output_file, 'w') as file:
-                json.dump(output_warning, file, indent=4)
-            log_message('group_close')
-
-        ### fallback to regex when terraform version <= 0.13.0
-        except JSONDecodeError:
-            result = run_command(command, full_path)
-            terraform_regex = f"^([Tt]erraform(\\s))(?P<semver>{semver_regex})"
-            terraform_version = extract_version(result, terraform_regex)
+    history_key = os.getenv("BUILD_REPOSITORY_URI") or working_directory
+    durations = load_component_durations(history_key)
+    try:
+        results = run_components(
+            components_list, working_directory, terraform_binary_path, durations,
+            args.workers, args.component_timeout, budget_deadline
+        )
+    except Exception as e:
+        ### script failues etc
+        logger.error("Unknown error occurred")
+        raise Exception(e)
+    save_component_durations(history_key, recorded_durations(results, durations))
+    subprocess_count = sum(r['subprocesses'] for r in results.values())
+    logger.info(
+        f"Ran {subprocess_count} subprocess(es) for {len(results)} component(s) "
+        f"({subprocess_count / max(len(results), 1):.2f} per component)"
+    )
 
-            # strip preceding "v" for version comparison
-            if terraform_version[0].lower() == "v":
-                terraform_version = terraform_version[1:]
+    # report in component order regardless of the order components finished in
+    for component in components_list:
+        record_component_result(results[component], output_warning, deprecation_map, current_date)
 
-            # trigger ado console
-            log_message(
-                "error",
-                f"{component} - Detected terraform version {terraform_version} does not support "
-                f"checking provider versions in addition to the main binary. "
-                f"Please upgrade your terraform version to at least v0.13.0"
-            )
-            error_message = (
-                    f'Please upgrade your terraform version to at least v0.13.0'
-                    )
-            # log error & save to file
-            add_error(output_warning, error_message, component, 'below_0.13')
-            with open(output_file, 'w') as file:
-                json.dump(output_warning, file, indent=4)
+    # write back to file
+    with open(output_file, 'w') as file:
+        json.dump(output_warning, file, indent=4)
 
-        ### script failues etc
-        except Exception as e:
-            logger.error("Unknown error occurred")
-            raise Exception(e)
-        
     ### trigger slack message if we've collated warnings/errors
     with open(output_file, 'r') as file:
         complete_file = json.load(file)
@@ -769,11 +1455,11 @@ def main():
     # only slack send if we have collated errors/warnings
     if ('error' in complete_file or
         (complete_file.get('terraform_version', {}).get('components')) or
-        (complete_file.get('terraform_provider', {}).get('provider'))):
+        (complete_file.get('terraform_provider', {}).get('provider')) or
+        (complete_file.get('timed_out', {}).get('components'))):
 
-        slack_user_id = get_github_slack_user_mapping(
-            get_hmcts_github_slack_user_mappings(), github_user
-        )
+        mappings_index = index_github_slack_user_mappings(get_hmcts_github_slack_user_mappings())
+        slack_user_id = get_github_slack_user_mapping(mappings_index, github_user)
         # ado error if slack user id missing
         if not slack_user_id:
             log_message("warning",
@@ -797,5 +1483,162 @@ def main():
         raise SystemExit(1)
 
 
+def read_repos_file(path):
+    """Checkout paths listed one per line; blank lines and # comments are ignored."""
+    with open(path, "r") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def repository_url(checkout):
+    """
+    The https URL of a checkout's origin remote, as $BUILD_REPOSITORY_URI would
+    give it, so deprecation map exceptions apply. None if it has no origin.
+    """
+    try:
+        completed = subprocess.run(
+            ["git", "-C", checkout, "config", "--get", "remote.origin.url"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+    except OSError:
+        return None
+    url = completed.stdout.strip()
+    if completed.returncode != 0 or not url:
+        return None
+    # git@github.com:hmcts/repo.git -> https://github.com/hmcts/repo
+    match = re.match(r"^(?:ssh://)?git@([^:/]+)[:/](.+)$", url)
+    if match:
+        url = f"https://{match.group(1)}/{match.group(2)}"
+    return url[:-len(".git")] if url.endswith(".git") else url
+
+
+def component_report(result):
+    """The machine-readable outcome of one analysed component."""
+    entry = {'status': result['status'], 'duration': round(result['duration'], 3)}
+    if result['status'] == 'analysed':
+        entry['init_succeeded'] = 'Terraform has been successfully initialized!' in result['init_stdout']
+        entry['terraform_version'] = result['version']["terraform_version"]
+        entry['providers'] = result['version']["provider_selections"] or {}
+    elif result['status'] == 'below_0.13':
+        entry['terraform_version'] = extract_version(result['version'], legacy_terraform_regex)
+    return entry
+
+
+def run_batch():
+    """
+    Analyse every component of several repository checkouts in one process:
+    the deprecation map is loaded and indexed once, all components share one
+    worker pool and terraform provider plugin cache (one subdirectory per
+    worker), and one JSON report per repository is written to --report-dir.
+    No Slack messages are sent.
+    """
+    checkouts = list(args.repos)
+    if args.repos_file:
+        checkouts.extend(read_repos_file(args.repos_file))
+
+    budget_deadline = time.monotonic() + args.time_budget if args.time_budget else None
+    current_date = datetime.date.today()
+    base_directory = os.getenv('BASE_DIRECTORY')
+    terraform_binary_path = os.path.join(os.path.expanduser('~'), '.local', 'bin', 'terraform')
+
+    # terraform init -upgrade downloads every provider again unless it is cached
+    plugin_cache_dir = args.plugin_cache_dir or os.path.join(nagger_cache_dir, "plugin-cache")
+    os.makedirs(plugin_cache_dir, exist_ok=True)
+    os.environ["TF_PLUGIN_CACHE_DIR"] = plugin_cache_dir
+
+    deprecation_map = load_file(args.filepath)
+    with timed_phase("load_file exceptions"):
+        exceptions_index = index_repo_exceptions(deprecation_map)
+    duration_history = load_duration_history()
+
+    repos = []
+    report_names = set()
+    jobs = {}
+    durations = {}
+    for index, checkout in enumerate(checkouts):
+        checkout = os.path.abspath(checkout)
+        url = repository_url(checkout)
+        name = (url or checkout).rstrip("/").split("/")[-1]
+        report_name, suffix = name, 1
+        while report_name in report_names:
+            suffix += 1
+            report_name = f"{name}-{suffix}"
+        report_names.add(report_name)
+        repo = {'index': index, 'checkout': checkout, 'url': url, 'name': name,
+                'report_name': report_name, 'components': [], 'error': None}
+        repos.append(repo)
+        try:
+            if not os.path.isdir(checkout):
+                raise FileNotFoundError(f"No such checkout: {checkout}")
+            working_directory, repo['components'] = create_working_dir_list(
+                base_directory, os.path.dirname(checkout), os.path.basename(checkout), args.discovery_depth
+            )
+        except OSError as e:
+            log_message("warning", f"{name} - Unable to list components: {e}")
+            repo['error'] = str(e)
+            continue
+        repo['working_directory'] = working_directory
+        repo['history_key'] = url or working_directory
+        history = duration_history.get(repo['history_key'], {})
+        for component in repo['components']:
+            jobs[(index, component)] = (f"{name}:{component}", f'{working_directory}{component}')
+            if component in history:
+                durations[(index, component)] = history[component]
+
+    print(f'Analysing {len(jobs)} component(s) in {len(repos)} repositories...')
+    try:
+        results = run_component_jobs(
+            jobs, terraform_binary_path, durations, args.workers, args.component_timeout, budget_deadline
+        )
+    except Exception as e:
+        ### script failues etc
+        logger.error("Unknown error occurred")
+        raise Exception(e)
+
+    os.makedirs(args.report_dir, exist_ok=True)
+    duration_updates = {}
+    recorded = recorded_durations(results, durations)
+    summary = {'repositories': 0, 'errors': 0, 'warnings': 0}
+    for repo in repos:
+        repo_map = apply_repo_exceptions(deprecation_map, exceptions_index, repo['url'])
+        output_warning = new_output_warning()
+        components = {}
+        for component in repo['components']:
+            # findings name the component as in a single repository run
+            result = {**results[(repo['index'], component)], 'component': component}
+            record_component_result(result, output_warning, repo_map, current_date)
+            components[component] = component_report(result)
+        repo_durations = {c: round(recorded[(repo['index'], c)], 3) for c in repo['components']
+                          if (repo['index'], c) in recorded}
+        if repo_durations:
+            duration_updates[repo['history_key']] = repo_durations
+
+        report_path = os.path.join(args.report_dir, f"{repo['report_name']}.json")
+        with open(report_path, 'w') as file:
+            json.dump({
+                'repository': repo['url'],
+                'checkout': repo['checkout'],
+                'date': current_date.isoformat(),
+                'error': repo['error'],
+                'components': components,
+                'findings': output_warning,
+            }, file, indent=4)
+        summary['repositories'] += 1
+        summary['errors'] += 'error' in output_warning
+        summary['warnings'] += bool(output_warning['terraform_version']['components']
+                                    or output_warning['terraform_provider']['provider']
+                                    or output_warning['timed_out']['components'])
+    save_duration_history(duration_updates)
+
+    subprocess_count = sum(r['subprocesses'] for r in results.values())
+    logger.info(
+        f"Ran {subprocess_count} subprocess(es) for {len(results)} component(s) in {len(repos)} repositories; "
+        f"{summary['errors']} with errors, {summary['warnings']} with warnings. Reports written to {args.report_dir}"
+    )
+
+    ### exit code 1 if errors
+    if errors_detected:
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Check the OpenMetrics file written by ado-build-check.py --metricsfile.
+
+ado-build-check.py polls a local Azure DevOps builds API stand-in: two runs
+wait behind two queued builds for one poll each and then proceed, a third
+cannot find its build. The merged metrics file must count every poll, API
+response, queue depth and wait, and be well-formed OpenMetrics (checked with
+prometheus_client's parser as well when it is installed).
+
+    python3 scripts/benchmarks/ado-build-check-metrics-check.py
+"""
+
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+
+from benchlib import load_script, report
+from stub_servers import StubServer
+
+BUILD_ID = 100
+
+
+def build(build_id):
+    return {"id": build_id, "buildNumber": str(build_id), "status": "inProgress", "queueTime": "", "url": "",
+            "requestedBy": {}}
+
+
+def queue_handler(queues):
+    """Serve the next builds list from `queues` on each poll."""
+    def handler(request):
+        return 200, {}, {"value": [build(i) for i in queues.pop(0)]}
+
+    return handler
+
+
+def run_check(url, metrics_file, build_id=BUILD_ID):
+    argv = ["--baseurl", url, "--organization", "hmcts", "--project", "project", "--pipelineid", "42",
+            "--buildid", str(build_id), "--pat", "pat", "--metricsfile", metrics_file]
+    with contextlib.redirect_stdout(io.StringIO()):
+        check = load_script("ado-build-check.py", argv)
+        check.retry_time_in_seconds = 0.05
+        check.main()
+
+
+def main():
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+
+    queues = [[98, 99, BUILD_ID], [BUILD_ID]] * 2 + [[98, 99]]
+    with tempfile.TemporaryDirectory() as workspace, StubServer(queue_handler(queues)) as ado:
+        os.environ["HTTP_BUDGET_DIR"] = os.path.join(workspace, "http-budget")
+        metrics_file = os.path.join(workspace, "metrics", "ado-build-check.prom")
+        for _ in range(2):
+            run_check(ado.url, metrics_file)
+        run_check(ado.url, metrics_file)
+        with open(metrics_file) as f:
+            text = f.read()
+
+    labels = 'organization="hmcts",project="project",definition="42"'
+    samples = {}
+    for line in text.splitlines():
+        match = re.match(r"^(\w+)\{(.*)\} (\S+)$", line)
+        if match:
+            samples[(match.group(1), match.group(2))] = float(match.group(3))
+
+    def value(sample, extra=""):
+        return samples.get((sample, labels + extra))
+
+    check(value("ado_build_check_polls_total") == 5, f"polls: {value('ado_build_check_polls_total')}")
+    check(value("ado_build_check_api_responses_total", ',status="200"') == 5, "API responses not counted")
+    check(value("ado_build_check_api_request_duration_seconds_count") == 5, "API latency not observed")
+    check(value("ado_build_check_queue_depth_count") == 4, "queue depth observed on polls without the build")
+    check(value("ado_build_check_queue_depth_bucket", ',le="1.0"') == 2
+          and value("ado_build_check_queue_depth_bucket", ',le="2.0"') == 4, "queue depth buckets")
+    check(value("ado_build_check_queue_depth_sum") == 4, "queue depth sum")
+    check((value("ado_build_check_wait_seconds_total") or 0) >= 0.1, "wait time not accumulated across runs")
+    check(value("ado_build_check_runs_total", ',result="proceeded"') == 2, "proceeded runs")
+    check(value("ado_build_check_runs_total", ',result="not_found"') == 1, "not found runs")
+    check(text.endswith("# EOF\n"), "file does not end with # EOF")
+    buckets = [v for (sample, _), v in samples.items() if sample == "ado_build_check_api_request_duration_seconds_bucket"]
+    check(buckets == sorted(buckets) and buckets[-1] == 5, f"latency buckets not cumulative in le order: {buckets}")
+
+    try:
+        from prometheus_client.openmetrics.parser import text_string_to_metric_families
+    except ImportError:
+        parser = "prometheus_client not installed, skipped"
+    else:
+        try:
+            parser = f"{len(list(text_string_to_metric_families(text)))} families parsed"
+        except ValueError as e:
+            parser = "failed"
+            failures.append(f"prometheus_client rejected the file: {e}")
+
+    report("ado-build-check OpenMetrics", [
+        ("samples", len(samples)),
+        ("polls / waits", f"{value('ado_build_check_polls_total'):g} / {value('ado_build_check_wait_seconds_total'):.2f} s"),
+        ("prometheus_client parser", parser),
+    ])
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Benchmark ado-build-check.py --notifyport against polling alone.
+
+A local Azure DevOps builds API stand-in has --blockers builds queued ahead of
+this one, finishing one every --build-seconds; the builds API shows a build as
+completed --api-lag seconds after it finished. ado-build-check.py waits behind
+them twice:
+
+- polling every --poll seconds (the default mode)
+- with --notifyport, woken by a stand-in service hook relay that POSTs a
+  build.complete payload as each blocker finishes (plus one for another
+  definition, which must be ignored), polling only every --safety-poll
+  seconds
+
+Times are scaled down from the pipeline's (10 s polls, builds of minutes).
+Time-to-proceed is measured from the last blocker showing as completed in the
+API. Notify mode must proceed within --max-proceed seconds and with fewer API
+calls than polling.
+
+    python3 scripts/benchmarks/ado-build-check-notify-benchmark.py --blockers 3 --build-seconds 6
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchlib import load_script, report
+from stub_servers import StubServer
+
+BUILD_ID = 100
+DEFINITION = 42
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark event-driven wake-up of ado-build-check.py")
+    parser.add_argument("--blockers", type=int, default=3, help="Builds queued ahead of the checked one")
+    parser.add_argument("--build-seconds", type=float, default=6.0, help="Seconds between blocker completions")
+    parser.add_argument("--api-lag", type=float, default=0.1,
+                        help="Seconds before a completed build shows as completed in the builds API")
+    parser.add_argument("--poll", type=float, default=1.0, help="Polling interval (scaled from 10 s)")
+    parser.add_argument("--safety-poll", type=float, default=6.0, help="--safetypoll in notify mode")
+    parser.add_argument("--recheck", type=float, default=0.2,
+                        help="Re-check delay after a notification (scaled from 2 s)")
+    parser.add_argument("--max-proceed", type=float, default=0.5,
+                        help="Fail if notify mode proceeds later than this after the last blocker")
+    return parser.parse_args()
+
+
+class BuildQueue:
+    """Builds API stand-in: blocker i finishes at start + (i + 1) * build_seconds."""
+
+    def __init__(self, blockers, build_seconds, api_lag):
+        self.blockers = blockers
+        self.build_seconds = build_seconds
+        self.api_lag = api_lag
+        self.start = time.time()
+
+    def finish_time(self, index):
+        return self.start + (index + 1) * self.build_seconds
+
+    def handler(self, request):
+        visible = time.time() - self.api_lag
+        builds = [{"id": BUILD_ID - self.blockers + i,
+                   "status": "completed" if visible >= self.finish_time(i) else "inProgress"}
+                  for i in range(self.blockers)]
+        builds.append({"id": BUILD_ID, "status": "inProgress"})
+        return 200, {}, {"value": [{**b, "buildNumber": str(b["id"]), "queueTime": "", "url": "", "requestedBy": {}}
+                                   for b in builds]}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def notify(queue, port, stop):
+    """Relay a build.complete service hook payload to the checker as each blocker finishes."""
+    events = [(queue.finish_time(i), DEFINITION, BUILD_ID - queue.blockers + i) for i in range(queue.blockers)]
+    # another pipeline's build completing must not wake the checker
+    events.append((queue.start + queue.build_seconds / 2, DEFINITION + 1, 1))
+    for when, definition, build_id in sorted(events):
+        if stop.wait(max(when - time.time(), 0)):
+            return
+        payload = {"eventType": "build.complete",
+                   "resource": {"id": build_id, "definition": {"id": definition}, "result": "succeeded"}}
+        requests.post(f"http://127.0.0.1:{port}/", data=json.dumps(payload), timeout=5)
+
+
+def run_check(args, workspace, mode):
+    """(seconds from the last blocker showing completed to proceeding, API calls, wake-ups by reason)."""
+    queue = BuildQueue(args.blockers, args.build_seconds, args.api_lag)
+    metrics_file = os.path.join(workspace, f"{mode}.prom")
+    stop = threading.Event()
+    with StubServer(queue.handler) as ado:
+        argv = ["--baseurl", ado.url, "--organization", "hmcts", "--project", "project",
+                "--pipelineid", str(DEFINITION), "--buildid", str(BUILD_ID), "--pat", "pat",
+                "--metricsfile", metrics_file]
+        notifier = None
+        if mode == "notify":
+            port = free_port()
+            argv += ["--notifyport", str(port), "--safetypoll", str(args.safety_poll)]
+            notifier = threading.Thread(target=notify, args=(queue, port, stop), daemon=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            check = load_script("ado-build-check.py", argv)
+            check.retry_time_in_seconds = args.poll
+            check.notification_recheck_seconds = args.recheck
+            queue.start = time.time()
+            if notifier:
+                notifier.start()
+            try:
+                check.main()
+            finally:
+                stop.set()
+        proceeded = time.time()
+        api_calls = len(ado.requests)
+
+    with open(metrics_file) as f:
+        samples = check.BuildCheckMetrics.parse(f.read())
+    wakeups = {key[1].rsplit('reason="', 1)[1].rstrip('"'): int(value)
+               for key, value in samples.items() if key[0] == "ado_build_check_wakeups_total"}
+    last_visible = queue.finish_time(args.blockers - 1) + args.api_lag
+    return proceeded - last_visible, api_calls, wakeups
+
+
+def main():
+    args = parse_args()
+    failures = []
+    rows = []
+    results = {}
+    with tempfile.TemporaryDirectory() as workspace:
+        os.environ["HTTP_BUDGET_DIR"] = os.path.join(workspace, "http-budget")
+        for mode, label in (("poll", f"polling every {args.poll:g} s"),
+                            ("notify", f"--notifyport, safety poll {args.safety_poll:g} s")):
+            results[mode] = run_check(args, workspace, mode)
+            proceed, api_calls, wakeups = results[mode]
+            wakeups = ", ".join(f"{reason} {count}" for reason, count in sorted(wakeups.items()))
+            rows.append((label, f"proceeded {proceed:.2f} s after the last blocker, {api_calls} API calls "
+                                f"(wake-ups: {wakeups})"))
+
+    poll_proceed, poll_calls, _ = results["poll"]
+    notify_proceed, notify_calls, notify_wakeups = results["notify"]
+    if notify_proceed > args.max_proceed:
+        failures.append(f"notify mode proceeded {notify_proceed:.2f} s after the last blocker, "
+                        f"limit {args.max_proceed:g} s")
+    if notify_calls >= poll_calls:
+        failures.append(f"notify mode made {notify_calls} API calls, polling {poll_calls}")
+    if notify_wakeups.get("notification", 0) > args.blockers:
+        failures.append(f"{notify_wakeups['notification']} notification wake-ups for {args.blockers} blockers: "
+                        "a notification for another definition woke the checker")
+
+    report(f"ado-build-check wake-up ({args.blockers} blockers, one finishing every {args.build_seconds:g} s, "
+           f"API lag {args.api_lag:g} s)", rows)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
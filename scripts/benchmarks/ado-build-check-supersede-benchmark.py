@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Benchmark ado-build-check.py --supersede: agent time spent waiting.
+
+A local Azure DevOps builds API stand-in simulates a burst of commits to one
+branch. One run has passed the guard and works (plans and applies) for
+--work-seconds. --commits newer runs are then queued --commit-interval
+seconds apart, and each runs ado-build-check.py on its own agent. A run that
+passes the guard works for --work-seconds, holding its agent. A run ended
+by --supersede exit or cancelled through the API (PATCH status=cancelling)
+releases its agent at once.
+
+Each --supersede policy is run in turn. The table shows the agent-seconds
+spent waiting in the guard, the runs that worked, and the time until the
+newest run finished. exit and cancel must wait less than off. Under every
+policy the newest run must work, no two runs may work at once, and the run
+that passed the guard must never be cancelled.
+
+cancel is run a second time with the first cancel request for every build
+failing; those builds must still be cancelled on a later check. A cancel
+request that cannot be sent at all must be logged, not raised.
+
+Times are scaled down from the pipeline's (10 s polls, runs of minutes).
+
+    python3 scripts/benchmarks/ado-build-check-supersede-benchmark.py --commits 4
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+from benchlib import load_script, report
+from stub_servers import StubServer
+
+FIRST_BUILD_ID = 100
+BRANCH = "refs/heads/main"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the superseded-run policies of ado-build-check.py")
+    parser.add_argument("--commits", type=int, default=4, help="Runs queued behind the running one")
+    parser.add_argument("--commit-interval", type=float, default=0.5, help="Seconds between queued runs")
+    parser.add_argument("--work-seconds", type=float, default=3.0, help="Time a run works after the guard")
+    parser.add_argument("--poll", type=float, default=0.5, help="Polling interval (scaled from 10 s)")
+    return parser.parse_args()
+
+
+class Pipeline:
+    """Builds API stand-in and the agents running the queued builds."""
+
+    def __init__(self, work_seconds, fail_first_cancel=False):
+        self.work_seconds = work_seconds
+        self.fail_first_cancel = fail_first_cancel
+        self.failed_cancels = set()
+        self.lock = threading.Lock()
+        self.start = time.time()
+        self.builds = {}
+        # build id -> (queued, guard passed or None, agent released)
+        self.agents = {}
+        self.work = []
+        self.cancelled = []
+        self.outcomes = {}
+
+    def handler(self, request):
+        with self.lock:
+            if request["method"] == "PATCH":
+                build_id = int(re.search(r"/builds/(\d+)", request["path"]).group(1))
+                build = self.builds.get(build_id)
+                if build is None or build["status"] == "completed":
+                    return 400, {}, {"message": "build is not running"}
+                if self.fail_first_cancel and build_id not in self.failed_cancels:
+                    self.failed_cancels.add(build_id)
+                    return 500, {}, {"message": "internal error"}
+                # the agent job is stopped; the build then leaves the list, so
+                # its checker finds itself missing and exits
+                build["status"] = "completed"
+                self.cancelled.append(build_id)
+                self.release(build_id, time.time())
+                del self.builds[build_id]
+                return 200, {}, {"id": build_id, "status": "cancelling"}
+            value = [{"id": build_id, "buildNumber": str(build_id), "status": build["status"],
+                      "sourceBranch": BRANCH, "queueTime": "", "url": "", "requestedBy": {}}
+                     for build_id, build in sorted(self.builds.items())]
+        return 200, {}, {"value": value}
+
+    def release(self, build_id, guard_passed):
+        queued, passed, released = self.agents[build_id]
+        if released is None:
+            self.agents[build_id] = (queued, passed if guard_passed is None else guard_passed, time.time())
+
+    def queue(self, build_id):
+        with self.lock:
+            self.builds[build_id] = {"status": "inProgress"}
+            self.agents[build_id] = (time.time(), None, None)
+
+    def run_work(self, build_id):
+        """Plan and apply: hold the agent for work_seconds, then complete the build."""
+        started = time.time()
+        time.sleep(self.work_seconds)
+        with self.lock:
+            self.work.append((build_id, started, time.time()))
+            if build_id in self.builds:
+                self.builds[build_id]["status"] = "completed"
+            self.release(build_id, started)
+
+    def run_agent(self, build_id, check):
+        try:
+            check.main()
+            code = 0
+        except SystemExit as e:
+            code = e.code
+        with self.lock:
+            cancelled = build_id in self.cancelled
+            self.outcomes[build_id] = "cancelled" if cancelled else {0: "worked", check.SUPERSEDED_EXIT_CODE: "superseded"}.get(code, code)
+            if code == check.SUPERSEDED_EXIT_CODE:
+                self.builds[build_id]["status"] = "completed"
+                self.release(build_id, time.time())
+        if code == 0 and not cancelled:
+            self.run_work(build_id)
+
+
+def simulate(args, policy, pipeline, url):
+    """Queue the runs and wait until every agent is released; returns the build ids, the running one first."""
+    build_ids = [FIRST_BUILD_ID + i for i in range(args.commits + 1)]
+    checks = {}
+    for build_id in build_ids[1:]:
+        argv = ["--baseurl", url, "--organization", "hmcts", "--project", "project", "--pipelineid", "42",
+                "--buildid", str(build_id), "--pat", "pat", "--supersede", policy]
+        checks[build_id] = load_script("ado-build-check.py", argv)
+        checks[build_id].retry_time_in_seconds = args.poll
+
+    pipeline.start = time.time()
+    pipeline.queue(build_ids[0])
+    threads = [threading.Thread(target=pipeline.run_work, args=(build_ids[0],))]
+    threads[0].start()
+    for index, build_id in enumerate(build_ids[1:], 1):
+        time.sleep(max(pipeline.start + index * args.commit_interval - time.time(), 0))
+        pipeline.queue(build_id)
+        thread = threading.Thread(target=pipeline.run_agent, args=(build_id, checks[build_id]))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return build_ids
+
+
+def main():
+    args = parse_args()
+    failures = []
+    rows = []
+    waiting = {}
+    with tempfile.TemporaryDirectory() as workspace, contextlib.redirect_stdout(io.StringIO()):
+        for label, policy, fail_first_cancel in (("off", "off", False), ("exit", "exit", False),
+                                                 ("cancel", "cancel", False),
+                                                 ("cancel, first cancel fails", "cancel", True)):
+            pipeline = Pipeline(args.work_seconds, fail_first_cancel)
+            with StubServer(pipeline.handler) as ado:
+                # every agent polls the one stand-in; keep the shared budget out of the way
+                os.environ["HTTP_BUDGET_DIR"] = os.path.join(workspace, label)
+                os.environ["HTTP_BUDGET_LIMITS"] = f"{ado.url.split('//', 1)[1]}=200/50"
+                build_ids = simulate(args, policy, pipeline, ado.url)
+
+            newest = build_ids[-1]
+            waiting[label] = sum(passed - queued for build_id, (queued, passed, _) in pipeline.agents.items()
+                                  if build_id != build_ids[0])
+            agent_seconds = sum(released - queued for queued, _, released in pipeline.agents.values())
+            finished = pipeline.agents[newest][2] - pipeline.start
+            outcomes = [pipeline.outcomes.get(build_id) for build_id in build_ids[1:]]
+            counts = ", ".join(f"{outcome} {outcomes.count(outcome)}" for outcome in sorted(set(outcomes)))
+            rows.append((f"--supersede {label}", f"{waiting[label]:.1f} agent-s waiting, {agent_seconds:.1f} "
+                                                  f"agent-s in total, newest run done after {finished:.1f} s "
+                                                  f"({counts})"))
+
+            if pipeline.outcomes.get(newest) != "worked":
+                failures.append(f"{label}: the newest run did not work ({pipeline.outcomes.get(newest)})")
+            work = sorted(pipeline.work, key=lambda w: w[1])
+            for (first, _, first_end), (second, second_start, _) in zip(work, work[1:]):
+                if second_start < first_end:
+                    failures.append(f"{label}: builds {first} and {second} worked at the same time")
+            if build_ids[0] in pipeline.cancelled:
+                failures.append(f"{label}: the run past the guard was cancelled")
+            if fail_first_cancel and not pipeline.failed_cancels:
+                failures.append(f"{label}: no cancel request was made")
+            for build_id in sorted(pipeline.failed_cancels - set(pipeline.cancelled)):
+                failures.append(f"{label}: build {build_id} was not cancelled again after a failed cancel")
+        os.environ.pop("HTTP_BUDGET_LIMITS")
+
+        # a cancel request that fails to send leaves the build to a later check
+        check = load_script("ado-build-check.py", ["--baseurl", "http://127.0.0.1:9", "--organization", "hmcts",
+                                                   "--project", "project", "--pipelineid", "42",
+                                                   "--buildid", str(FIRST_BUILD_ID), "--pat", "pat"])
+        try:
+            check.cancel_builds([FIRST_BUILD_ID - 1])
+            if check.cancelled_builds:
+                failures.append(f"unsent cancel recorded as cancelled: {check.cancelled_builds}")
+        except Exception as e:
+            failures.append(f"unsent cancel raised {e!r}")
+
+    for policy in ("exit", "cancel"):
+        if waiting[policy] >= waiting["off"]:
+            failures.append(f"--supersede {policy}: {waiting[policy]:.1f} agent-s waiting, off {waiting['off']:.1f}")
+
+    report(f"ado-build-check --supersede ({args.commits} runs queued {args.commit_interval:g} s apart behind a "
+           f"running one, {args.work_seconds:g} s of work per run)", rows)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Helpers shared by the checks and benchmarks in this directory."""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+
+scripts_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_script(file_name, argv=()):
+    """Import one of the pipeline scripts as a module.
+
+    The scripts parse their arguments at import time, so ``sys.argv`` is
+    swapped for ``argv`` while the module is loaded.
+    """
+    path = os.path.join(scripts_dir, file_name)
+    # as when the script is run directly, its shared modules are importable
+    if scripts_dir not in sys.path:
+        sys.path.insert(0, scripts_dir)
+    module_name = os.path.splitext(file_name)[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    saved_argv = sys.argv
+    sys.argv = [path, *argv]
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.argv = saved_argv
+    return module
+
+
+def report(title, rows):
+    """Print ``rows`` of (label, value) pairs as an aligned table."""
+    print(title)
+    width = max((len(label) for label, _ in rows), default=0)
+    for label, value in rows:
+        print(f"  {label:<{width}}  {value}")
+
+
+fake_toolchain_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake-toolchain")
+
+DEPRECATION_MAP = """\
+terraform:
+  terraform:
+    version: 1.5.0
+    date_deadline: "2099-01-01"
+  registry.terraform.io/hashicorp/azurerm:
+    version: 3.100.0
+    date_deadline: "2099-01-01"
+"""
+
+
+def create_component_repo(root, count, overrides=None):
+    """Create ``root/components/<name>/main.tf`` for ``count`` components.
+
+    ``overrides`` maps component index to a fake-toolchain.json dict for that
+    component. Returns the component names.
+    """
+    overrides = overrides or {}
+    names = []
+    for i in range(count):
+        name = f"component-{i:04d}"
+        component_dir = os.path.join(root, "components", name)
+        os.makedirs(component_dir, exist_ok=True)
+        with open(os.path.join(component_dir, "main.tf"), "w") as f:
+            f.write('terraform {\n  backend "azurerm" {}\n}\n')
+        if i in overrides:
+            with open(os.path.join(component_dir, "fake-toolchain.json"), "w") as f:
+                json.dump(overrides[i], f)
+        names.append(name)
+    return names
+
+
+def write_deprecation_map(path, contents=DEPRECATION_MAP):
+    with open(path, "w") as f:
+        f.write(contents)
+    return path
+
+
+def run_nagger(workspace, repo_suffix, deprecation_map, toolchain_config=None, extra_args=(), extra_env=None):
+    """Run ado-terraform-nagger.py end-to-end against the fake toolchain.
+
+    Returns a dict with the exit code, wall time, output and the fake
+    toolchain invocations (one dict per subprocess).
+    """
+    from stub_servers import StubServer, slack_mappings_handler
+
+    log_path = os.path.join(workspace, "fake-toolchain.log")
+    if os.path.exists(log_path):
+        os.remove(log_path)
+    # the bot user mapping makes the nagger skip sending to Slack
+    slack_mappings = StubServer(slack_mappings_handler([{"github": "benchmark-user", "slack": "iamabotuser"}]))
+    env = {
+        **os.environ,
+        "PATH": fake_toolchain_dir + os.pathsep + os.environ.get("PATH", ""),
+        "SYSTEM_DEFAULT_WORKING_DIRECTORY": workspace,
+        "BUILD_REPO_SUFFIX": repo_suffix,
+        "BUILD_SOURCEVERSIONAUTHOR": "benchmark-user",
+        "BUILD_REPOSITORY_URI": f"https://github.com/hmcts/{repo_suffix}",
+        "FAKE_TOOLCHAIN_LOG": log_path,
+        "HOME": workspace,
+        "NAGGER_CACHE_DIR": os.path.join(workspace, ".cache"),
+        "SYSTEM_PIPELINESTARTTIME": "benchmark",
+        **(extra_env or {}),
+    }
+    env.pop("SLACK_WEBHOOK_URL", None)
+    if toolchain_config is not None:
+        config_path = os.path.join(workspace, "fake-toolchain-config.json")
+        with open(config_path, "w") as f:
+            json.dump(toolchain_config, f)
+        env["FAKE_TOOLCHAIN_CONFIG"] = config_path
+    command = [sys.executable, os.path.join(scripts_dir, "ado-terraform-nagger.py"), "-f", deprecation_map, *extra_args]
+    with slack_mappings:
+        env.setdefault("GITHUB_SLACK_MAPPINGS_URL", f"{slack_mappings.url}/slack.json")
+        start = time.perf_counter()
+        completed = subprocess.run(command, cwd=workspace, env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - start
+    invocations = []
+    if os.path.exists(log_path):
+        with open(log_path) as f:
+            invocations = [json.loads(line) for line in f if line.strip()]
+    return {
+        "returncode": completed.returncode,
+        "wall": wall,
+        "stdout": completed.stdout,
+        "stderr": completed.stderr,
+        "invocations": invocations,
+    }
@@ -0,0 +1,137 @@
+"""Scripted stand-ins for the terraform and tfswitch binaries used by the nagger.
+
+Behaviour is configured with JSON, merged in this order:
+
+1. built-in defaults (DEFAULTS below)
+2. the file named by $FAKE_TOOLCHAIN_CONFIG
+3. ``fake-toolchain.json`` in the current (component) directory
+
+Keys:
+
+- ``version``: terraform version reported, e.g. "1.5.7"
+- ``providers``: provider_selections reported once the component is initialised
+- ``legacy``: behave like terraform < 0.13 (plain-text ``version`` output)
+- ``legacy_rejects_json``: with ``legacy``, fail ``version --json`` instead
+  of ignoring the flag
+- ``init_fail``: make ``terraform init`` fail
+- ``latency``: seconds to sleep per command (a large value simulates a hang), keyed by "tfswitch",
+  "version", "init" (or "default")
+
+Every invocation, with its $TF_PLUGIN_CACHE_DIR, is appended as a JSON line
+to $FAKE_TOOLCHAIN_LOG when set.
+"""
+
+import json
+import os
+import signal
+import sys
+import time
+
+DEFAULTS = {
+    "version": "1.5.7",
+    "providers": {
+        "registry.terraform.io/hashicorp/azurerm": "3.116.0",
+        "registry.terraform.io/hashicorp/random": "3.6.2",
+    },
+    "legacy": False,
+    "legacy_rejects_json": False,
+    "init_fail": False,
+    "latency": {"default": 0},
+}
+
+
+def load_config():
+    config = dict(DEFAULTS)
+    for path in (os.getenv("FAKE_TOOLCHAIN_CONFIG"), "fake-toolchain.json"):
+        if path and os.path.isfile(path):
+            with open(path) as f:
+                overrides = json.load(f)
+            latency = {**config["latency"], **overrides.pop("latency", {})}
+            config.update(overrides)
+            config["latency"] = latency
+    return config
+
+
+def sleep_for(config, command):
+    latency = config["latency"]
+    delay = latency.get(command, latency.get("default", 0))
+    if delay:
+        time.sleep(delay)
+
+
+def log_invocation(tool, start):
+    log_path = os.getenv("FAKE_TOOLCHAIN_LOG")
+    if not log_path:
+        return
+    line = json.dumps({
+        "tool": tool,
+        "args": sys.argv[1:],
+        "cwd": os.getcwd(),
+        "plugin_cache_dir": os.getenv("TF_PLUGIN_CACHE_DIR"),
+        "pid": os.getpid(),
+        "start": start,
+        "end": time.time(),
+    })
+    fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, (line + "\n").encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+def terraform(config, argv):
+    command = argv[0] if argv else ""
+    if command == "version":
+        sleep_for(config, "version")
+        if config["legacy"] and config["legacy_rejects_json"] and len(argv) > 1:
+            print(f"flag provided but not defined: {argv[1]}", file=sys.stderr)
+            return 1
+        if config["legacy"]:
+            print(f"Terraform v{config['version']}\n\nYour version of Terraform is out of date!")
+            return 0
+        initialised = os.path.isdir(".terraform")
+        print(json.dumps({
+            "terraform_version": config["version"],
+            "platform": "linux_amd64",
+            "provider_selections": config["providers"] if initialised else {},
+            "terraform_outdated": False,
+        }, indent=2))
+        return 0
+    if command == "init":
+        sleep_for(config, "init")
+        if config["init_fail"]:
+            print("Initializing the backend...")
+            print("Error: Failed to query available provider packages", file=sys.stderr)
+            return 1
+        os.makedirs(".terraform", exist_ok=True)
+        print("Initializing the backend...\n\nTerraform has been successfully initialized!")
+        return 0
+    print(f"fake terraform: unsupported command {argv}", file=sys.stderr)
+    return 1
+
+
+def tfswitch(config, argv):
+    sleep_for(config, "tfswitch")
+    if "-b" in argv[:-1]:
+        # like tfswitch, leave a terraform binary at the requested path
+        binary_path = argv[argv.index("-b") + 1]
+        os.makedirs(os.path.dirname(binary_path), exist_ok=True)
+        fake_terraform = os.path.join(os.path.dirname(os.path.abspath(__file__)), "terraform")
+        if os.path.realpath(binary_path) != fake_terraform:
+            tmp_path = f"{binary_path}.{os.getpid()}"
+            os.symlink(fake_terraform, tmp_path)
+            os.replace(tmp_path, binary_path)
+    print(f"Switched terraform to version \"{config['version']}\"")
+    return 0
+
+
+def main(tool):
+    start = time.time()
+    # still log invocations that the caller cancels
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    config = load_config()
+    try:
+        handler = terraform if tool == "terraform" else tfswitch
+        return handler(config, sys.argv[1:])
+    finally:
+        log_invocation(tool, start)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Benchmark http_budget.py, the per-host request budget shared across processes.
+
+A local stand-in API allows --limit requests per one-second window and
+answers 429 with Retry-After beyond that, sending X-RateLimit-Remaining and
+X-RateLimit-Reset like Azure DevOps and GitHub. --processes separate
+processes then send --requests requests each, as fast as they can:
+
+- with bare requests calls
+- through http_budget with the host's limit configured (90% of the server's)
+- through http_budget with a limit far above the server's, relying on the
+  rate-limit headers
+
+The configured budget must see no 429 at all and keep at least 80% of the
+server's throughput; every budgeted request must eventually succeed, also
+when $HTTP_BUDGET_DIR cannot be written. A 503 must be retried for a GET
+but not for a POST, which the server may already have accepted.
+
+    python3 scripts/benchmarks/http-budget-benchmark.py --processes 8 --requests 40 --limit 50
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import requests
+
+from benchlib import report, scripts_dir
+from stub_servers import StubServer
+
+# imported before the client processes are forked, so they start sending at once
+sys.path.insert(0, scripts_dir)
+import http_budget
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the shared per-host HTTP request budget")
+    parser.add_argument("--processes", type=int, default=8, help="Concurrent client processes")
+    parser.add_argument("--requests", type=int, default=40, help="Requests sent by each process")
+    parser.add_argument("--limit", type=int, default=50, help="Requests per second the stand-in server allows")
+    return parser.parse_args()
+
+
+def rate_limited_handler(limit):
+    """Fixed one-second windows of `limit` requests."""
+    lock = threading.Lock()
+    window = {"start": 0, "count": 0}
+
+    def handler(request):
+        now = time.time()
+        with lock:
+            handler.times.append(now)
+            start = int(now)
+            if start != window["start"]:
+                window["start"], window["count"] = start, 0
+            window["count"] += 1
+            count = window["count"]
+        headers = {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(max(limit - count, 0)),
+            "X-RateLimit-Reset": str(start + 1),
+        }
+        if count > limit:
+            return 429, {**headers, "Retry-After": "1"}, {"message": "rate limited"}
+        return 200, headers, {"value": []}
+
+    handler.times = []
+    return handler
+
+
+def client(job):
+    """Send `count` GETs to `url` and return a Counter of status codes."""
+    mode, url, count = job
+    statuses = Counter()
+    for _ in range(count):
+        if mode == "bare":
+            statuses[requests.get(url, timeout=10).status_code] += 1
+        else:
+            statuses[http_budget.get(url, max_retries=10).status_code] += 1
+    return statuses
+
+
+def run(mode, server, processes, requests_per_process, env):
+    """Returns (final status counts, throttled requests, seconds from the first to the last request served)."""
+    times = server.handler.times
+    before = len(times)
+    os.environ.update(env)
+    with multiprocessing.get_context("fork").Pool(processes) as pool:
+        results = pool.map(client, [(mode, f"{server.url}/builds", requests_per_process)] * processes)
+    final = sum(results, Counter())
+    served = times[before:]
+    # every request the server saw that was not a final 200 was throttled
+    return final, len(served) - final[200], served[-1] - served[0]
+
+
+def main():
+    args = parse_args()
+    failures = []
+    rows = []
+    total = args.processes * args.requests
+
+    with StubServer(rate_limited_handler(args.limit)) as server, tempfile.TemporaryDirectory() as state:
+        host = server.url.split("//", 1)[1]
+        scenarios = [
+            ("bare requests", "bare", {}),
+            (f"http_budget, {args.limit * 0.9:g}/s configured", "budget",
+             {"HTTP_BUDGET_LIMITS": f"{host}={args.limit * 0.9}/1"}),
+            (f"http_budget, {args.limit * 10}/s configured (headers only)", "budget",
+             {"HTTP_BUDGET_LIMITS": f"{host}={args.limit * 10}/{args.limit}"}),
+        ]
+        for index, (label, mode, env) in enumerate(scenarios):
+            time.sleep(1.0 - time.time() % 1.0)
+            final, throttled, seconds = run(mode, server, args.processes, args.requests,
+                                            {"HTTP_BUDGET_DIR": os.path.join(state, str(index)), **env})
+            rows.append((label, f"{final[200]}/{total} ok, {throttled} x 429, {seconds:.2f} s, "
+                                f"{final[200] / seconds:.1f} ok/s"))
+            if mode == "budget" and final[200] != total:
+                failures.append(f"{label}: {total - final[200]} request(s) never succeeded")
+            if index == 1:
+                if throttled:
+                    failures.append(f"{label}: {throttled} request(s) throttled")
+                if final[200] / seconds < 0.8 * args.limit:
+                    failures.append(f"{label}: {final[200] / seconds:.1f} ok/s, below 80% of the server limit")
+
+        # a state directory that cannot be created must not stop requests
+        time.sleep(1.0 - time.time() % 1.0)
+        blocked = os.path.join(state, "not-a-directory")
+        open(blocked, "w").close()
+        final, _, _ = run("budget", server, 1, 2, {"HTTP_BUDGET_DIR": os.path.join(blocked, "budget")})
+        rows.append(("http_budget, unusable $HTTP_BUDGET_DIR", f"{final[200]}/2 ok"))
+        if final[200] != 2:
+            failures.append(f"unusable $HTTP_BUDGET_DIR: {dict(final)}")
+
+    with StubServer(lambda request: (503, {"Retry-After": "0"}, {})) as unavailable, \
+            tempfile.TemporaryDirectory() as state:
+        os.environ["HTTP_BUDGET_DIR"] = state
+        for method, expected in (("GET", 3), ("POST", 1)):
+            before = len(unavailable.requests)
+            http_budget.request(method, f"{unavailable.url}/hook", max_retries=2)
+            sent = len(unavailable.requests) - before
+            rows.append((f"503 to a {method}", f"sent {sent} time(s)"))
+            if sent != expected:
+                failures.append(f"503 to a {method}: sent {sent} time(s), expected {expected}")
+
+    report(f"http_budget ({args.processes} processes x {args.requests} requests, server limit {args.limit}/s)", rows)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Benchmark the nagger's batch mode (--repos) against one run per repository.
+
+Generates N git checkouts of M components each and analyses them with the
+fake toolchain, once with a separate nagger run per repository as the
+pipeline does today and once with a single batch run. The deprecation map
+has an exception for one repository; every batch report must hold the same
+findings as that repository's nagger_output.json. Concurrent terraform inits
+of the batch run must not share a plugin cache directory.
+
+    python3 scripts/benchmarks/nagger-batch-benchmark.py --repos 20 --components 5 --latency 0.02
+    python3 scripts/benchmarks/nagger-batch-benchmark.py --repos 20 --components 5 -- --workers 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchlib import create_component_repo, report, run_nagger, write_deprecation_map
+
+DEPRECATION_MAP = """\
+terraform:
+  terraform:
+    version: 1.6.0
+    date_deadline: "2000-01-01"
+    exceptions:
+      - repo: https://github.com/hmcts/REPO
+        date_deadline: "2099-01-01"
+  registry.terraform.io/hashicorp/azurerm:
+    version: 3.120.0
+    date_deadline: "2099-01-01"
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark nagger batch mode against one run per repository")
+    parser.add_argument("--repos", type=int, default=10, help="Number of repositories to generate")
+    parser.add_argument("--components", type=int, default=5, help="Components per repository")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per fake terraform/tfswitch call")
+    parser.add_argument("nagger_args", nargs="*", help="Extra arguments passed to both nagger modes (after --)")
+    return parser.parse_args()
+
+
+def create_checkout(root, name, components):
+    create_component_repo(root, components)
+    subprocess.run(["git", "init", "-q", root], check=True)
+    subprocess.run(["git", "-C", root, "remote", "add", "origin", f"git@github.com:hmcts/{name}.git"], check=True)
+
+
+def main():
+    args = parse_args()
+    names = [f"repo-{i:04d}" for i in range(args.repos)]
+    latency = {"latency": {"default": args.latency}}
+    failures = []
+
+    with tempfile.TemporaryDirectory() as workspace:
+        deprecation_map = write_deprecation_map(
+            f"{workspace}/nagger-versions.yaml", DEPRECATION_MAP.replace("REPO", names[0])
+        )
+        for name in names:
+            create_checkout(os.path.join(workspace, "repos", name), name, args.components)
+
+        single_wall = 0.0
+        single_subprocesses = 0
+        expected = {}
+        for name in names:
+            run = run_nagger(workspace, f"repos/{name}", deprecation_map, latency, args.nagger_args,
+                             {"BUILD_REPOSITORY_URI": f"https://github.com/hmcts/{name}"})
+            if run["returncode"] not in (0, 1):
+                print(run["stdout"], run["stderr"], sep="\n")
+                return run["returncode"]
+            single_wall += run["wall"]
+            single_subprocesses += len(run["invocations"])
+            with open(os.path.join(workspace, "nagger_output.json")) as f:
+                expected[name] = json.load(f)
+
+        report_dir = os.path.join(workspace, "reports")
+        checkouts = [os.path.join(workspace, "repos", name) for name in names]
+        batch = run_nagger(workspace, "", deprecation_map, latency,
+                           ["--repos", *checkouts, "--report-dir", report_dir, *args.nagger_args])
+        if batch["returncode"] not in (0, 1):
+            print(batch["stdout"], batch["stderr"], sep="\n")
+            return batch["returncode"]
+
+        for name in names:
+            path = os.path.join(report_dir, f"{name}.json")
+            if not os.path.exists(path):
+                failures.append(f"no batch report for {name}")
+                continue
+            with open(path) as f:
+                batch_report = json.load(f)
+            if batch_report["findings"] != expected[name]:
+                failures.append(f"{name}: batch findings differ from a single repository run")
+            if sorted(batch_report["components"]) != sorted(f"component-{i:04d}" for i in range(args.components)):
+                failures.append(f"{name}: batch report components {sorted(batch_report['components'])}")
+            if batch_report["repository"] != f"https://github.com/hmcts/{name}":
+                failures.append(f"{name}: repository recorded as {batch_report['repository']}")
+        inits = sorted((i["start"], i["end"], i["plugin_cache_dir"]) for i in batch["invocations"]
+                       if i["tool"] == "terraform" and i["args"][:1] == ["init"])
+        for n, (start, end, cache_dir) in enumerate(inits):
+            if any(other_cache == cache_dir for other_start, _, other_cache in inits[n + 1:] if other_start < end):
+                failures.append(f"concurrent terraform inits shared the plugin cache {cache_dir}")
+                break
+        if "error" in expected[names[0]]:
+            failures.append(f"the deprecation map exception for {names[0]} was not applied")
+
+    components = args.repos * args.components
+    report(
+        f"nagger batch benchmark ({args.repos} repositories x {args.components} components, latency {args.latency}s)",
+        [
+            ("one run per repository", f"{single_wall:.2f} s  ({single_subprocesses} subprocesses)"),
+            ("--repos batch run", f"{batch['wall']:.2f} s  ({len(batch['invocations'])} subprocesses)"),
+            ("time per component", f"{single_wall / components * 1000:.1f} ms -> {batch['wall'] / components * 1000:.1f} ms"),
+        ],
+    )
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
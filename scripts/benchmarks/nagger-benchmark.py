@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark of ado-terraform-nagger.py against the fake toolchain.
+
+Generates a repository with N components, runs the nagger with the scripted
+terraform/tfswitch from fake-toolchain/ on PATH and reports total wall time,
+subprocess count and time per component.
+
+    python3 scripts/benchmarks/nagger-benchmark.py --components 50 --latency 0.05
+    python3 scripts/benchmarks/nagger-benchmark.py --components 20 --hang 1 -- --workers 4 --component-timeout 5
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from collections import Counter
+
+from benchlib import create_component_repo, report, run_nagger, write_deprecation_map
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the terraform nagger against a fake toolchain")
+    parser.add_argument("--components", type=int, default=20, help="Number of components to generate")
+    parser.add_argument("--latency", type=float, default=0.0, help="Default seconds per fake terraform/tfswitch call")
+    parser.add_argument("--init-latency", type=float, default=None, help="Seconds per fake terraform init (defaults to --latency)")
+    parser.add_argument("--init-failures", type=int, default=0, help="Number of components whose init fails")
+    parser.add_argument("--legacy", type=int, default=0, help="Number of components on terraform < 0.13")
+    parser.add_argument("--hang", type=int, default=0, help="Number of components whose init hangs for an hour")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs; the fastest is reported")
+    parser.add_argument("--json", dest="json_output", help="Also write results to this JSON file")
+    parser.add_argument("nagger_args", nargs="*", help="Extra arguments passed to the nagger (after --)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    overrides = {}
+    for i in range(args.init_failures):
+        overrides[i] = {"init_fail": True}
+    for i in range(args.init_failures, args.init_failures + args.legacy):
+        overrides[i] = {"legacy": True, "version": "0.12.31"}
+    first_hang = args.init_failures + args.legacy
+    for i in range(first_hang, first_hang + args.hang):
+        overrides[i] = {"latency": {"init": 3600}}
+    latency = {"default": args.latency}
+    if args.init_latency is not None:
+        latency["init"] = args.init_latency
+
+    runs = []
+    with tempfile.TemporaryDirectory() as workspace:
+        components = create_component_repo(f"{workspace}/repo", args.components, overrides)
+        deprecation_map = write_deprecation_map(f"{workspace}/nagger-versions.yaml")
+        for _ in range(args.repeat):
+            run = run_nagger(workspace, "repo", deprecation_map, {"latency": latency}, args.nagger_args)
+            if run["returncode"] not in (0, 1):
+                print(run["stdout"], run["stderr"], sep="\n")
+                return run["returncode"]
+            runs.append(run)
+
+    best = min(runs, key=lambda r: r["wall"])
+    by_command = Counter(
+        f"{i['tool']} {i['args'][0]}" if i["tool"] == "terraform" else i["tool"] for i in best["invocations"]
+    )
+    subprocesses = len(best["invocations"])
+    results = {
+        "components": len(components),
+        "wall_seconds": round(best["wall"], 3),
+        "seconds_per_component": round(best["wall"] / max(len(components), 1), 4),
+        "subprocesses": subprocesses,
+        "subprocesses_per_component": round(subprocesses / max(len(components), 1), 2),
+        "subprocesses_by_command": dict(by_command),
+        "exit_code": best["returncode"],
+        "timed_out_components": best["stdout"].count("Terraform analysis did not finish"),
+    }
+    report(
+        f"nagger benchmark ({len(components)} components, latency {args.latency}s, best of {args.repeat})",
+        [
+            ("wall time", f"{results['wall_seconds']:.3f} s"),
+            ("time per component", f"{results['seconds_per_component'] * 1000:.1f} ms"),
+            ("subprocesses", subprocesses),
+            ("subprocesses per component", results["subprocesses_per_component"]),
+            *((f"  {command}", count) for command, count in sorted(by_command.items())),
+            ("timed out components", results["timed_out_components"]),
+            ("nagger exit code", best["returncode"]),
+        ],
+    )
+    if args.json_output:
+        with open(args.json_output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Benchmark the nagger's component discovery on a large synthetic monorepo.
+
+Generates a checkout of --directories directories: components/<group>/<name>/
+with a few .tf and other files, two local module directories, and a hidden
+.terraform directory each. The listdir / isdir / fnmatch loop the nagger
+used before, one level deep per group, is timed against one os.scandir walk
+two levels deep. Then one level deep on a flat directory of --flat-entries
+components, the layout most repositories have, including a hidden
+component directory as the old loop found.
+
+The scandir walk must find the same components as the old loop and must not
+be slower than it.
+
+    python3 scripts/benchmarks/nagger-discovery-benchmark.py --directories 10000
+"""
+
+import argparse
+import fnmatch
+import os
+import sys
+import tempfile
+import time
+
+from benchlib import load_script, report
+
+TF_FILES = ("main.tf", "variables.tf", "outputs.tf", "providers.tf")
+OTHER_FILES = ("README.md", "terraform.tfvars.json", ".terraform.lock.hcl")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark nagger component discovery")
+    parser.add_argument("--directories", type=int, default=10000, help="Directories in the generated checkout")
+    parser.add_argument("--groups", type=int, default=50, help="Component groups (nested layout)")
+    parser.add_argument("--flat-entries", type=int, default=2000, help="Components in the flat directory")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the fastest is used")
+    return parser.parse_args()
+
+
+def legacy_discovery(working_directory):
+    """The pre-scandir discovery loop: one level, a listdir per child."""
+    return sorted([child_dir for child_dir in os.listdir(working_directory)
+                   if os.path.isdir(os.path.join(working_directory, child_dir))
+                   and any(fnmatch.fnmatch(file_name, '*.tf')
+                           for file_name in os.listdir(os.path.join(working_directory, child_dir)))])
+
+
+def create_monorepo(root, directories, groups):
+    """components/<group>/<component>/{modules/a,modules/b,.terraform}; returns the component paths."""
+    # per component: itself, modules, modules/a, modules/b, .terraform
+    count = max((directories - 1 - groups) // 5, 1)
+    components = []
+    for i in range(count):
+        component = os.path.join(f"group-{i % groups:03d}", f"component-{i:05d}")
+        path = os.path.join(root, "components", component)
+        for subdir in ("modules/a", "modules/b", ".terraform"):
+            os.makedirs(os.path.join(path, subdir))
+        for name in TF_FILES + OTHER_FILES:
+            open(os.path.join(path, name), "w").close()
+        for module in ("a", "b"):
+            open(os.path.join(path, "modules", module, "main.tf"), "w").close()
+        components.append(component)
+    return sorted(components)
+
+
+def create_flat_repo(root, entries):
+    """entries component directories side by side (one hidden), a README and a hidden directory."""
+    names = [f"component-{i:05d}" for i in range(entries - 1)] + [".hidden-component"]
+    for name in names:
+        path = os.path.join(root, name)
+        os.makedirs(os.path.join(path, ".terraform"))
+        for file_name in TF_FILES + OTHER_FILES:
+            open(os.path.join(path, file_name), "w").close()
+    os.makedirs(os.path.join(root, ".github"))
+    open(os.path.join(root, "README.md"), "w").close()
+    return sorted(names)
+
+
+def fastest(repeat, fn):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    args = parse_args()
+    failures = []
+    rows = []
+    nagger = load_script("ado-terraform-nagger.py", ["-f", "unused.yaml"])
+
+    with tempfile.TemporaryDirectory() as workspace:
+        components = create_monorepo(os.path.join(workspace, "repo"), args.directories, args.groups)
+        components_dir = os.path.join(workspace, "repo", "components")
+        directory_count = sum(len(dirs) for _, dirs, _ in os.walk(components_dir)) + 1
+
+        # one level deep: the groups, which hold no .tf files; compare on a group
+        group_dir = os.path.join(components_dir, "group-000")
+        legacy_group = legacy_discovery(group_dir)
+        if nagger.discover_components(group_dir, 1) != legacy_group:
+            failures.append("scandir discovery differs from the listdir loop one level deep")
+
+        legacy_seconds, _ = fastest(args.repeat, lambda: [legacy_discovery(os.path.join(components_dir, g))
+                                                          for g in sorted(os.listdir(components_dir))])
+        cold_seconds, found = fastest(args.repeat, lambda: nagger.discover_components(components_dir, 2))
+        if found != components:
+            failures.append(f"nested discovery found {len(found)} components, expected {len(components)}")
+
+        flat_dir = os.path.join(workspace, "flat")
+        flat_components = create_flat_repo(flat_dir, args.flat_entries)
+        flat_legacy_seconds, found = fastest(args.repeat, lambda: legacy_discovery(flat_dir))
+        if found != flat_components:
+            failures.append("the listdir loop found different components in the flat directory")
+        flat_cold_seconds, found = fastest(args.repeat, lambda: nagger.discover_components(flat_dir, 1))
+        if found != flat_components:
+            failures.append("scandir discovery differs from the listdir loop in the flat directory")
+
+    rows = [
+        ("directories / components", f"{directory_count} / {len(components)} in {args.groups} groups"),
+        ("listdir + isdir + fnmatch, per group", f"{legacy_seconds * 1000:.1f} ms"),
+        ("scandir walk, depth 2", f"{cold_seconds * 1000:.1f} ms ({legacy_seconds / cold_seconds:.1f}x)"),
+        (f"flat, {args.flat_entries} components: listdir loop", f"{flat_legacy_seconds * 1000:.1f} ms"),
+        ("flat: scandir walk, depth 1",
+         f"{flat_cold_seconds * 1000:.1f} ms ({flat_legacy_seconds / flat_cold_seconds:.1f}x)"),
+    ]
+    for label, seconds, baseline in (("scandir walk, depth 2", cold_seconds, legacy_seconds),
+                                     ("scandir walk, flat", flat_cold_seconds, flat_legacy_seconds)):
+        if seconds > baseline:
+            failures.append(f"{label} took {seconds * 1000:.1f} ms, the listdir loop {baseline * 1000:.1f} ms")
+
+    report(f"nagger component discovery (fastest of {args.repeat})", rows)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Regression check for the number of subprocesses the nagger starts per component.
+
+Runs the nagger against the fake toolchain with one component of each kind and
+fails if any component needs more terraform/tfswitch invocations than expected,
+if terraform init runs for terraform below 0.13, or if the count the nagger
+reports differs from what the toolchain saw.
+
+    python3 scripts/benchmarks/nagger-subprocess-check.py
+"""
+
+import os
+import re
+import sys
+import tempfile
+from collections import Counter
+
+from benchlib import create_component_repo, report, run_nagger, write_deprecation_map
+
+# component kind -> (fake-toolchain.json, expected invocations)
+# tfswitch, terraform init and one terraform version --json; terraform
+# below 0.13 is recognised from the version tfswitch selected and needs
+# neither init nor version
+CASES = {
+    "current": ({}, 3),
+    "init failure": ({"init_fail": True}, 3),
+    "below 0.13": ({"legacy": True, "version": "0.12.31"}, 1),
+    "below 0.13, --json rejected": ({"legacy": True, "legacy_rejects_json": True, "version": "0.11.14"}, 1),
+}
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as workspace:
+        overrides = {i: config for i, (config, _) in enumerate(CASES.values())}
+        components = create_component_repo(f"{workspace}/repo", len(CASES), overrides)
+        deprecation_map = write_deprecation_map(f"{workspace}/nagger-versions.yaml")
+        run = run_nagger(workspace, "repo", deprecation_map)
+
+    if run["returncode"] not in (0, 1):
+        print(run["stdout"], run["stderr"], sep="\n")
+        return run["returncode"]
+
+    per_component = Counter(os.path.basename(i["cwd"]) for i in run["invocations"])
+    rows = []
+    for component, (kind, (_, expected)) in zip(components, CASES.items()):
+        actual = per_component[component]
+        rows.append((kind, f"{actual} (expected {expected})"))
+        if actual > expected:
+            failures.append(f"{kind}: {actual} subprocesses, expected at most {expected}")
+
+    reported = re.search(r"Ran (\d+) subprocess\(es\)", run["stdout"])
+    if not reported or int(reported.group(1)) != len(run["invocations"]):
+        failures.append(
+            f"nagger reported {reported.group(1) if reported else 'no'} subprocesses, "
+            f"fake toolchain saw {len(run['invocations'])}"
+        )
+    legacy = {component for component, config in zip(components, CASES.values()) if config[0].get("legacy")}
+    legacy_inits = [i for i in run["invocations"]
+                    if os.path.basename(i["cwd"]) in legacy and i["tool"] == "terraform" and i["args"][:1] == ["init"]]
+    if legacy_inits:
+        failures.append(f"terraform init ran {len(legacy_inits)} time(s) for terraform below 0.13")
+    for version in ("0.12.31", "0.11.14"):
+        if f"Detected terraform version {version} does not support" not in run["stdout"]:
+            failures.append(f"terraform {version} was not reported as below 0.13")
+
+    report("nagger subprocesses per component", rows)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
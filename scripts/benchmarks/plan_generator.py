@@ -0,0 +1,131 @@
+"""Synthetic terraform plans (terraform show -json) for the tfplan-parser benchmarks."""
+
+import bz2
+import gzip
+import json
+import lzma
+import os
+import random
+
+ENVIRONMENTS = ("sbox", "ithc", "demo", "perftest", "aat", "prod")
+
+# codec name -> (file suffix, opener)
+COMPRESSION = {
+    "none": ("", open),
+    "gzip": (".gz", gzip.open),
+    "bz2": (".bz2", bz2.open),
+    "xz": (".xz", lzma.open),
+}
+
+# share of resource changes per action; the remainder are updates. "list-insert"
+# updates insert one element at the front of long lists.
+DEFAULT_MIX = {"no-op": 0.9, "read": 0.04, "create": 0.02, "delete": 0.01, "list-insert": 0.0}
+
+
+def resource_attributes(rng, index, module):
+    """A web-app-like attribute tree with tags, nested blocks, lists and secrets."""
+    return {
+        "id": f"/subscriptions/0000/resourceGroups/{module}-rg/providers/Microsoft.Web/sites/app-{index}",
+        "name": f"app-{index}",
+        "location": "uksouth",
+        "resource_group_name": f"{module}-rg",
+        "https_only": True,
+        "app_settings": {f"SETTING_{i}": f"value-{index}-{i}" for i in range(8)},
+        "site_config": [{
+            "always_on": True,
+            "minimum_tls_version": "1.2",
+            "ip_restriction": [
+                {"name": f"rule-{i}", "priority": 100 + i, "action": "Allow", "ip_address": f"10.0.{i}.0/24"}
+                for i in range(rng.randint(2, 6))
+            ],
+        }],
+        "connection_string": [{"name": "db", "type": "PostgreSQL", "value": f"Server=db-{index};Password=secret"}],
+        "tags": {"environment": "sbox", "application": module, "builtFrom": "https://github.com/hmcts/example"},
+    }
+
+
+def resource_change(rng, index, action, module_count=20):
+    module = f"module-{index % module_count}"
+    attrs = resource_attributes(rng, index, module)
+    before, after = attrs, json.loads(json.dumps(attrs))
+    if action == "create":
+        before = None
+    elif action == "delete":
+        after = None
+    elif action == "read":
+        before = None
+    elif action == "list-insert":
+        # a long rule list and address list, each with one element inserted at the front
+        before["site_config"][0]["ip_restriction"] = [
+            {"name": f"rule-{i}", "priority": 100 + i, "action": "Allow", "ip_address": f"10.{i}.0.0/24"}
+            for i in range(40)
+        ]
+        before["ip_addresses"] = [f"10.{i}.0.1" for i in range(40)]
+        after = json.loads(json.dumps(before))
+        after["site_config"][0]["ip_restriction"].insert(0, {"name": "rule-new", "priority": 99, "action": "Deny",
+                                                              "ip_address": "10.255.0.0/24"})
+        after["ip_addresses"].insert(0, "10.255.0.1")
+    elif action == "update":
+        if rng.random() < 0.5:
+            after["tags"]["environment"] = "sandbox"
+        else:
+            after["app_settings"]["SETTING_0"] = "changed"
+            after["site_config"][0]["minimum_tls_version"] = "1.3"
+    actions = {"no-op": ["no-op"], "read": ["read"], "create": ["create"], "delete": ["delete"]}.get(action, ["update"])
+    sensitive = {"connection_string": [{"value": True}], "app_settings": {}}
+    return {
+        "address": f'module.{module}.azurerm_linux_web_app.this["app-{index}"]',
+        "module_address": f"module.{module}",
+        "mode": "data" if action == "read" else "managed",
+        "type": "azurerm_linux_web_app",
+        "name": "this",
+        "index": f"app-{index}",
+        "change": {
+            "actions": actions,
+            "before": before,
+            "after": after,
+            "after_unknown": {"id": True} if action == "create" else {},
+            "before_sensitive": sensitive if before is not None else False,
+            "after_sensitive": sensitive if after is not None else False,
+        },
+    }
+
+
+def generate_plan(resources, mix=None, seed=0):
+    """Return a terraform show -json document with ``resources`` resource changes."""
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    changes = []
+    for index in range(resources):
+        roll, action = rng.random(), "update"
+        for name, share in mix.items():
+            if roll < share:
+                action = name
+                break
+            roll -= share
+        changes.append(resource_change(rng, index, action))
+    return {"format_version": "1.2", "terraform_version": "1.5.7", "resource_changes": changes}
+
+
+def render_plan(plan, layout="document"):
+    """Plan text as terraform show -json ("document") or as the pipeline's
+    jq '.resource_changes[]' output ("concatenated")."""
+    if layout == "concatenated":
+        return "\n".join(json.dumps(rc, indent=2) for rc in plan["resource_changes"]) + "\n"
+    return json.dumps(plan)
+
+
+def write_plans(plans_dir, resources, stages=("network",), environments=ENVIRONMENTS, mix=None, seed=0,
+                compression="none", layout="document"):
+    """Write tfplan-<env>-<stage>.json[.gz|.bz2|.xz] files; every environment gets the same plan for a stage."""
+    suffix, opener = COMPRESSION[compression]
+    os.makedirs(plans_dir, exist_ok=True)
+    paths = []
+    for stage_index, stage in enumerate(stages):
+        plan = render_plan(generate_plan(resources, mix, seed + stage_index), layout)
+        for env in environments:
+            path = os.path.join(plans_dir, f"tfplan-{env}-{stage}.json{suffix}")
+            with opener(path, "wt") as f:
+                f.write(plan)
+            paths.append(path)
+    return paths
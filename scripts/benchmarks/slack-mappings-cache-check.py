@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Check the nagger's cached GitHub -> Slack mapping store against a local stand-in.
+
+Covers the first download, ETag revalidation (304), fallback to the cached
+copy when the server is slow or failing, and lookup cost of the dict index.
+
+    python3 scripts/benchmarks/slack-mappings-cache-check.py
+"""
+
+import sys
+import tempfile
+import time
+
+import requests
+
+from benchlib import load_script, report
+from stub_servers import StubServer, slack_mappings_handler
+
+USER_COUNT = 5000
+
+
+def main():
+    nagger = load_script("ado-terraform-nagger.py", ["-f", "unused.yaml"])
+    users = [{"github": f"user-{i}", "slack": f"U{i:08d}"} for i in range(USER_COUNT)]
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with StubServer(slack_mappings_handler(users)) as server:
+            url = f"{server.url}/slack.json"
+            first = nagger.get_hmcts_github_slack_user_mappings(url, cache_dir, timeout=2)
+            check(first["users"] == users, "first fetch did not return the served mappings")
+            check("If-None-Match" not in server.requests[0]["headers"], "first fetch sent If-None-Match without a cache")
+
+            second = nagger.get_hmcts_github_slack_user_mappings(url, cache_dir, timeout=2)
+            check(second == first, "revalidated fetch returned different mappings")
+            check(server.requests[1]["headers"].get("If-None-Match") == '"v1"', "revalidation did not send the cached ETag")
+
+        with StubServer(lambda request: (503, {}, b"unavailable")) as server:
+            fallback = nagger.get_hmcts_github_slack_user_mappings(f"{server.url}/slack.json", cache_dir, timeout=2)
+            check(fallback == first, "server error did not fall back to the cached copy")
+
+        with StubServer(slack_mappings_handler(users), delay=2) as server:
+            start = time.perf_counter()
+            slow = nagger.get_hmcts_github_slack_user_mappings(f"{server.url}/slack.json", cache_dir, timeout=0.2)
+            slow_wait = time.perf_counter() - start
+            check(slow == first, "slow server did not fall back to the cached copy")
+            check(slow_wait < 1.5, f"slow server was waited on for {slow_wait:.2f}s")
+
+    with tempfile.TemporaryDirectory() as empty_cache_dir:
+        with StubServer(lambda request: (503, {}, b"unavailable")) as server:
+            try:
+                nagger.get_hmcts_github_slack_user_mappings(f"{server.url}/slack.json", empty_cache_dir, timeout=2)
+                failures.append("server error without a cached copy did not raise")
+            except requests.exceptions.RequestException:
+                pass
+
+    lookups = [f"user-{i}" for i in range(USER_COUNT - 100, USER_COUNT)] + ["missing-user"]
+    def linear_lookup(github_id):
+        # the lookup before the index: the first entry for the GitHub ID wins
+        return next((user["slack"] for user in first["users"] if user["github"] == github_id), None)
+
+    start = time.perf_counter()
+    expected = [linear_lookup(github_id) for github_id in lookups]
+    linear = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = nagger.index_github_slack_user_mappings(first)
+    actual = [nagger.get_github_slack_user_mapping(index, github_id) for github_id in lookups]
+    indexed = time.perf_counter() - start
+    check(actual == expected, "index lookups differ from the unindexed mappings")
+
+    report(
+        f"slack mapping lookups ({len(lookups)} lookups, {USER_COUNT} users)",
+        [
+            ("linear scan per lookup", f"{linear * 1000:.2f} ms"),
+            ("index build + lookups", f"{indexed * 1000:.2f} ms"),
+            ("slow server fallback", f"{slow_wait * 1000:.0f} ms"),
+        ],
+    )
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
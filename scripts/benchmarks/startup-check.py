@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Regression check: interpreter startup cost of the pipeline Python scripts.
+
+Every pipeline step starts a fresh interpreter, so each script is measured
+two ways:
+
+- imports: the time ``python -X importtime`` attributes to the modules the
+  script imports at startup (``--help``, nothing else runs)
+- no-op run: wall time of a run with nothing to do (no repositories, the
+  build first in the queue, no plans), above a bare ``python -c pass``
+
+The fastest of --repeat runs is used. BUDGETS are multiples of the time a
+bare ``python -c pass`` takes on the same machine, so they hold on slower
+agents; --budget-scale loosens or tightens them all.
+
+    python3 scripts/benchmarks/startup-check.py
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchlib import report, scripts_dir, write_deprecation_map
+from stub_servers import StubServer
+
+BUILD_ID = 100
+
+# script -> (imports, no-op run above the interpreter), in multiples of python -c pass
+BUDGETS = {
+    "ado-terraform-nagger.py": (0.6, 2.5),
+    "ado-build-check.py": (0.6, 4.0),
+    "tfplan-parser.py": (0.6, 2.0),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check the startup cost of the pipeline scripts")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the fastest is used")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every budget by this factor")
+    return parser.parse_args()
+
+
+def import_times(script, argv):
+    """(total ms, [(ms, module)] heaviest first) of the top-level imports made after site."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", os.path.join(scripts_dir, script), *argv],
+                               capture_output=True, text=True)
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("  "):
+            continue
+        name = name.strip()
+        if name == "site":
+            modules = []
+            continue
+        modules.append((int(cumulative) / 1000, name))
+    return sum(ms for ms, _ in modules), sorted(modules, reverse=True)
+
+
+def wall_ms(command, env):
+    start = time.perf_counter()
+    subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def builds_handler(request):
+    """Azure DevOps builds API stand-in: the current build is first in the queue."""
+    return 200, {}, {"value": [{"id": BUILD_ID, "buildNumber": "1", "status": "inProgress", "queueTime": "",
+                                "url": "", "requestedBy": {}}]}
+
+
+def main():
+    args = parse_args()
+    failures = []
+    rows = []
+    with tempfile.TemporaryDirectory() as workspace, StubServer(builds_handler) as ado:
+        env = {**os.environ, "HOME": workspace, "NAGGER_CACHE_DIR": os.path.join(workspace, ".cache"),
+               "HTTP_BUDGET_DIR": os.path.join(workspace, "http-budget")}
+        repos_file = os.path.join(workspace, "repos.txt")
+        open(repos_file, "w").close()
+        os.makedirs(os.path.join(workspace, "plans"))
+        no_op_runs = {
+            "ado-terraform-nagger.py": ["-f", write_deprecation_map(os.path.join(workspace, "nagger-versions.yaml")),
+                                        "--repos-file", repos_file, "--report-dir", os.path.join(workspace, "reports")],
+            "ado-build-check.py": ["--baseurl", ado.url, "--organization", "hmcts", "--project", "project",
+                                   "--pipelineid", "1", "--buildid", str(BUILD_ID), "--pat", "pat"],
+            "tfplan-parser.py": ["--plansDir", os.path.join(workspace, "plans"),
+                                 "--outputDir", os.path.join(workspace, "html")],
+        }
+
+        interpreter = min(wall_ms([sys.executable, "-c", "pass"], env) for _ in range(args.repeat))
+        rows.append(("python -c pass", f"{interpreter:.1f} ms"))
+        for script, argv in no_op_runs.items():
+            command = [sys.executable, os.path.join(scripts_dir, script), *argv]
+            import_ms, heaviest = min(import_times(script, ["--help"]) for _ in range(args.repeat))
+            run_ms = min(wall_ms(command, env) for _ in range(args.repeat)) - interpreter
+            import_budget, run_budget = (budget * args.budget_scale * interpreter for budget in BUDGETS[script])
+            heaviest = ", ".join(f"{name} {ms:.1f}" for ms, name in heaviest[:3])
+            rows.append((f"{script} imports", f"{import_ms:.1f} ms (budget {import_budget:.1f})  [{heaviest}]"))
+            rows.append((f"{script} no-op run", f"+{run_ms:.1f} ms (budget {run_budget:.1f})"))
+            if import_ms > import_budget:
+                failures.append(f"{script}: imports take {import_ms:.1f} ms, budget {import_budget:.1f} ms")
+            if run_ms > run_budget:
+                failures.append(f"{script}: no-op run takes {run_ms:.1f} ms over the interpreter, budget {run_budget:.1f} ms")
+
+    report(f"pipeline script startup (fastest of {args.repeat})", rows)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
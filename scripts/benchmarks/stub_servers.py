@@ -0,0 +1,90 @@
+"""Local HTTP stand-ins for the services the pipeline scripts talk to.
+
+Each stand-in runs on 127.0.0.1 on a free port in a background thread and
+records the requests it received, so checks and benchmarks can run without
+network access.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer:
+    """Serve responses produced by ``handler(request)`` on a local port.
+
+    ``handler`` receives a dict with ``method``, ``path``, ``headers`` and
+    ``body`` and returns ``(status, headers, body)`` where body is bytes, str
+    or a JSON-serialisable object.
+    """
+
+    def __init__(self, handler, delay=0):
+        self.handler = handler
+        self.delay = delay
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = {
+                    "method": self.command,
+                    "path": self.path,
+                    "headers": dict(self.headers),
+                    "body": self.rfile.read(length) if length else b"",
+                }
+                with stub._lock:
+                    stub.requests.append(request)
+                if stub.delay:
+                    time.sleep(stub.delay)
+                status, headers, body = stub.handler(request)
+                if not isinstance(body, (bytes, str)):
+                    body = json.dumps(body)
+                    headers = {"Content-Type": "application/json", **headers}
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    if body and status != 304:
+                        self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            do_GET = do_POST = do_PATCH = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def slack_mappings_handler(users, etag='"v1"'):
+    """raw.githubusercontent.com stand-in serving slack.json with ETag support."""
+
+    def handler(request):
+        if request["headers"].get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag}, {"users": users}
+
+    return handler
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Benchmark tfplan-parser.py --deltaReport on consecutive analyses of a pull request.
+
+For each size in --resources, generated plans are analysed once, then again
+after a push that changes, removes and adds --edits resource changes per
+plan. The second run compares its rows with the first run's
+plan-summaries.json. plan-delta.html must list exactly the edited rows.
+The delta step (hashing the rows, comparing, writing plan-delta.html and
+plan-summaries.json, delta_seconds in plan-profile.json) must stay linear:
+its time per row at the largest size may be at most --max-growth times that
+at the smallest.
+
+    python3 scripts/benchmarks/tfplan-delta-benchmark.py --resources 5000,20000 --edits 25
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from benchlib import report, scripts_dir
+from plan_generator import ENVIRONMENTS, generate_plan, render_plan, resource_change
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the tfplan-parser.py delta report")
+    parser.add_argument("--resources", default="5000,20000", help="Comma separated resource changes per plan file")
+    parser.add_argument("--environments", default=",".join(ENVIRONMENTS[:2]), help="Comma separated environments")
+    parser.add_argument("--edits", type=int, default=25, help="Resource changes changed, removed and added per plan")
+    parser.add_argument("--max-growth", type=float, default=2.0,
+                        help="Fail if the delta time per row grows more than this from the smallest size")
+    parser.add_argument("--script", default=os.path.join(scripts_dir, "tfplan-parser.py"), help="tfplan-parser.py to run")
+    return parser.parse_args()
+
+
+def push(plan, edits, seed=1):
+    """The plan after a push: `edits` no-op changes become updates, `edits` are gone and `edits` are new."""
+    rng = random.Random(seed)
+    changes = json.loads(json.dumps(plan["resource_changes"]))
+    no_ops = [rc for rc in changes if rc["change"]["actions"] == ["no-op"]]
+    for index, rc in enumerate(rng.sample(no_ops, 2 * edits)):
+        if index < edits:
+            rc["change"]["actions"] = ["update"]
+            rc["change"]["after"]["tags"]["environment"] = "changed"
+        else:
+            changes.remove(rc)
+    changes += [resource_change(rng, len(changes) + 1000000 + i, "create") for i in range(edits)]
+    return {**plan, "resource_changes": changes}
+
+
+def write_plans(plans_dir, plan, environments):
+    os.makedirs(plans_dir, exist_ok=True)
+    text = render_plan(plan)
+    for env in environments:
+        with open(os.path.join(plans_dir, f"tfplan-{env}-network.json"), "w") as f:
+            f.write(text)
+
+
+def run_parser(script, plans_dir, output_dir, extra_args=()):
+    command = [sys.executable, script, "--plansDir", plans_dir, "--outputDir", output_dir,
+               "--deltaReport", "--profile", *extra_args]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{completed.stdout}{completed.stderr}")
+    with open(os.path.join(output_dir, "plan-profile.json")) as f:
+        return json.load(f)["delta_seconds"]
+
+
+def main():
+    args = parse_args()
+    environments = args.environments.split(",")
+    failures = []
+    rows = []
+    per_row = {}
+    with tempfile.TemporaryDirectory() as workspace:
+        for resources in (int(r) for r in args.resources.split(",")):
+            base = os.path.join(workspace, str(resources))
+            plan = generate_plan(resources)
+            write_plans(os.path.join(base, "plans-1"), plan, environments)
+            run_parser(args.script, os.path.join(base, "plans-1"), os.path.join(base, "out-1"))
+            write_plans(os.path.join(base, "plans-2"), push(plan, args.edits), environments)
+            delta_seconds = run_parser(args.script, os.path.join(base, "plans-2"), os.path.join(base, "out-2"),
+                                       ["--previousSummaries", os.path.join(base, "out-1", "plan-summaries.json")])
+
+            with open(os.path.join(base, "out-2", "plan-delta.html")) as f:
+                delta_html = f.read()
+            counts = {status: delta_html.count(f" ({status}") for status in ("added", "changed", "removed")}
+            expected = args.edits * len(environments)
+            if counts != dict.fromkeys(counts, expected):
+                failures.append(f"{resources} resources: delta rows {counts}, expected {expected} of each")
+            row_count = resources * len(environments)
+            per_row[resources] = delta_seconds / row_count
+            rows.append((f"{resources} resources x {len(environments)} envs",
+                         f"delta {delta_seconds * 1000:.1f} ms ({per_row[resources] * 1e6:.2f} us/row), "
+                         f"added/changed/removed {counts['added']}/{counts['changed']}/{counts['removed']}, "
+                         f"plan-delta.html {len(delta_html) / 1024:.0f} KiB"))
+
+    smallest, largest = min(per_row), max(per_row)
+    growth = per_row[largest] / per_row[smallest]
+    rows.append(("per-row time growth", f"{growth:.2f}x from {smallest} to {largest} resources"))
+    if growth > args.max_growth:
+        failures.append(f"delta time per row grew {growth:.2f}x from {smallest} to {largest} resources")
+
+    report(f"tfplan-parser --deltaReport ({args.edits} edits of each kind per plan)", rows)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Benchmark tfplan-parser.py's attribute diff cache (--diffCacheSize) on fanned-out plans.
+
+A for_each module deploys --instances copies of a set of resources that
+differ only in their name, index and id. The plan updates, replaces,
+creates and destroys instances the same way across the fan-out. Each plan
+is parsed without the cache (the default) and with --diffCacheSize 4096,
+once per --listDiff mode, taking the fastest of --repeat runs. The same
+runs are repeated on a generated plan without fan-out, to show the cost on
+plans the cache cannot help.
+
+The reports must be identical with and without the cache. The fan-out plan
+must summarise at least --min-speedup times faster.
+
+    python3 scripts/benchmarks/tfplan-diff-cache-benchmark.py --instances 3000
+"""
+
+import argparse
+import copy
+import filecmp
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchlib import report, scripts_dir
+from plan_generator import generate_plan, render_plan
+
+# share of the fan-out per action
+FANOUT_MIX = (("update", 0.6), ("replace", 0.1), ("create", 0.15), ("delete", 0.05), ("no-op", 0.1))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the tfplan-parser.py attribute diff cache")
+    parser.add_argument("--instances", type=int, default=3000, help="for_each instances in the fan-out plan")
+    parser.add_argument("--min-speedup", type=float, default=1.3,
+                        help="Fail if the fan-out plan does not summarise this much faster with the cache")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is used")
+    parser.add_argument("--script", default=os.path.join(scripts_dir, "tfplan-parser.py"), help="tfplan-parser.py to run")
+    return parser.parse_args()
+
+
+def instance_attributes(name):
+    """A key vault secret-heavy web app, identical across instances apart from name and id."""
+    return {
+        "id": f"/subscriptions/0000/resourceGroups/shared-rg/providers/Microsoft.Web/sites/{name}",
+        "name": name,
+        "location": "uksouth",
+        "resource_group_name": "shared-rg",
+        "https_only": True,
+        "app_settings": {f"SETTING_{i}": f"value-{i}" for i in range(12)},
+        "site_config": [{
+            "always_on": True,
+            "minimum_tls_version": "1.2",
+            "ip_restriction": [{"name": f"rule-{i}", "priority": 100 + i, "action": "Allow",
+                                "ip_address": f"10.0.{i}.0/24"} for i in range(8)],
+        }],
+        "connection_string": [{"name": "db", "type": "PostgreSQL", "value": "Server=db;Password=secret"}],
+        "identity": [{"type": "SystemAssigned", "identity_ids": []}],
+        "tags": {"environment": "aat", "application": "fanout", "builtFrom": "https://github.com/hmcts/example"},
+    }
+
+
+def fanout_plan(instances):
+    changes = []
+    sensitive = {"connection_string": [{"value": True}], "app_settings": {}}
+    bounds, total = [], 0.0
+    for action, share in FANOUT_MIX:
+        total += share
+        bounds.append((total * instances, action))
+    for index in range(instances):
+        action = next(a for bound, a in bounds if index < bound)
+        name = f"app-{index:05d}"
+        before = instance_attributes(name)
+        after = copy.deepcopy(before)
+        actions = {"replace": ["delete", "create"]}.get(action, [action])
+        if action in ("update", "replace"):
+            after["tags"]["environment"] = "aat-2"
+            after["app_settings"]["SETTING_0"] = "changed"
+            after["site_config"][0]["minimum_tls_version"] = "1.3"
+            after["site_config"][0]["ip_restriction"].insert(0, {"name": "rule-new", "priority": 99,
+                                                                 "action": "Deny", "ip_address": "10.255.0.0/24"})
+            after["connection_string"][0]["value"] = "Server=db;Password=rotated"
+        if action == "replace":
+            after["location"] = "ukwest"
+        if action == "create":
+            before = None
+        elif action == "delete":
+            after = None
+        changes.append({
+            "address": f'module.apps["{name}"].azurerm_linux_web_app.this',
+            "module_address": f'module.apps["{name}"]',
+            "mode": "managed",
+            "type": "azurerm_linux_web_app",
+            "name": "this",
+            "change": {
+                "actions": actions,
+                "before": before,
+                "after": after,
+                "after_unknown": {"id": True} if before is None else {},
+                "before_sensitive": sensitive if before is not None else False,
+                "after_sensitive": sensitive if after is not None else False,
+            },
+        })
+    return {"format_version": "1.2", "terraform_version": "1.5.7", "resource_changes": changes}
+
+
+def run_parser(script, plans_dir, output_dir, extra_args):
+    command = [sys.executable, script, "--plansDir", plans_dir, "--outputDir", output_dir, "--profile", *extra_args]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{completed.stdout}{completed.stderr}")
+    with open(os.path.join(output_dir, "plan-profile.json")) as f:
+        profile = json.load(f)
+    return sum(p["summarise_seconds"] for p in profile["files"]), profile["diff_cache_hit_rate"]
+
+
+def main():
+    args = parse_args()
+    failures = []
+    rows = []
+    plans = {
+        f"fan-out, {args.instances} instances": fanout_plan(args.instances),
+        f"generated, {args.instances} resources, 50% changed": generate_plan(
+            args.instances, {"no-op": 0.5, "read": 0.0, "create": 0.1, "delete": 0.05}),
+    }
+    with tempfile.TemporaryDirectory() as workspace:
+        for plan_index, (label, plan) in enumerate(plans.items()):
+            plans_dir = os.path.join(workspace, f"plans-{plan_index}")
+            os.makedirs(plans_dir)
+            with open(os.path.join(plans_dir, "tfplan-aat-apps.json"), "w") as f:
+                f.write(render_plan(plan))
+            for mode in ("keyed", "index"):
+                outputs = {}
+                timings = {}
+                for cache in ("0", "4096"):
+                    outputs[cache] = os.path.join(workspace, f"out-{plan_index}-{mode}-{cache}")
+                    timings[cache] = min(run_parser(args.script, plans_dir, outputs[cache],
+                                                    ["--listDiff", mode, "--diffCacheSize", cache])
+                                         for _ in range(args.repeat))
+                (uncached, _), (cached, hit_rate) = timings["0"], timings["4096"]
+                speedup = uncached / cached
+                rows.append((f"{label}, --listDiff {mode}",
+                             f"summarise {uncached:.2f} s -> {cached:.2f} s ({speedup:.1f}x), "
+                             f"hit rate {hit_rate:.1%}"))
+                if not filecmp.cmp(os.path.join(outputs["0"], "plan.html"),
+                                   os.path.join(outputs["4096"], "plan.html"), shallow=False):
+                    failures.append(f"{label}, --listDiff {mode}: report differs with the diff cache")
+                if plan_index == 0 and speedup < args.min_speedup:
+                    failures.append(f"{label}, --listDiff {mode}: {speedup:.2f}x, expected {args.min_speedup:g}x")
+
+    report("tfplan-parser attribute diff cache (--diffCacheSize 0 -> 4096)", rows)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Benchmark tfplan-parser.py --ignoreRules on plans full of provider-computed churn.
+
+A generated plan (plan_generator.py) is given the computed attributes a
+provider reports for a web app: an etag and a site_config[0].linux_fx_version
+that change on every update, outbound IP addresses that become known only
+after apply, the lists of outbound IP addresses the app may use, and a
+default hostname, domain verification id and deployment credentials that
+are unknown on create. Updates also change a timeouts block, which is
+configuration rather than computed. It is parsed without rules and with the
+shipped scripts/tfplan-ignore-rules.json, with the attribute diff cache off
+and on, taking the fastest of --repeat runs.
+
+With the rules no diff line may show a computed attribute. Updates must
+keep every other line, in order. The parser must report the pruned paths.
+With the diff cache off, it must summarise faster with the rules. With the
+cache on, repeated diffs are already cheap, so pruning may cost at most
+--max-overhead times the time without rules.
+
+    python3 scripts/benchmarks/tfplan-ignore-rules-benchmark.py --resources 20000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchlib import load_script, report, scripts_dir
+from plan_generator import generate_plan, render_plan
+
+# names in every diff path of the computed attributes added below
+COMPUTED = ("etag", "linux_fx_version", "outbound_ip_address", "default_hostname", "site_credential",
+            "custom_domain_verification_id")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark tfplan-parser.py --ignoreRules")
+    parser.add_argument("--resources", type=int, default=20000, help="Resource changes in the plan")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is used")
+    parser.add_argument("--max-overhead", type=float, default=1.15,
+                        help="Fail if the rules slow summarising with the diff cache by more than this factor")
+    parser.add_argument("--rules", default=os.path.join(scripts_dir, "tfplan-ignore-rules.json"),
+                        help="--ignoreRules file to benchmark")
+    parser.add_argument("--script", default=os.path.join(scripts_dir, "tfplan-parser.py"), help="tfplan-parser.py to run")
+    return parser.parse_args()
+
+
+def add_computed_attributes(plan):
+    """Add provider-computed attributes to each change, as terraform show -json reports them."""
+    for index, rc in enumerate(plan["resource_changes"]):
+        change = rc["change"]
+        before, after, actions = change["before"], change["after"], change["actions"]
+        ips = [f"20.{index % 250}.0.{i}" for i in range(6)]
+        possible_ips = ips + [f"20.{index % 250}.1.{i}" for i in range(24)]
+        for side in (before, after):
+            if side is not None:
+                side.update({"etag": f'W/"{index}-0"', "outbound_ip_addresses": ",".join(ips),
+                             "outbound_ip_address_list": ips, "possible_outbound_ip_addresses": ",".join(possible_ips),
+                             "possible_outbound_ip_address_list": possible_ips,
+                             "custom_domain_verification_id": f"{index:064x}",
+                             "default_hostname": f"app-{index}.azurewebsites.net",
+                             "site_credential": [{"name": f"$app-{index}", "password": "generated"}]})
+                side["site_config"][0]["linux_fx_version"] = "DOCKER|hmcts/app:1"
+                side["timeouts"] = {"create": "30m", "update": "30m"}
+        if actions == ["update"]:
+            # set in configuration; the rules must leave it in the diff
+            after["timeouts"] = {"create": "30m", "update": "60m"}
+            after["etag"] = f'W/"{index}-1"'
+            after["site_config"][0]["linux_fx_version"] = "DOCKER|hmcts/app:2"
+            # known only after apply: left out of after, marked in after_unknown
+            del after["outbound_ip_addresses"]
+            change["after_unknown"] = {"outbound_ip_addresses": True}
+        elif actions == ["create"]:
+            unknown = ("id", "default_hostname", "site_credential", "custom_domain_verification_id",
+                       "outbound_ip_addresses", "outbound_ip_address_list", "possible_outbound_ip_addresses",
+                       "possible_outbound_ip_address_list")
+            for name in unknown:
+                del after[name]
+            change["after_unknown"] = dict.fromkeys(unknown, True)
+    return plan
+
+
+def run_parser(script, plans_dir, output_dir, extra_args):
+    command = [sys.executable, script, "--plansDir", plans_dir, "--outputDir", output_dir, "--profile", *extra_args]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{completed.stdout}{completed.stderr}")
+    with open(os.path.join(output_dir, "plan-profile.json")) as f:
+        profile = json.load(f)
+    files = profile["files"]
+    return (sum(p["summarise_seconds"] for p in files), sum(p["diff_lines"] for p in files),
+            profile.get("pruned_paths"))
+
+
+def main():
+    args = parse_args()
+    failures = []
+    rows = []
+    plan = add_computed_attributes(generate_plan(args.resources, {"no-op": 0.5, "read": 0.0, "create": 0.1,
+                                                                  "delete": 0.05}))
+    with tempfile.TemporaryDirectory() as workspace:
+        plans_dir = os.path.join(workspace, "plans")
+        os.makedirs(plans_dir)
+        with open(os.path.join(plans_dir, "tfplan-aat-apps.json"), "w") as f:
+            f.write(render_plan(plan))
+
+        results = {}
+        for cache in ("0", "4096"):
+            for rules in (False, True):
+                output_dir = os.path.join(workspace, f"out-{len(results)}")
+                extra_args = ["--diffCacheSize", cache] + (["--ignoreRules", args.rules] if rules else [])
+                results[cache, rules] = min(run_parser(args.script, plans_dir, output_dir, extra_args)
+                                            for _ in range(args.repeat))
+                seconds, diff_lines, pruned = results[cache, rules]
+                rows.append((f"--diffCacheSize {cache}, " + ("--ignoreRules" if rules else "no rules"),
+                             f"summarise {seconds:.2f} s, {diff_lines} diff lines"
+                             + (f", {pruned} paths pruned" if pruned is not None else "")))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            plain = load_script("tfplan-parser.py", ["--plansDir", workspace, "--outputDir", workspace])
+            ruled = load_script("tfplan-parser.py", ["--plansDir", workspace, "--outputDir", workspace,
+                                                     "--ignoreRules", args.rules])
+
+    computed_lines = 0
+    for rc in plan["resource_changes"]:
+        without_rules = [path for path, _, _ in plain.summarize_resource_change(rc).diff_items]
+        with_rules = [path for path, _, _ in ruled.summarize_resource_change(rc).diff_items]
+        computed_lines += sum(1 for path in without_rules if any(name in path for name in COMPUTED))
+        if any(name in path for path in with_rules for name in COMPUTED):
+            failures.append(f"{rc['address']}: computed attribute left in {with_rules}")
+        kept = [path for path in without_rules if not any(name in path for name in COMPUTED)]
+        if rc["change"]["actions"] == ["update"] and with_rules != kept:
+            failures.append(f"{rc['address']}: reported {with_rules}, expected {kept}")
+    rows.append(("computed attribute lines without rules", str(computed_lines)))
+    if not computed_lines:
+        failures.append("the plan has no computed attribute lines to prune")
+
+    for cache, limit in (("0", 1.0), ("4096", args.max_overhead)):
+        (plain_seconds, _, _), (ruled_seconds, _, pruned) = results[cache, False], results[cache, True]
+        if not pruned:
+            failures.append(f"--diffCacheSize {cache}: plan-profile.json reports {pruned} pruned paths")
+        if ruled_seconds > plain_seconds * limit:
+            failures.append(f"--diffCacheSize {cache}: --ignoreRules summarised in {ruled_seconds:.2f} s, "
+                            f"{plain_seconds:.2f} s without")
+
+    report(f"tfplan-parser --ignoreRules ({args.resources} resource changes, fastest of {args.repeat})", rows)
+    for failure in failures[:10]:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Check that every installed tfplan-parser JSON backend produces identical summaries.
+
+Plans are decoded and summarised with each available --jsonBackend, covering
+terraform show -json documents, concatenated resource change objects,
+compressed files and the inputs only the tolerant brace-balance fallback can
+read. Summaries and the generated plan.html must match the stdlib backend.
+
+    python3 scripts/benchmarks/tfplan-json-backend-check.py
+"""
+
+import contextlib
+import gzip
+import io
+import os
+import sys
+import tempfile
+
+from benchlib import load_script, report
+from plan_generator import render_plan, generate_plan, write_plans
+
+RC = '{{"address": "{address}", "change": {{"actions": ["update"], "before": {{"v": {before}}}, "after": {{"v": {after}}}}}}}'
+
+# file name -> contents of plans the generator does not produce
+EDGE_CASES = {
+    "tfplan-sbox-empty.json": "",
+    "tfplan-sbox-list.json": "[" + RC.format(address="a.list", before=1, after=2) + "]",
+    "tfplan-sbox-single.json": RC.format(address="a.single", before=1, after=2),
+    "tfplan-sbox-noise.json": "log line\n" + RC.format(address="a.one", before=1, after=2)
+                              + "\nmore noise\n" + RC.format(address="a.two", before=1, after=3),
+    "tfplan-sbox-braces.json": RC.format(address="a.brace", before='"${var"', after='"}{"')
+                               + "\n" + RC.format(address="a.after", before=1, after=2),
+    "tfplan-sbox-bigint.json": RC.format(address="a.bigint", before=2 ** 70, after=2 ** 64),
+    "tfplan-sbox-nan.json": RC.format(address="a.nan", before="NaN", after=1.5),
+    "tfplan-sbox-unicode.json": RC.format(address="a.unicode", before='"caf\\u00e9 \\ud83d\\ude00"', after='"\\u2603"'),
+    "tfplan-sbox-broken.json": RC.format(address="a.broken", before=1, after=2)[:-5] + "\n"
+                               + RC.format(address="a.whole", before=1, after=2),
+}
+
+
+def write_cases(plans_dir):
+    write_plans(plans_dir, 300, ("network",), ("aat",), layout="concatenated")
+    write_plans(plans_dir, 300, ("app",), ("prod",), seed=5)
+    write_plans(plans_dir, 300, ("app",), ("ithc",), seed=7, compression="gzip", layout="concatenated")
+    for name, text in EDGE_CASES.items():
+        with open(os.path.join(plans_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+    with open(os.path.join(plans_dir, "tfplan-sbox-invalid-utf8.json"), "wb") as f:
+        f.write(RC.format(address="a.bytes", before='"\xff"', after='"ok"').encode("latin-1"))
+    with gzip.open(os.path.join(plans_dir, "tfplan-demo-full.json.gz"), "wt") as f:
+        plan = generate_plan(50, seed=9)
+        plan["planned_values"] = {"root_module": {"resources": [{"address": "x", "values": {"a": [1, 2]}}]}}
+        f.write(render_plan(plan))
+
+
+def summarise(backend, plans_dir, output_dir):
+    """Return ({file: summary text}, plan.html) for one backend."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = load_script("tfplan-parser.py", [
+            "--plansDir", plans_dir, "--outputDir", output_dir, "--jsonBackend", backend,
+        ])
+    summaries = {}
+    for name in sorted(os.listdir(plans_dir)):
+        rc_list = parser.load_plan_file(os.path.join(plans_dir, name))["resource_changes"]
+        summaries[name] = parser.build_json_summary_text(
+            [parser.summarize_resource_change(rc, noop_details=True) for rc in rc_list]
+        )
+    with open(os.path.join(output_dir, "plan.html"), encoding="utf-8") as f:
+        return summaries, f.read(), parser.json_backend.name
+
+
+def backend_names():
+    """Names of the backends tfplan-parser.py knows about, installed or not."""
+    with tempfile.TemporaryDirectory() as empty:
+        with contextlib.redirect_stdout(io.StringIO()):
+            parser = load_script("tfplan-parser.py", ["--plansDir", empty, "--outputDir", empty, "--jsonBackend", "json"])
+    return list(parser.JSON_BACKENDS)
+
+
+def main():
+    failures = []
+    rows = []
+    with tempfile.TemporaryDirectory() as workspace:
+        plans_dir = os.path.join(workspace, "plans")
+        write_cases(plans_dir)
+        expected, expected_html, _ = summarise("json", plans_dir, os.path.join(workspace, "out-json"))
+        for backend in backend_names():
+            try:
+                summaries, html, name = summarise(backend, plans_dir, os.path.join(workspace, f"out-{backend}"))
+            except SystemExit:
+                rows.append((backend, "not installed, skipped"))
+                continue
+            mismatched = [f for f in expected if summaries.get(f) != expected[f]]
+            failures.extend(f"{name}: summaries of {f} differ from the stdlib backend" for f in mismatched)
+            if html != expected_html:
+                failures.append(f"{name}: plan.html differs from the stdlib backend")
+            rows.append((name, f"{len(expected) - len(mismatched)}/{len(expected)} plan files identical"))
+
+    report("tfplan-parser JSON backend conformance", rows)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Check tfplan-parser's keyed list diffing (--listDiff keyed) against index mode.
+
+An element inserted at the front of a list must be reported once rather than
+as a change to every later index, sensitive values must stay masked when
+elements move, and the cost of diffing a long list should follow the size of
+the change.
+
+    python3 scripts/benchmarks/tfplan-list-diff-check.py
+"""
+
+import contextlib
+import copy
+import io
+import sys
+import tempfile
+import time
+
+from benchlib import load_script, report
+
+RULES = 500
+
+
+def rules(count):
+    return [{"name": f"rule-{i}", "priority": 100 + i, "ip_address": f"10.{i % 250}.{i // 250}.0/24"} for i in range(count)]
+
+
+def resource_change(before, after, before_sensitive=None, after_sensitive=None):
+    return {
+        "address": "azurerm_network_security_group.this",
+        "change": {
+            "actions": ["update"],
+            "before": before,
+            "after": after,
+            "before_sensitive": before_sensitive or {},
+            "after_sensitive": after_sensitive or {},
+        },
+    }
+
+
+def main():
+    with tempfile.TemporaryDirectory() as empty, contextlib.redirect_stdout(io.StringIO()):
+        # the timings diff one change repeatedly, which the diff cache would answer
+        parser = load_script("tfplan-parser.py", ["--plansDir", empty, "--outputDir", empty, "--diffCacheSize", "0"])
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+
+    def diff_paths(rc, mode):
+        return [path for path, _, _ in parser.summarize_resource_change(rc, list_diff=mode).diff_items]
+
+    # insertion at the front of a list of named objects and of a list of scalars
+    before = {"security_rule": rules(RULES), "addresses": [f"10.0.0.{i}" for i in range(40)]}
+    after = copy.deepcopy(before)
+    after["security_rule"].insert(0, {"name": "rule-new", "priority": 99, "ip_address": "10.255.0.0/24"})
+    after["addresses"].insert(0, "10.0.1.1")
+    insert = resource_change(before, after)
+    keyed = diff_paths(insert, "keyed")
+    check(keyed == ["addresses[0]", "security_rule[name=rule-new].ip_address",
+                    "security_rule[name=rule-new].name", "security_rule[name=rule-new].priority"],
+          f"keyed diff of an insertion reported {keyed}")
+    index = diff_paths(insert, "index")
+    check(len(index) == 25, f"index mode no longer reports the shifted elements ({len(index)} diffs)")
+
+    # reordering by identity is not a change; a changed attribute is
+    reordered = copy.deepcopy(before)
+    reordered["security_rule"].reverse()
+    reordered["security_rule"][0]["priority"] = 1
+    keyed = diff_paths(resource_change(before, reordered), "keyed")
+    check(keyed == [f"security_rule[name=rule-{RULES - 1}].priority"], f"keyed diff of a reordered list reported {keyed}")
+
+    # removal from a list of objects without identity attributes
+    blocks = [{"origins": [f"https://{i}.example"]} for i in range(5)]
+    keyed = diff_paths(resource_change({"cors": blocks}, {"cors": blocks[:1] + blocks[2:]}), "keyed")
+    check(keyed == ["cors[1].origins[0]"], f"keyed diff of a removed block reported {keyed}")
+
+    # a sensitive attribute marked by list position stays masked after its element moves
+    settings = [{"name": "a", "conn": "plain"}, {"name": "b", "conn": "hunter2"}]
+    moved = [{"name": "new", "conn": "plain"}] + copy.deepcopy(settings)
+    moved[2]["conn"] = "hunter3"
+    items = parser.summarize_resource_change(resource_change(
+        {"settings": settings}, {"settings": moved},
+        {"settings": [{}, {"conn": True}]}, {"settings": [{}, {}, {"conn": True}]},
+    )).diff_items
+    check(("settings[name=b].conn", "*******", "*******") in items, f"sensitive value unmasked after a move: {items}")
+    check(not any("hunter" in value for item in items for value in item), f"sensitive value leaked: {items}")
+
+    # a sensitive identity attribute is not shown in the path; elements are paired by position instead
+    named = [{"name": "S3cr3tNameA", "port": 1}, {"name": "S3cr3tNameB", "port": 2}]
+    renamed = copy.deepcopy(named)
+    renamed[0]["port"] = 5
+    marked = {"rule": [{"name": True}, {"name": True}]}
+    items = parser.summarize_resource_change(resource_change({"rule": named}, {"rule": renamed}, marked, marked)).diff_items
+    check([path for path, _, _ in items] == ["rule[0].port"], f"diff of a list with sensitive names reported {items}")
+    check(not any("S3cr3t" in value for item in items for value in item), f"sensitive identity leaked: {items}")
+
+    timings = []
+    for mode in ("index", "keyed"):
+        start = time.perf_counter()
+        for _ in range(20):
+            parser.summarize_resource_change(insert, list_diff=mode)
+        timings.append((f"{mode} ({RULES} rules, one inserted)", f"{(time.perf_counter() - start) / 20 * 1000:.2f} ms per resource"))
+
+    report("tfplan-parser list diffing", timings)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
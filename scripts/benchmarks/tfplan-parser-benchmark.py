@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Benchmark tfplan-parser.py end-to-end on generated plans.
+
+Each --variant runs the parser with extra arguments against the same plans,
+written once per --compress codec; the fastest of --repeat runs is reported
+along with the report size.
+
+    python3 scripts/benchmarks/tfplan-parser-benchmark.py --resources 20000 \\
+        --variant default= --variant noop-details=--noopDetails
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchlib import report, scripts_dir
+from plan_generator import COMPRESSION, DEFAULT_MIX, ENVIRONMENTS, write_plans
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark tfplan-parser.py on generated plans")
+    parser.add_argument("--resources", type=int, default=5000, help="Resource changes per plan file")
+    parser.add_argument("--stages", default="network", help="Comma separated stage names")
+    parser.add_argument("--environments", default=",".join(ENVIRONMENTS), help="Comma separated environments")
+    parser.add_argument("--noop-ratio", type=float, default=DEFAULT_MIX["no-op"], help="Share of no-op resource changes")
+    parser.add_argument("--read-ratio", type=float, default=DEFAULT_MIX["read"], help="Share of read resource changes")
+    parser.add_argument("--list-insert-ratio", type=float, default=DEFAULT_MIX["list-insert"],
+                        help="Share of updates that insert an element at the front of long lists")
+    parser.add_argument("--compress", default="none",
+                        help=f"Comma separated plan file codecs to compare ({', '.join(COMPRESSION)})")
+    parser.add_argument("--layout", choices=("document", "concatenated"), default="document",
+                        help="terraform show -json documents or concatenated resource change objects")
+    parser.add_argument("--variant", action="append", default=[],
+                        help="NAME=ARGS parser arguments to benchmark (repeatable, default: default=)")
+    parser.add_argument("--script", default=os.path.join(scripts_dir, "tfplan-parser.py"),
+                        help="tfplan-parser.py to run, e.g. a copy from another revision")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant; the fastest is reported")
+    parser.add_argument("--json", dest="json_output", help="Also write results to this JSON file")
+    return parser.parse_args()
+
+
+def run_parser(script, plans_dir, output_dir, extra_args):
+    """Run the parser once and return (wall seconds, peak RSS in MB)."""
+    command = [sys.executable, script, "--plansDir", plans_dir, "--outputDir", output_dir, *extra_args]
+    with tempfile.TemporaryFile() as output:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=output, stderr=subprocess.STDOUT)
+        # wait4 gives the resource usage of this run alone
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode != 0:
+            output.seek(0)
+            raise RuntimeError(f"{' '.join(command)} failed:\n{output.read().decode()}")
+    return wall, usage.ru_maxrss / 1024
+
+
+def output_size(output_dir):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(output_dir) for name in names
+    )
+
+
+def main():
+    args = parse_args()
+    variants = [v.split("=", 1) for v in (args.variant or ["default="])]
+    mix = {**DEFAULT_MIX, "no-op": args.noop_ratio, "read": args.read_ratio, "list-insert": args.list_insert_ratio}
+    results = {}
+    with tempfile.TemporaryDirectory() as workspace:
+        for codec in args.compress.split(","):
+            plans_dir = os.path.join(workspace, f"plans-{codec}")
+            plan_files = write_plans(plans_dir, args.resources, args.stages.split(","), args.environments.split(","),
+                                     mix, compression=codec, layout=args.layout)
+            plan_bytes = sum(os.path.getsize(p) for p in plan_files)
+            for name, extra in variants:
+                label = name if codec == "none" else f"{name}/{codec}"
+                output_dir = os.path.join(workspace, f"out-{label.replace('/', '-')}")
+                runs = [run_parser(args.script, plans_dir, output_dir, shlex.split(extra)) for _ in range(args.repeat)]
+                results[label] = {
+                    "args": extra,
+                    "codec": codec,
+                    "input_bytes": plan_bytes,
+                    "wall_seconds": round(min(wall for wall, _ in runs), 3),
+                    "peak_rss_mb": round(max(rss for _, rss in runs), 1),
+                    "output_bytes": output_size(output_dir),
+                }
+
+    baseline = next(iter(results.values()))["wall_seconds"]
+    report(
+        f"tfplan-parser benchmark ({len(plan_files)} {args.layout} plan files x {args.resources} resource changes, "
+        f"no-op {args.noop_ratio:.0%}, best of {args.repeat})",
+        [
+            (f"{name} [{r['args']}]",
+             f"{r['wall_seconds']:.3f} s  ({baseline / r['wall_seconds']:.2f}x)  "
+             f"input {r['input_bytes'] / 1e6:.1f} MB  "
+             f"peak RSS {r['peak_rss_mb']:.0f} MB  output {r['output_bytes'] / 1e3:.0f} kB")
+            for name, r in results.items()
+        ],
+    )
+    if args.json_output:
+        with open(args.json_output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
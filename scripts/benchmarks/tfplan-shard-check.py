@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Check tfplan-parser.py --shardReport shard names for stages that sanitise alike.
+
+Plans for stages "a b" and "a_b" both sanitise to the shard name a_b-dev.
+Each must get its own shard file holding only its own rows, and the plan.html
+index must link each file once. A second run into the same output directory
+must keep the names the first run gave, as shards from earlier runs are kept.
+
+    python3 scripts/benchmarks/tfplan-shard-check.py
+"""
+
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+
+from benchlib import load_script, report
+
+RC = '{{"address": "{address}", "change": {{"actions": ["update"], "before": {{"v": 1}}, "after": {{"v": 2}}}}}}'
+
+# plan file -> resource address in it
+PLANS = {
+    "tfplan-dev-a b.json": "azurerm_resource_group.spaced",
+    "tfplan-dev-a_b.json": "azurerm_resource_group.underscored",
+}
+
+
+def run_parser(plans_dir, output_dir):
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_script("tfplan-parser.py", ["--plansDir", plans_dir, "--outputDir", output_dir, "--shardReport"])
+    with open(os.path.join(output_dir, "plan.html"), encoding="utf-8") as f:
+        links = re.findall(r'href="shards/([^"]+)\.html"', f.read())
+    shards = {}
+    for name in links:
+        with open(os.path.join(output_dir, "shards", f"{name}.html"), encoding="utf-8") as f:
+            html = f.read()
+        shards[name] = [address for address in PLANS.values() if address in html]
+    return links, shards
+
+
+def main():
+    failures = []
+    rows = []
+    with tempfile.TemporaryDirectory() as workspace:
+        plans_dir = os.path.join(workspace, "plans")
+        output_dir = os.path.join(workspace, "out")
+        os.makedirs(plans_dir)
+        for file_name, address in PLANS.items():
+            with open(os.path.join(plans_dir, file_name), "w", encoding="utf-8") as f:
+                f.write(RC.format(address=address))
+
+        links, shards = run_parser(plans_dir, output_dir)
+        rows.append(("first run", ", ".join(f"{name}: {shards[name]}" for name in links)))
+        if len(links) != len(set(links)):
+            failures.append(f"the index links a shard more than once: {links}")
+        if sorted(address for found in shards.values() for address in found) != sorted(PLANS.values()) \
+                or any(len(found) != 1 for found in shards.values()):
+            failures.append(f"shards do not hold one stage each: {shards}")
+
+        # the second run only has the plan whose shard got the suffixed name
+        suffixed = next((name for name, found in shards.items() if name != "a_b-dev"), None)
+        kept = next((name for name in PLANS if suffixed and PLANS[name] in shards[suffixed]), None)
+        for file_name in PLANS:
+            if file_name != kept:
+                os.remove(os.path.join(plans_dir, file_name))
+        again, shards_again = run_parser(plans_dir, output_dir)
+        rows.append(("second run, one plan", ", ".join(f"{name}: {shards_again[name]}" for name in again)))
+        if shards_again != shards:
+            failures.append(f"the second run changed the shards from {shards} to {shards_again}")
+
+    report("tfplan-parser --shardReport names", rows)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark the tfplan-parser --summaryDb SQLite index and tfplan-summary-query.py lookups.
+
+Fills a database with --rows synthetic resource changes over --runs parser
+runs using the parser's own bulk writer, then times the query CLI's lookups.
+Fails if the median address lookup takes a millisecond or more.
+
+    python3 scripts/benchmarks/tfplan-summary-db-benchmark.py --rows 2000000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchlib import load_script, report
+
+STAGES = ("network", "app", "dns", "frontdoor", "storage", "monitoring")
+ENVIRONMENTS = ("sbox", "ithc", "demo", "perftest", "aat", "prod")
+CHANGE_TYPES = ("create", "update", "update", "update", "delete")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the plan summary SQLite database")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Resource changes to insert")
+    parser.add_argument("--runs", type=int, default=500, help="Parser runs (pull requests) to spread them over")
+    parser.add_argument("--addresses", type=int, default=50_000, help="Distinct resource addresses")
+    parser.add_argument("--lookups", type=int, default=500, help="Lookups to time per query")
+    return parser.parse_args()
+
+
+def timed(queries):
+    """Run each zero-argument query and return the per-query times in ms."""
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        query()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as workspace, contextlib.redirect_stdout(io.StringIO()):
+        tfplan_parser = load_script("tfplan-parser.py", ["--plansDir", workspace, "--outputDir", workspace])
+    summary_query = load_script("tfplan-summary-query.py")
+    addresses = [f"module.module-{i % 200}.azurerm_linux_web_app.this[\"app-{i}\"]" for i in range(args.addresses)]
+    rows_per_run = args.rows // args.runs
+
+    with tempfile.TemporaryDirectory() as workspace:
+        db_path = os.path.join(workspace, "summaries.db")
+        insert_seconds = 0.0
+        for run in range(args.runs):
+            records = []
+            for _ in range(rows_per_run):
+                address = rng.choice(addresses)
+                prefix, name = address.split(".azurerm", 1)
+                tags_only = rng.random() < 0.3
+                diff_items = (("tags.environment", "sbox", "sandbox"),) if tags_only else (("site_config[0].always_on", "False", "True"),)
+                summary = tfplan_parser.ResourceSummary(prefix + ".", "azurerm" + name, ("update",), rng.choice(CHANGE_TYPES),
+                                                        tags_only, diff_items)
+                records.append((rng.choice(STAGES), rng.choice(ENVIRONMENTS), summary))
+            start = time.perf_counter()
+            tfplan_parser.write_summary_db(db_path, "hmcts/example", str(1000 + run), str(run), records)
+            insert_seconds += time.perf_counter() - start
+        db_mb = os.path.getsize(db_path) / 1e6
+
+        conn = summary_query.connect(db_path)
+        sample = rng.sample(addresses, min(args.lookups, len(addresses)))
+        address_ms = timed(lambda a=a: summary_query.query_address(conn, a, limit=20) for a in sample)
+        prefix_ms = timed(lambda i=i: summary_query.query_address(conn, f"module.module-{i}.azurerm_linux_web_app.this[\"app-{i}", prefix=True, limit=20)
+                          for i in range(min(args.lookups, 200)))
+        # every change of a run, so this grows with the run size rather than the database
+        pull_request_ms = timed(lambda r=r: summary_query.query_pull_request(conn, "hmcts/example", str(1000 + r))
+                                for r in rng.sample(range(args.runs), min(args.lookups, args.runs)))
+        tags_only_ms = timed(lambda s=s: summary_query.query_tags_only(conn, s) for s in STAGES)
+        conn.close()
+
+    def summary(times):
+        return f"median {statistics.median(times):.3f} ms  max {max(times):.3f} ms"
+
+    total_rows = rows_per_run * args.runs
+    report(
+        f"plan summary database ({total_rows:,} rows, {args.runs} runs, {args.addresses:,} addresses, {db_mb:.0f} MB)",
+        [
+            ("bulk insert", f"{insert_seconds:.1f} s  ({total_rows / insert_seconds:,.0f} rows/s, "
+                            f"{insert_seconds / args.runs * 1000:.0f} ms per {rows_per_run:,}-row run)"),
+            ("address lookup", summary(address_ms)),
+            ("address prefix lookup", summary(prefix_ms)),
+            ("pull request (latest run)", summary(pull_request_ms)),
+            ("tags-only churn per stage", summary(tags_only_ms)),
+        ],
+    )
+    if statistics.median(address_ms) >= 1.0:
+        print("FAIL: median address lookup took a millisecond or more")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Benchmark tfplan-parser.py --watch against parsing after the download.
+
+A stand-in for the blob download writes generated plans into the plans
+directory in chunks at --download-mbps, in place like azcopy, then creates
+the done file. The parser runs once after the download and once with
+--watch alongside it; both reports must be identical.
+
+    python3 scripts/benchmarks/tfplan-watch-benchmark.py --resources 5000 --download-mbps 40
+"""
+
+import argparse
+import filecmp
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchlib import report, scripts_dir
+from plan_generator import ENVIRONMENTS, generate_plan, render_plan
+
+CHUNK_BYTES = 256 * 1024
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark tfplan-parser.py --watch against a simulated download")
+    parser.add_argument("--resources", type=int, default=5000, help="Resource changes per plan file")
+    parser.add_argument("--stages", default="network,app", help="Comma separated stage names")
+    parser.add_argument("--environments", default=",".join(ENVIRONMENTS[:3]), help="Comma separated environments")
+    parser.add_argument("--download-mbps", type=float, default=40, help="Simulated download throughput in MB/s")
+    parser.add_argument("--stall", type=float, default=0,
+                        help="Pause this many seconds halfway through the first file, to exercise re-parsing")
+    parser.add_argument("--script", default=os.path.join(scripts_dir, "tfplan-parser.py"), help="tfplan-parser.py to run")
+    return parser.parse_args()
+
+
+def download(plans, plans_dir, mbps, stall=0):
+    """Write plans ({file name: text}) chunk by chunk at mbps, then the done file."""
+    os.makedirs(plans_dir, exist_ok=True)
+    seconds_per_chunk = CHUNK_BYTES / (mbps * 1e6)
+    for index, (name, text) in enumerate(plans.items()):
+        data = text.encode()
+        with open(os.path.join(plans_dir, name), "wb") as f:
+            for offset in range(0, len(data), CHUNK_BYTES):
+                f.write(data[offset:offset + CHUNK_BYTES])
+                f.flush()
+                if index == 0 and stall and offset <= len(data) // 2 < offset + CHUNK_BYTES:
+                    time.sleep(stall)
+                time.sleep(seconds_per_chunk)
+    open(os.path.join(plans_dir, ".download-complete"), "w").close()
+
+
+def run_parser(script, plans_dir, output_dir, extra_args=()):
+    command = [sys.executable, script, "--plansDir", plans_dir, "--outputDir", output_dir, *extra_args]
+    return subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+
+def wait(process):
+    output, _ = process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"{' '.join(process.args)} failed:\n{output}")
+    return output
+
+
+def main():
+    args = parse_args()
+    plans = {}
+    for stage_index, stage in enumerate(args.stages.split(",")):
+        text = render_plan(generate_plan(args.resources, seed=stage_index))
+        for env in args.environments.split(","):
+            plans[f"tfplan-{env}-{stage}.json"] = text
+    plan_bytes = sum(len(text) for text in plans.values())
+
+    with tempfile.TemporaryDirectory() as workspace:
+        sequential_dir = os.path.join(workspace, "sequential")
+        start = time.perf_counter()
+        download(plans, sequential_dir, args.download_mbps, args.stall)
+        download_seconds = time.perf_counter() - start
+        os.remove(os.path.join(sequential_dir, ".download-complete"))
+        parse_start = time.perf_counter()
+        wait(run_parser(args.script, sequential_dir, os.path.join(workspace, "out-sequential")))
+        parse_seconds = time.perf_counter() - parse_start
+        sequential_seconds = time.perf_counter() - start
+
+        watch_dir = os.path.join(workspace, "watch")
+        os.makedirs(watch_dir)
+        start = time.perf_counter()
+        parser = run_parser(args.script, watch_dir, os.path.join(workspace, "out-watch"), ["--watch", "--watchTimeout", "600"])
+        downloader = threading.Thread(target=download, args=(plans, watch_dir, args.download_mbps, args.stall))
+        downloader.start()
+        output = wait(parser)
+        downloader.join()
+        watch_seconds = time.perf_counter() - start
+
+        identical = filecmp.cmp(os.path.join(workspace, "out-sequential", "plan.html"),
+                                os.path.join(workspace, "out-watch", "plan.html"), shallow=False)
+        reparsed = output.count("Processing ") - len(plans)
+
+    report(
+        f"tfplan-parser --watch benchmark ({len(plans)} plan files, {plan_bytes / 1e6:.1f} MB "
+        f"at {args.download_mbps:g} MB/s)",
+        [
+            ("download", f"{download_seconds:.2f} s"),
+            ("parse", f"{parse_seconds:.2f} s"),
+            ("download then parse", f"{sequential_seconds:.2f} s"),
+            ("--watch during download", f"{watch_seconds:.2f} s  (files re-parsed: {reparsed})"),
+            ("max(download, parse)", f"{max(download_seconds, parse_seconds):.2f} s"),
+        ],
+    )
+    if not identical:
+        print("FAIL: --watch report differs from the report parsed after the download")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""HTTP requests under a per-host request budget shared by the pipeline scripts.
+
+Every request first takes a token from its host's bucket. The buckets live in
+small JSON state files under $HTTP_BUDGET_DIR and are updated under an
+exclusive lock, so all scripts on an agent host (and all agents sharing it)
+draw from the same budget instead of being throttled as a group.
+
+The bucket is kept as a "theoretical arrival time" (the generic cell rate
+algorithm): a request may be sent once ``tat - burst interval`` is reached,
+and every request moves ``tat`` on by one interval. Rate-limit headers sent by
+the server narrow the budget further:
+
+- ``Retry-After`` (with 429 or 503) blocks the host until it has passed
+- ``X-RateLimit-Remaining`` / ``X-RateLimit-Reset`` (Azure DevOps, GitHub)
+  are counted down by every request sent; once the remaining quota is used
+  up, requests wait for the reset
+
+Limits default to DEFAULT_LIMITS and can be overridden with
+$HTTP_BUDGET_LIMITS, e.g. ``dev.azure.com=2/5,hooks.slack.com=1/1``
+(requests per second / burst).
+
+429 responses are retried for every method, as the server turned the request
+away before handling it. A 503 may come after a POST was accepted (a Slack
+message would then be posted twice), so it is only retried for
+RETRY_503_METHODS.
+
+If the state files cannot be used (the directory belongs to another user, is
+read-only or full), a warning is logged once and requests are sent without
+the budget for the rest of the process.
+"""
+
+import os
+import re
+import json
+import time
+import fcntl
+import logging
+import threading
+import urllib.parse
+
+# requests per second, burst
+DEFAULT_LIMITS = {
+    "dev.azure.com": (5.0, 10),
+    "raw.githubusercontent.com": (10.0, 10),
+    "hooks.slack.com": (1.0, 4),
+}
+FALLBACK_LIMIT = (10.0, 10)
+# (connect, read) seconds, used when the caller does not give a timeout
+DEFAULT_TIMEOUT = (10, 30)
+# Retry-After values larger than this are not waited for
+MAX_RETRY_WAIT = 60
+# A host is never blocked for longer than this, whatever the headers say
+MAX_BLOCK_SECONDS = 300
+RETRY_STATUSES = (429, 503)
+# methods a 503 is retried for: reads, and the Azure DevOps PATCH that sets a
+# build's status, which can be repeated safely
+RETRY_503_METHODS = ("GET", "HEAD", "OPTIONS", "PATCH")
+
+_session = None
+_thread_lock = threading.Lock()
+# set once the state files have failed; requests are then sent unbudgeted
+_state_error = None
+
+logger = logging.getLogger(__name__)
+
+
+def session():
+    """The requests session shared by every request; requests is imported on first use."""
+    global _session
+    if _session is None:
+        import requests
+
+        _session = requests.Session()
+    return _session
+
+
+def budget_dir():
+    import tempfile
+
+    return os.getenv("HTTP_BUDGET_DIR", os.path.join(tempfile.gettempdir(), "cnp-http-budget"))
+
+
+def parse_limits(text):
+    """Parse "host=rate/burst,..." into {host: (rate, burst)}."""
+    limits = {}
+    for entry in filter(None, (e.strip() for e in (text or "").split(","))):
+        host, _, limit = entry.partition("=")
+        rate, _, burst = limit.partition("/")
+        limits[host.strip().lower()] = (float(rate), int(burst or 1))
+    return limits
+
+
+def host_limit(netloc):
+    """(rate, burst) for a host, matched on host:port first, then on the host name."""
+    limits = {**DEFAULT_LIMITS, **parse_limits(os.getenv("HTTP_BUDGET_LIMITS"))}
+    return limits.get(netloc) or limits.get(netloc.rsplit(":", 1)[0]) or FALLBACK_LIMIT
+
+
+def _state_path(netloc):
+    return os.path.join(budget_dir(), re.sub(r"[^A-Za-z0-9.-]", "_", netloc) + ".json")
+
+
+def _update_state(netloc, update, default=None):
+    """
+    Apply update(state, now) to a host's state under the host lock and return
+    its result, or `default` if the state file cannot be used.
+    """
+    global _state_error
+    if _state_error is not None:
+        return default
+    path = _state_path(netloc)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _thread_lock, open(path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or "{}")
+            except ValueError:
+                state = {}
+            now = time.time()
+            result = update(state, now)
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state))
+            f.flush()
+    except OSError as e:
+        _state_error = e
+        logger.warning(f"HTTP request budget disabled, unable to use {path}: {e}")
+        return default
+    return result
+
+
+def reserve(netloc):
+    """Take a request slot for a host; returns the seconds to wait before sending."""
+    rate, burst = host_limit(netloc)
+    interval = 1.0 / rate
+
+    def take(state, now):
+        tat = max(state.get("tat", 0), now)
+        send_at = max(now, tat - (burst - 1) * interval, state.get("blocked_until", 0))
+        if send_at < state.get("server_reset", 0):
+            if state["server_remaining"] > 0:
+                state["server_remaining"] -= 1
+            else:
+                send_at = state["server_reset"]
+        state["tat"] = max(tat, send_at) + interval
+        return send_at - now
+
+    return _update_state(netloc, take, default=0.0)
+
+
+def retry_after_seconds(value, now=None):
+    """Seconds from a Retry-After header (delta-seconds or an HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    import email.utils
+
+    try:
+        when = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(when - (now or time.time()), 0.0)
+
+
+def observe(netloc, response):
+    """Narrow a host's budget from the rate-limit headers of a response."""
+    headers = response.headers
+    retry_after = retry_after_seconds(headers.get("Retry-After")) if response.status_code in RETRY_STATUSES else None
+    remaining = headers.get("X-RateLimit-Remaining")
+    reset = headers.get("X-RateLimit-Reset")
+    if retry_after is None and remaining is None:
+        return
+
+    def narrow(state, now):
+        if retry_after is not None:
+            state["blocked_until"] = max(state.get("blocked_until", 0), now + min(retry_after, MAX_BLOCK_SECONDS))
+        try:
+            left, reset_at = int(float(remaining)), float(reset)
+        except (TypeError, ValueError):
+            return
+        reset_at = min(reset_at, now + MAX_BLOCK_SECONDS)
+        if reset_at <= now:
+            return
+        # responses from an earlier window are ignored; requests already
+        # counted down locally may not have reached the server yet
+        if reset_at > state.get("server_reset", 0):
+            state["server_reset"], state["server_remaining"] = reset_at, left
+        elif reset_at == state["server_reset"]:
+            state["server_remaining"] = min(state["server_remaining"], left)
+
+    _update_state(netloc, narrow)
+
+
+def request(method, url, max_retries=3, **kwargs):
+    """
+    Send a request with requests once the host's budget allows it.
+
+    429 responses (and 503 responses to RETRY_503_METHODS) with a Retry-After
+    of at most MAX_RETRY_WAIT seconds are retried up to max_retries times; the
+    last response is returned either way, so callers handle errors as with
+    requests.request().
+    """
+    netloc = urllib.parse.urlsplit(url).netloc.lower()
+    retry_statuses = RETRY_STATUSES if method.upper() in RETRY_503_METHODS else (429,)
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    for attempt in range(max_retries + 1):
+        wait = reserve(netloc)
+        if wait > 0:
+            time.sleep(wait)
+        response = session().request(method, url, **kwargs)
+        observe(netloc, response)
+        if response.status_code not in retry_statuses or attempt == max_retries:
+            return response
+        retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+        if retry_after is None or retry_after > MAX_RETRY_WAIT:
+            return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
@@ -1,33 +1,196 @@
 import os
 import re
+import sys
+import bz2
+import gzip
 import json
+import io
+import time
+import lzma
+import resource
+import hashlib
+import contextlib
+import collections
 import argparse
-from typing import List, Dict, Any, Set
+from typing import List, Dict, Any, Set, Tuple
 
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 default_template = os.path.join(script_dir, 'plan.html')
+default_index_template = os.path.join(script_dir, 'plan-index.html')
 
 parser = argparse.ArgumentParser(description="Convert Terraform JSON plan(s) to HTML table rows (local only, no AI)")
 parser.add_argument("--plansDir", type=str, required=True, help="Directory containing terraform plan JSON files (terraform show -json or concatenated resource change objects)")
 parser.add_argument("--outputDir", type=str, required=True, help="Directory to write generated plan.html")
 parser.add_argument("--templateFile", type=str, default=default_template, help=f"Path to HTML template (default: {default_template})")
+parser.add_argument("--noopDetails", action="store_true", help="Also diff before/after of no-op and read-only resource changes (skipped by default as they carry no changes)")
+parser.add_argument("--listDiff", choices=("keyed", "index"), default="keyed", help="Align list elements by identity attributes (name, id, priority; not ones marked sensitive) or content before diffing (keyed, default), or compare them by position (index)")
+parser.add_argument("--diffCacheSize", type=int, default=0, help="Entries in LRU caches of attribute diffs and sensitive paths shared by identical changes, e.g. 4096 for plans of many for_each instances (default: 0, off; hashing costs more than it saves on plans without fan-out)")
+parser.add_argument("--ignoreRules", type=str, default=None, help="JSON file of computed attribute paths to leave out of the diffs, per resource type, and whether to leave out values known only after apply (e.g. tfplan-ignore-rules.json next to this script)")
+parser.add_argument("--groupEnvironments", action="store_true", help="Render one row per distinct change with the environments it applies to, diffing identical changes once")
+parser.add_argument("--shardReport", action="store_true", help="Write one report per stage/environment under shards/ and a plan.html index page linking to them")
+parser.add_argument("--compressOutput", action="store_true", help="Also write a gzip-compressed copy of each generated HTML file (plan.html.gz)")
+parser.add_argument("--jsonBackend", default="json", help="JSON decoder for plan files: json (streams plans, default), orjson (decodes whole files; faster on single-document plans, more memory), or auto to use orjson when installed")
+parser.add_argument("--watch", action="store_true", help="Summarise plan files as they finish arriving in --plansDir and stop once --watchDoneFile exists, so parsing overlaps the download")
+parser.add_argument("--watchDoneFile", type=str, default=None, help="File created once every plan has been written (default: <plansDir>/.download-complete)")
+parser.add_argument("--watchTimeout", type=float, default=3600, help="Seconds to wait for --watchDoneFile before failing (default: 3600)")
+parser.add_argument("--summaryDb", type=str, default=None, help="Also add the resource change summaries of this run to a SQLite database (query it with tfplan-summary-query.py)")
+parser.add_argument("--repository", type=str, default=os.environ.get("BUILD_REPOSITORY_NAME", ""), help="Repository recorded with --summaryDb rows (default: $BUILD_REPOSITORY_NAME)")
+parser.add_argument("--pullRequest", type=str, default=os.environ.get("SYSTEM_PULLREQUEST_PULLREQUESTNUMBER", ""), help="Pull request recorded with --summaryDb rows (default: $SYSTEM_PULLREQUEST_PULLREQUESTNUMBER)")
+parser.add_argument("--buildId", type=str, default=os.environ.get("BUILD_BUILDID", ""), help="Build recorded with --summaryDb rows (default: $BUILD_BUILDID)")
+parser.add_argument("--profile", action="store_true", help="Write per plan file timings and counters to plan-profile.json next to plan.html")
+parser.add_argument("--deltaReport", action="store_true", help="Write hashed row summaries to plan-summaries.json and, when --previousSummaries exists, plan-delta.html with the rows added, removed or changed since that analysis")
+parser.add_argument("--previousSummaries", type=str, default=None, help="plan-summaries.json of the previous analysis of the pull request (default: <outputDir>/plan-summaries.previous.json)")
+parser.add_argument("--indexTemplateFile", type=str, default=default_index_template, help=f"Path to the --shardReport index template (default: {default_index_template})")
 args = parser.parse_args()
+run_started = time.perf_counter()
+
+class JsonBackend:
+    """A JSON decoder for plan files.
+
+    Only the stdlib decoder can decode a value from the middle of a buffer,
+    which load_json_plan_stream() relies on; other backends decode whole
+    plan files.
+    """
+    __slots__ = ('name', 'loads', 'streaming')
+
+    def __init__(self, name: str, loads, streaming: bool = False):
+        self.name = name
+        self.loads = loads
+        self.streaming = streaming
+
+def stdlib_json_backend() -> JsonBackend:
+    return JsonBackend('json', json.loads, streaming=True)
+
+# orjson turns integers beyond 64 bits into floats: texts with a run of 19
+# digits are left to the stdlib (mapping digits to one byte keeps the check
+# a plain substring search)
+_digits_to_nines = bytes.maketrans(b'0123456789', b'9' * 10)
+_long_number = b'9' * 19
+
+def orjson_backend() -> JsonBackend:
+    import orjson
+
+    def loads(data: str):
+        # Input orjson rejects (NaN) or decodes differently goes to the
+        # stdlib, so results match the stdlib backend either way
+        encoded = data.encode('utf-8')
+        if _long_number in encoded.translate(_digits_to_nines):
+            return json.loads(data)
+        try:
+            return orjson.loads(encoded)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+    return JsonBackend('orjson', loads)
+
+# In order of preference for --jsonBackend auto. Not the default: orjson decodes
+# whole files, which is slower and uses more memory on concatenated jq output
+JSON_BACKENDS = {
+    'orjson': orjson_backend,
+    'json': stdlib_json_backend,
+}
+
+def select_json_backend(name: str) -> JsonBackend:
+    if name not in ('auto', *JSON_BACKENDS):
+        parser.error(f"--jsonBackend must be auto or one of: {', '.join(JSON_BACKENDS)}")
+    for candidate in (JSON_BACKENDS if name == 'auto' else (name,)):
+        try:
+            return JSON_BACKENDS[candidate]()
+        except ImportError as e:
+            if name != 'auto':
+                parser.error(f"--jsonBackend {name} is not available: {e}")
+    return stdlib_json_backend()
+
+json_backend = select_json_backend(args.jsonBackend)
 
 plans_dir = args.plansDir
-plan_files = [os.path.join(plans_dir, f) for f in os.listdir(plans_dir) if os.path.isfile(os.path.join(plans_dir, f))]
+watch_done_file = os.path.abspath(args.watchDoneFile or os.path.join(plans_dir, '.download-complete'))
+
+def list_plan_files(plans_dir: str) -> List[str]:
+    paths = [os.path.join(plans_dir, f) for f in os.listdir(plans_dir)]
+    return [p for p in paths if os.path.isfile(p) and not (args.watch and os.path.abspath(p) == watch_done_file)]
+
+# A file is summarised once its size and mtime have not changed for this long.
+# Guessing early is cheap: a file that changes afterwards is summarised again.
+WATCH_SETTLE_SECONDS = 0.5
+WATCH_POLL_SECONDS = 0.25
+
+def file_signature(p: str):
+    try:
+        st = os.stat(p)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+def watch_plan_files(plans_dir: str, done_file: str, timeout: float):
+    """Yield plan files in plans_dir as they finish being written, until done_file exists.
+
+    Files are yielded once they have stopped changing, then all remaining
+    files once done_file appears. A file that changed after it was yielded
+    is yielded again, so the caller must let a later summary replace an
+    earlier one.
+    """
+    yielded: Dict[str, Any] = {}
+    pending: Dict[str, Tuple[Any, float]] = {}  # path -> (signature, first seen with it)
+    deadline = time.monotonic() + timeout
+    while True:
+        done = os.path.exists(done_file)
+        now = time.monotonic()
+        for p in list_plan_files(plans_dir):
+            signature = file_signature(p)
+            if signature is None or yielded.get(p) == signature:
+                continue
+            if not done:
+                seen, since = pending.get(p, (None, now))
+                if seen != signature:
+                    pending[p] = (signature, now)
+                    continue
+                if now - since < WATCH_SETTLE_SECONDS:
+                    continue
+            pending.pop(p, None)
+            yielded[p] = signature
+            yield p
+        if done:
+            return
+        if now > deadline:
+            raise TimeoutError(f"{done_file} did not appear within {timeout:.0f}s")
+        time.sleep(WATCH_POLL_SECONDS)
+
+# Compressed plans are recognised by their magic bytes, whatever their extension
+PLAN_CODECS = (
+    (b'\x1f\x8b', 'gzip', gzip.open),
+    (b'BZh', 'bz2', bz2.open),
+    (b'\xfd7zXZ\x00', 'xz', lzma.open),
+)
+COMPRESSED_SUFFIX_RE = re.compile(r'\.(gz|bz2|xz|lzma)$')
+
+def plan_codec(p):
+    """Return the (name, opener) of the compression a plan file uses, or (None, open)."""
+    with open(p, 'rb') as fh:
+        magic = fh.read(6)
+    for prefix, name, opener in PLAN_CODECS:
+        if magic.startswith(prefix):
+            return name, opener
+    return None, open
+
+def open_plan_text(p):
+    """Open a plan file as text, decompressing it on the fly if needed."""
+    _, opener = plan_codec(p)
+    if opener is open:
+        return open(p, 'r', encoding='utf-8', errors='replace')
+    return opener(p, 'rt', encoding='utf-8', errors='replace')
 
 def read_file_text(p):
-    with open(p, 'r', encoding='utf-8', errors='replace') as fh:
+    with open_plan_text(p) as fh:
         return fh.read()
 
 
 # Collect rows
-html_rows: List[str] = []
-seen_resources = set()  # (stage, env, resource_name)
+plan_rows: List['PlanRow'] = []
+seen_resources = set()  # (stage, env, address_prefix, address_name)
 
 def derive_stage_and_env(file_name: str):
-    base = re.sub(r'\.json$', '', file_name)
+    base = re.sub(r'\.json$', '', COMPRESSED_SUFFIX_RE.sub('', file_name))
     # Expect patterns like tfplan-<env>-<stage>
     m = re.match(r'^tfplan-([a-z0-9]+?)-(.+)$', base)
     environment = 'unknown'
@@ -54,50 +217,231 @@ def extract_resource_names(tr_html: str):
                 names.append((stage, env, res_name))
     return names
 
-def load_json_plan_variants(raw: str) -> Dict[str, Any]:
+_brace_re = re.compile(r'[{}]')
+
+def split_json_objects(raw: str, loads=json.loads):
+    """Decode the top-level {...} objects of raw found by brace balance.
+
+    Braces inside strings are counted like any other, and candidates that do
+    not decode are skipped. Returns the objects and whether every candidate
+    decoded and closed.
+    """
+    objs = []
+    clean = True
+    depth = 0
+    start = -1
+    for m in _brace_re.finditer(raw):
+        if m.group() == '{':
+            depth += 1
+            if start < 0:
+                start = m.start()
+        else:
+            depth -= 1
+            if depth == 0 and start >= 0:
+                # end object
+                try:
+                    obj = loads(raw[start:m.end()])
+                    if isinstance(obj, dict):
+                        objs.append(obj)
+                except Exception:
+                    clean = False
+                start = -1
+    return objs, clean and start < 0
+
+def split_pretty_json_objects(raw: str, loads=json.loads):
+    """Decode concatenated pretty-printed objects (jq output), or return None.
+
+    Only a top-level object closes with a '}' at the start of a line, so the
+    text is split there; any piece that is not a JSON object means the input
+    is formatted some other way.
+    """
+    objs = []
+    start = 0
+    while True:
+        end = raw.find('\n}', start)
+        if end < 0:
+            break
+        try:
+            obj = loads(raw[start:end + 2])
+        except Exception:
+            return None
+        if not isinstance(obj, dict):
+            return None
+        objs.append(obj)
+        start = end + 2
+    if not objs or raw[start:].strip():
+        return None
+    return objs
+
+def load_json_plan_variants(raw: str, loads=json.loads) -> Dict[str, Any]:
     """Attempt to parse raw JSON which can be:
     1. A full terraform show -json output (has resource_changes array)
     2. Concatenated pretty-printed resource change JSON objects (we'll split by top-level object)
-    Returns dict with key 'resource_changes' (list).
+    Returns dict with key 'resource_changes' (list) and 'decode_path', how it was read.
     """
     raw_strip = raw.strip()
     if not raw_strip:
-        return {"resource_changes": []}
+        return {"resource_changes": [], "decode_path": "empty"}
     # Fast path full plan
     try:
-        doc = json.loads(raw_strip)
+        doc = loads(raw_strip)
         if isinstance(doc, dict) and 'resource_changes' in doc:
-            return {"resource_changes": doc.get('resource_changes') or []}
+            return {"resource_changes": doc.get('resource_changes') or [], "decode_path": "document"}
         # Single resource change object
         if isinstance(doc, dict) and 'address' in doc and 'change' in doc:
-            return {"resource_changes": [doc]}
+            return {"resource_changes": [doc], "decode_path": "object"}
     except Exception:
         pass
+    objs = split_pretty_json_objects(raw, loads)
+    if objs is not None:
+        return {"resource_changes": objs, "decode_path": "concatenated-lines"}
     # Fallback: extract multiple JSON objects by brace balance
-    objs = []
-    buf = []
-    depth = 0
-    in_obj = False
-    for ch in raw:
-        if ch == '{':
-            depth += 1
-            in_obj = True
-        if in_obj:
-            buf.append(ch)
-        if ch == '}':
-            depth -= 1
-            if depth == 0 and in_obj:
-                # end object
-                candidate = ''.join(buf)
-                try:
-                    obj = json.loads(candidate)
-                    if isinstance(obj, dict):
-                        objs.append(obj)
-                except Exception:
-                    pass
-                buf = []
-                in_obj = False
-    return {"resource_changes": objs}
+    objs, clean = split_json_objects(raw, loads)
+    if not clean and loads is not json.loads:
+        # Unbalanced braces inside strings split objects in the wrong place;
+        # decode them in sequence as the stdlib backend would
+        try:
+            return {**load_json_plan_stream(io.StringIO(raw)), "decode_path": "concatenated-sequence"}
+        except PlanStreamError:
+            pass
+    return {"resource_changes": objs, "decode_path": "concatenated-braces"}
+
+PLAN_STREAM_CHUNK = 1 << 20
+# Top-level sections of `terraform show -json` output the report never uses
+SKIPPED_PLAN_SECTIONS = frozenset((
+    'planned_values', 'prior_state', 'configuration', 'resource_drift',
+    'relevant_attributes', 'output_changes', 'checks', 'variables',
+))
+_whitespace_re = re.compile(r'[ \t\n\r]*')
+
+class PlanStreamError(ValueError):
+    """The stream is neither a JSON object nor concatenated JSON objects."""
+
+class JsonStreamReader:
+    """Decode consecutive JSON values from a text stream, one chunk at a time."""
+
+    def __init__(self, stream, chunk_size: int = PLAN_STREAM_CHUNK):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        """Drop consumed text and append at least size more characters."""
+        if self.eof:
+            return False
+        parts = [self.buf[self.pos:]]
+        read = 0
+        while read < size:
+            chunk = self.stream.read(size - read)
+            if not chunk:
+                self.eof = True
+                break
+            parts.append(chunk)
+            read += len(chunk)
+        self.buf = ''.join(parts)
+        self.pos = 0
+        return read > 0
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character ('' at the end) without consuming it."""
+        while True:
+            self.pos = _whitespace_re.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.chunk_size):
+                return ''
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise PlanStreamError(f"Expected {ch!r} in plan stream")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Usually the value continues past the buffer: read as much again
+                if not self._fill(max(self.chunk_size, len(self.buf) - self.pos)):
+                    raise PlanStreamError("Invalid JSON in plan stream")
+                continue
+            # A number ending the buffer may carry on in the next chunk
+            if end == len(self.buf) and isinstance(value, (int, float)) and self._fill(self.chunk_size):
+                continue
+            self.pos = end
+            return value
+
+def load_json_plan_stream(stream) -> Dict[str, Any]:
+    """Incremental equivalent of load_json_plan_variants() for well-formed input.
+
+    Resource changes are decoded one at a time and the sections of a full plan
+    the report does not use are discarded as they are read, so neither the plan
+    text nor the whole decoded document is held in memory. Raises
+    PlanStreamError for anything else; load_json_plan_variants() handles those.
+    """
+    reader = JsonStreamReader(stream)
+    first = reader.peek()
+    if not first:
+        return {"resource_changes": [], "decode_path": "stream-empty"}
+    if first != '{':
+        raise PlanStreamError("Plan stream does not start with a JSON object")
+    reader.expect('{')
+    doc: Dict[str, Any] = {}
+    changes = None
+    if reader.peek() != '}':
+        while True:
+            key = reader.value()
+            if not isinstance(key, str):
+                raise PlanStreamError("Expected an object key in plan stream")
+            reader.expect(':')
+            if key == 'resource_changes' and reader.peek() == '[':
+                reader.expect('[')
+                changes = []
+                if reader.peek() != ']':
+                    changes.append(reader.value())
+                    while reader.peek() == ',':
+                        reader.expect(',')
+                        changes.append(reader.value())
+                reader.expect(']')
+            elif key in SKIPPED_PLAN_SECTIONS:
+                reader.value()
+            else:
+                doc[key] = reader.value()
+            if reader.peek() != ',':
+                break
+            reader.expect(',')
+    reader.expect('}')
+    if changes is not None:
+        doc['resource_changes'] = changes
+    if not reader.peek():
+        if 'resource_changes' in doc:
+            return {"resource_changes": doc['resource_changes'] or [], "decode_path": "stream-document"}
+        return {"resource_changes": [doc], "decode_path": "stream-object"}
+    # Concatenated resource change objects (jq '.resource_changes[]' output)
+    objs = [doc]
+    while reader.peek():
+        if reader.peek() != '{':
+            raise PlanStreamError("Unexpected text between plan objects")
+        objs.append(reader.value())
+    return {"resource_changes": objs, "decode_path": "stream-concatenated"}
+
+def load_plan_file(p) -> Dict[str, Any]:
+    if json_backend.streaming:
+        try:
+            with open_plan_text(p) as fh:
+                return load_json_plan_stream(fh)
+        except PlanStreamError:
+            plan = load_json_plan_variants(read_file_text(p), json_backend.loads)
+            plan['decode_path'] = 'fallback-' + plan['decode_path']
+            return plan
+    return load_json_plan_variants(read_file_text(p), json_backend.loads)
+
+# --profile: work done for the plan file being summarised
+profile_counts: Dict[str, int] = collections.Counter()
 
 def flatten_dict(d: Any, prefix: str = '') -> Dict[str, Any]:
     out = {}
@@ -128,6 +472,49 @@ SENSITIVE_KEYWORDS = (
     'connection_string'
 )
 
+class LruCache:
+    """Dict with at most maxsize entries, dropping the least recently used."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries: 'collections.OrderedDict[Any, Any]' = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any) -> Any:
+        value = self.entries.get(key, _missing)
+        if value is _missing:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        self.entries[key] = value
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / max(self.hits + self.misses, 1)
+
+# Attribute diffs and sensitive paths of changes seen before; None with --diffCacheSize 0
+diff_cache = LruCache(args.diffCacheSize) if args.diffCacheSize > 0 else None
+sensitive_paths_cache = LruCache(args.diffCacheSize) if args.diffCacheSize > 0 else None
+
+def collect_sensitive_paths_cached(change: Dict[str, Any]) -> Set[str]:
+    """collect_sensitive_paths() that reuses the result for sensitivity maps seen before."""
+    if sensitive_paths_cache is None:
+        return collect_sensitive_paths(change)
+    doc = repr((change.get('before_sensitive'), change.get('after_sensitive')))
+    key = hashlib.blake2b(doc.encode('utf-8'), digest_size=16).digest()
+    paths = sensitive_paths_cache.get(key)
+    if paths is None:
+        paths = frozenset(collect_sensitive_paths(change))
+        sensitive_paths_cache.put(key, paths)
+    return paths
+
 def collect_sensitive_paths(change: Dict[str, Any]) -> Set[str]:
     paths: Set[str] = set()
     for field in ('before_sensitive', 'after_sensitive'):
@@ -154,7 +541,12 @@ def mask_value(value: Any) -> str:
         return '<absent>'
     return '*******'
 
-def diff_before_after(before: Any, after: Any, sensitive_paths: Set[str]) -> List[str]:
+def shorten(v: Any) -> str:
+    s = str(v)
+    return (s[:60] + '…') if len(s) > 60 else s
+
+def diff_items_before_after(before: Any, after: Any, sensitive_paths: Set[str]) -> List[Tuple[str, str, str]]:
+    """Changed leaf paths as (path, before, after) with values already masked/shortened."""
     if before is None and after is None:
         return []
     fb = flatten_dict(before) if isinstance(before, (dict, list)) else {"value": before}
@@ -166,111 +558,958 @@ def diff_before_after(before: Any, after: Any, sensitive_paths: Set[str]) -> Lis
         va = fa.get(k, '<absent>')
         if vb == va:
             continue
+        # paths repeat across resources of the same type
+        k = sys.intern(k)
         if is_sensitive_key_path(k, sensitive_paths):
-            changes.append(f"{k}: {mask_value(vb)} -> {mask_value(va)}")
+            changes.append((k, mask_value(vb), mask_value(va)))
             continue
         # Shorten long values
-        def shorten(v):
-            s = str(v)
-            return (s[:60] + '…') if len(s) > 60 else s
-        changes.append(f"{k}: {shorten(vb)} -> {shorten(va)}")
+        changes.append((k, shorten(vb), shorten(va)))
+    if args.profile:
+        profile_counts['diff_lines'] += len(changes)
+        profile_counts['masking_checks'] += len(changes)
+    return changes
+
+# Attributes that identify an element of a list of objects, in order of preference.
+# 'key' is not one: it matches SENSITIVE_KEYWORDS, so its values are masked.
+LIST_IDENTITY_KEYS = ('name', 'id', 'priority')
+_missing = object()
+
+def identity_key_sensitive(key: str, before: List[Any], after: List[Any], path_before: str, path_after: str,
+                           sensitive_paths: Set[str]) -> bool:
+    """Whether the values of identity attribute key would be masked in any element of either list."""
+    for list_path, items in ((path_before, before), (path_after, after)):
+        # keywords and sensitive ancestors mask the key in every element alike
+        if is_sensitive_key_path(f"{list_path}[0].{key}", sensitive_paths):
+            return True
+        lowered = list_path.lower()
+        if any(sp.startswith(lowered + '[') for sp in sensitive_paths):
+            if any(is_sensitive_key_path(f"{list_path}[{i}].{key}", sensitive_paths) for i in range(1, len(items))):
+                return True
+    return False
+
+def list_identity_key(before: List[Any], after: List[Any], path_before: str = '', path_after: str = '',
+                      sensitive_paths: Set[str] = frozenset()):
+    """The first identity attribute every element of both lists has a unique scalar value for, or None.
+
+    Attributes whose values would be masked are skipped, as the value of the
+    identity attribute is shown in the diff path.
+    """
+    for key in LIST_IDENTITY_KEYS:
+        if identity_key_sensitive(key, before, after, path_before, path_after, sensitive_paths):
+            continue
+        unique = True
+        for items in (before, after):
+            values = set()
+            for item in items:
+                value = item.get(key) if isinstance(item, dict) else None
+                if value is None or isinstance(value, (dict, list)) or value in values:
+                    unique = False
+                    break
+                values.add(value)
+            if not unique:
+                break
+        if unique:
+            return key
+    return None
+
+_fingerprint_encoder = json.JSONEncoder(sort_keys=True, separators=(',', ':'), default=str)
+
+def element_fingerprint(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return _fingerprint_encoder.encode(value)
+    # scalars compare as themselves, typed so that 1, 1.0 and true stay apart
+    return (type(value), value)
+
+def align_list_elements(before: List[Any], after: List[Any], path: str, path_before: str = '', path_after: str = '',
+                        sensitive_paths: Set[str] = frozenset()):
+    """Yield (display path, before index, after index) for list elements that differ.
+
+    Elements are paired by identity attribute, or else by content so that an
+    insertion only reports the inserted element; an index is None for an
+    element that exists on one side only. path_before/path_after are the
+    positional paths of the lists, for keeping sensitive identity attributes
+    out of the display paths.
+    """
+    key = list_identity_key(before, after, path_before, path_after, sensitive_paths)
+    if key is not None:
+        after_index = {item[key]: i for i, item in enumerate(after)}
+        paired = set()
+        for ib, item in enumerate(before):
+            ia = after_index.get(item[key])
+            if ia is not None:
+                paired.add(ia)
+            if ia is None or item != after[ia]:
+                yield f"{path}[{key}={item[key]}]", ib, ia
+        for ia, item in enumerate(after):
+            if ia not in paired:
+                yield f"{path}[{key}={item[key]}]", None, ia
+        return
+    # Only the elements between the common head and tail need aligning
+    head = 0
+    while head < min(len(before), len(after)) and before[head] == after[head]:
+        head += 1
+    tail = 0
+    while tail < min(len(before), len(after)) - head and before[-1 - tail] == after[-1 - tail]:
+        tail += 1
+    before_end, after_end = len(before) - tail, len(after) - tail
+    if before_end - head <= 1 and after_end - head <= 1:
+        opcodes = [('replace', head, before_end, head, after_end)]
+    else:
+        import difflib
+        matcher = difflib.SequenceMatcher(None, [element_fingerprint(v) for v in before[head:before_end]],
+                                          [element_fingerprint(v) for v in after[head:after_end]], autojunk=False)
+        opcodes = [(tag, i1 + head, i2 + head, j1 + head, j2 + head) for tag, i1, i2, j1, j2 in matcher.get_opcodes()]
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            continue
+        for offset in range(max(i2 - i1, j2 - j1)):
+            ib = i1 + offset if i1 + offset < i2 else None
+            ia = j1 + offset if j1 + offset < j2 else None
+            yield f"{path}[{ib if ia is None else ia}]", ib, ia
+
+def keyed_diff_leaves(before: Any, after: Any, path: str, path_before: str, path_after: str, out: List[Any],
+                      sensitive_paths: Set[str] = frozenset()) -> None:
+    """Append (path, before path, after path, before, after) for each changed leaf.
+
+    Unchanged subtrees are skipped without being flattened. The before/after
+    paths use list positions like flatten_dict(), for matching the plan's
+    sensitive paths.
+    """
+    if before == after:
+        return
+    if isinstance(before, dict) and isinstance(after, dict):
+        for k in before.keys() | after.keys():
+            keyed_diff_leaves(before.get(k, _missing), after.get(k, _missing),
+                              f"{path}.{k}" if path else k,
+                              f"{path_before}.{k}" if path_before else k,
+                              f"{path_after}.{k}" if path_after else k, out, sensitive_paths)
+        return
+    if isinstance(before, list) and isinstance(after, list):
+        for sub_path, ib, ia in align_list_elements(before, after, path, path_before, path_after, sensitive_paths):
+            keyed_diff_leaves(before[ib] if ib is not None else _missing,
+                              after[ia] if ia is not None else _missing,
+                              sub_path, f"{path_before}[{ib}]", f"{path_after}[{ia}]", out, sensitive_paths)
+        return
+    # Leaves, or a subtree on one side only / of another type: compare flattened
+    fb = {} if before is _missing else flatten_dict(before, path) if isinstance(before, (dict, list)) else {path: before}
+    fa = {} if after is _missing else flatten_dict(after, path) if isinstance(after, (dict, list)) else {path: after}
+    for k in fb.keys() | fa.keys():
+        vb = fb.get(k, '<absent>')
+        va = fa.get(k, '<absent>')
+        if vb != va:
+            rest = k[len(path):]
+            out.append((k, path_before + rest, path_after + rest, vb, va))
+
+def keyed_diff_items_before_after(before: Any, after: Any, sensitive_paths: Set[str]) -> List[Tuple[str, str, str]]:
+    """diff_items_before_after() with list elements aligned by identity or content rather than position."""
+    if not (isinstance(before, (dict, list)) and isinstance(after, (dict, list))):
+        return diff_items_before_after(before, after, sensitive_paths)
+    leaves: List[Any] = []
+    keyed_diff_leaves(before, after, '', '', '', leaves, sensitive_paths)
+    changes = []
+    checks = 0
+    for k, path_before, path_after, vb, va in sorted(leaves, key=lambda leaf: leaf[0]):
+        k = sys.intern(k)
+        sensitive = False
+        for path in (k, path_before, path_after):
+            checks += 1
+            if is_sensitive_key_path(path, sensitive_paths):
+                sensitive = True
+                break
+        if sensitive:
+            changes.append((k, mask_value(vb), mask_value(va)))
+            continue
+        changes.append((k, shorten(vb), shorten(va)))
+    if args.profile:
+        profile_counts['diff_lines'] += len(changes)
+        profile_counts['masking_checks'] += checks
+    return changes
+
+def attribute_sensitive_paths(key: str, sensitive_paths: Set[str]) -> Tuple[str, ...]:
+    """The sensitive paths that can mask a path under the top-level attribute key."""
+    k = key.lower()
+    return tuple(sorted(sp for sp in sensitive_paths
+                        if sp == k or sp.startswith((k + '.', k + '[')) or k.startswith((sp + '.', sp + '['))))
+
+# An attribute of a resource type is diffed without the cache once this many
+# lookups of it hit less often than DIFF_CACHE_MIN_HIT_RATE, e.g. names and ids
+DIFF_CACHE_PROBE_LOOKUPS = 64
+DIFF_CACHE_MIN_HIT_RATE = 0.25
+# (resource type, attribute) -> [lookups, hits]
+diff_cache_attribute_stats: Dict[Tuple[str, str], List[int]] = {}
+
+def memoised_diff_items(before: Any, after: Any, sensitive_paths: Set[str], diff_items,
+                        resource_type: str = '') -> List[Tuple[str, str, str]]:
+    """
+    diff_items(before, after, sensitive_paths), computed per changed top-level
+    attribute and reused for attributes that changed the same way before.
+
+    Resources fanned out with count/for_each differ in a name or index but
+    mostly change their other attributes identically. The cache key hashes
+    the diff function, the attribute name, both subtrees and the sensitive
+    paths under it, which is everything its diff lines and masking depend on.
+    Decoded JSON values have an unambiguous repr(), much cheaper than
+    encoding them; equal dicts in another key order only miss the cache.
+    Attributes that rarely repeat are diffed together, uncached. The lines of
+    each attribute start with its name, so sorting the concatenation by path
+    gives the order of an unsplit diff.
+    """
+    if diff_cache is None:
+        return diff_items(before, after, sensitive_paths)
+    changes: List[Tuple[str, str, str]] = []
+    # A missing side diffs as a top-level "value" leaf, kept apart from the attributes
+    if before is None and isinstance(after, dict) and 'value' not in after:
+        changes, before = diff_items(None, {}, sensitive_paths), {}
+    elif after is None and isinstance(before, dict) and 'value' not in before:
+        changes, after = diff_items({}, None, sensitive_paths), {}
+    elif not (isinstance(before, dict) and isinstance(after, dict)):
+        return diff_items(before, after, sensitive_paths)
+    uncached_before: Dict[str, Any] = {}
+    uncached_after: Dict[str, Any] = {}
+    for key in before.keys() | after.keys():
+        vb = before.get(key, _missing)
+        va = after.get(key, _missing)
+        if vb == va:
+            continue
+        stats = diff_cache_attribute_stats.setdefault((resource_type, key), [0, 0])
+        if stats[0] >= DIFF_CACHE_PROBE_LOOKUPS and stats[1] < stats[0] * DIFF_CACHE_MIN_HIT_RATE:
+            if vb is not _missing:
+                uncached_before[key] = vb
+            if va is not _missing:
+                uncached_after[key] = va
+            continue
+        relevant = attribute_sensitive_paths(key, sensitive_paths)
+        doc = repr((diff_items.__name__, key, vb is _missing, vb if vb is not _missing else None,
+                    va is _missing, va if va is not _missing else None, relevant))
+        cache_key = hashlib.blake2b(doc.encode('utf-8'), digest_size=16).digest()
+        items = diff_cache.get(cache_key)
+        stats[0] += 1
+        if args.profile:
+            profile_counts['diff_cache_lookups'] += 1
+        if items is None:
+            items = diff_items({} if vb is _missing else {key: vb}, {} if va is _missing else {key: va}, set(relevant))
+            diff_cache.put(cache_key, items)
+        else:
+            stats[1] += 1
+            if args.profile:
+                profile_counts['diff_cache_hits'] += 1
+                profile_counts['diff_lines'] += len(items)
+        changes.extend(items)
+    if uncached_before or uncached_after:
+        changes.extend(diff_items(uncached_before, uncached_after, sensitive_paths))
+    changes.sort(key=lambda item: item[0])
     return changes
 
-def summarize_resource_change(rc: Dict[str, Any]) -> Dict[str, Any]:
+def glob_regex(pattern: str) -> str:
+    """Regex for a glob where * matches any run of characters (dots included) and the rest, [*] too, is literal."""
+    return re.escape('[*]').join('.*'.join(re.escape(part) for part in piece.split('*'))
+                                  for piece in pattern.split('[*]'))
+
+class IgnoreRules:
+    """Attribute paths left out of diffs, loaded from an --ignoreRules file.
+
+    {"ignoreUnknown": true, "resourceTypes": {"<type glob>": ["<path glob>", ...]}}
+
+    Paths are written like diff lines with list elements as [*], e.g.
+    site_config[*].ip_restriction[*].priority. The patterns of every type
+    glob matching a resource type are compiled once, the first time that type
+    is seen, into a regex of the paths and a regex of the paths a match can
+    lie under; other subtrees are not walked. With ignoreUnknown, values the plan marks as known only after
+    apply (after_unknown) are left out as well.
+    """
+
+    def __init__(self, patterns_by_type: Dict[str, List[str]], ignore_unknown: bool = False):
+        self.patterns_by_type = [(re.compile(glob_regex(type_glob) + r'\Z'), list(patterns))
+                                 for type_glob, patterns in patterns_by_type.items()]
+        self.ignore_unknown = ignore_unknown
+        self.matchers: Dict[str, Any] = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'IgnoreRules':
+        with open(path, encoding='utf-8') as f:
+            rules = json.load(f)
+        return cls(rules.get('resourceTypes') or {}, bool(rules.get('ignoreUnknown')))
+
+    @staticmethod
+    def prefixes(pattern: str) -> Set[str]:
+        """Globs of the paths a match of pattern can lie under."""
+        # [*] is a list element, not a wildcard
+        wildcard = pattern.replace('[*]', '[\0]').find('*')
+        literal = pattern if wildcard < 0 else pattern[:wildcard]
+        prefixes = {literal[:i] for i, ch in enumerate(literal) if ch in '.[' and i}
+        if wildcard >= 0:
+            # the wildcard can stand for any deeper path
+            prefixes.add(literal + '*')
+        return prefixes
+
+    def matcher(self, resource_type: str) -> 'IgnoreMatcher':
+        matcher = self.matchers.get(resource_type)
+        if matcher is None:
+            patterns = sorted({p for type_re, type_patterns in self.patterns_by_type
+                               if type_re.match(resource_type) for p in type_patterns})
+            prefixes = sorted(set().union(*(self.prefixes(p) for p in patterns)))
+            matcher = self.matchers[resource_type] = IgnoreMatcher(patterns, prefixes)
+        return matcher
+
+# IgnoreMatcher.verdict(): keep a path, walk the subtree under it, or leave it out
+PATH_KEEP, PATH_WALK, PATH_IGNORE = 0, 1, 2
+
+class IgnoreMatcher:
+    """The compiled ignore rules of one resource type.
+
+    Paths repeat across the resources of a type, so the verdict on each path
+    is kept rather than matched again.
+    """
+    __slots__ = ('paths', 'walk', 'verdicts')
+
+    def __init__(self, patterns: List[str], prefixes: List[str]):
+        self.paths = re.compile('(?:' + '|'.join(glob_regex(p) for p in patterns) + r')\Z') if patterns else None
+        self.walk = re.compile('(?:' + '|'.join(glob_regex(p) for p in prefixes) + r')\Z') if prefixes else None
+        self.verdicts: Dict[str, int] = {}
+
+    def verdict(self, path: str) -> int:
+        verdict = self.verdicts.get(path)
+        if verdict is None:
+            if self.paths is not None and self.paths.match(path):
+                verdict = PATH_IGNORE
+            elif self.walk is not None and self.walk.match(path):
+                verdict = PATH_WALK
+            else:
+                verdict = PATH_KEEP
+            self.verdicts[path] = verdict
+        return verdict
+
+ignore_rules = IgnoreRules.load(args.ignoreRules) if args.ignoreRules else None
+# paths left out by --ignoreRules in this run
+pruned_paths_total = 0
+
+def prune_ignored(value: Any, unknown: Any, path: str, matcher: IgnoreMatcher, pruned: Set[str]) -> Any:
+    """value, found at path, without the subtrees matcher ignores or unknown marks True.
+
+    Adds the paths left out to pruned. Containers are only walked along the
+    paths the rules or unknown reach, and only copied when something under
+    them was left out.
+    """
+    if isinstance(value, dict):
+        children = value.items()
+    elif isinstance(value, list):
+        children = enumerate(value)
+    else:
+        return value
+    is_dict = isinstance(value, dict)
+    out = None
+    for k, v in children:
+        if is_dict:
+            sub_path = f"{path}.{k}" if path else k
+            sub_unknown = unknown.get(k) if isinstance(unknown, dict) else None
+        else:
+            sub_path = f"{path}[*]"
+            sub_unknown = unknown[k] if isinstance(unknown, list) and k < len(unknown) else None
+        verdict = PATH_IGNORE if sub_unknown is True else matcher.verdict(sub_path)
+        if verdict == PATH_IGNORE:
+            pruned.add(sub_path if is_dict else f"{path}[{k}]")
+            pruned_v = _missing
+        elif isinstance(v, (dict, list)) and (verdict == PATH_WALK or (isinstance(sub_unknown, (dict, list)) and sub_unknown)):
+            pruned_v = prune_ignored(v, sub_unknown, sub_path, matcher, pruned)
+            if pruned_v is v:
+                continue
+        else:
+            continue
+        if out is None:
+            out = dict(value) if is_dict else list(value)
+        # list elements are dropped at the end so that indexes stay valid
+        out[k] = pruned_v
+    if out is None:
+        return value
+    if is_dict:
+        return {k: v for k, v in out.items() if v is not _missing}
+    return [v for v in out if v is not _missing]
+
+def prune_change(before: Any, after: Any, after_unknown: Any, resource_type: str) -> Tuple[Any, Any]:
+    """before and after without the attribute paths --ignoreRules leaves out of the diff.
+
+    A value known only after apply is left out on both sides, so it shows
+    neither as removed nor as its placeholder. Top-level attributes that did
+    not change are not walked: they have no diff lines to save.
+    """
+    global pruned_paths_total
+    if not (isinstance(before, dict) or isinstance(after, dict)):
+        return before, after
+    matcher = ignore_rules.matcher(resource_type)
+    unknown = after_unknown if ignore_rules.ignore_unknown and isinstance(after_unknown, dict) and after_unknown else None
+    if matcher.paths is None and unknown is None:
+        return before, after
+    old_before = before if isinstance(before, dict) else {}
+    old_after = after if isinstance(after, dict) else {}
+    new_before, new_after = old_before, old_after
+    pruned: Set[str] = set()
+    verdicts = matcher.verdicts
+    for key in old_before.keys() | old_after.keys():
+        key_unknown = unknown.get(key) if unknown is not None else None
+        if key_unknown is True:
+            verdict = PATH_IGNORE
+        else:
+            verdict = verdicts.get(key)
+            if verdict is None:
+                verdict = matcher.verdict(key)
+            if verdict == PATH_KEEP and not (isinstance(key_unknown, (dict, list)) and key_unknown):
+                continue
+        vb = old_before.get(key, _missing)
+        va = old_after.get(key, _missing)
+        if vb == va:
+            continue
+        if verdict == PATH_IGNORE:
+            pruned.add(key)
+            vb = va = _missing
+        else:
+            vb = prune_ignored(vb, key_unknown, key, matcher, pruned)
+            va = prune_ignored(va, key_unknown, key, matcher, pruned)
+        if vb is not old_before.get(key, _missing):
+            if new_before is old_before:
+                new_before = dict(old_before)
+            new_before.pop(key) if vb is _missing else new_before.__setitem__(key, vb)
+        if va is not old_after.get(key, _missing):
+            if new_after is old_after:
+                new_after = dict(old_after)
+            new_after.pop(key) if va is _missing else new_after.__setitem__(key, va)
+    if not pruned:
+        return before, after
+    pruned_paths_total += len(pruned)
+    if args.profile:
+        profile_counts['pruned_paths'] += len(pruned)
+    # a missing side (create/delete) stays None
+    return (new_before if isinstance(before, dict) else before), (new_after if isinstance(after, dict) else after)
+
+def format_diff_item(path: str, before: str, after: str) -> str:
+    return f"{path}: {before} -> {after}"
+
+def diff_before_after(before: Any, after: Any, sensitive_paths: Set[str]) -> List[str]:
+    return [format_diff_item(*item) for item in diff_items_before_after(before, after, sensitive_paths)]
+
+# Actions whose before/after are not diffed unless --noopDetails is given
+NO_DIFF_CHANGE_TYPES = ('no changes', 'read')
+
+def classify_change(actions: List[str]) -> str:
+    """Decide the change type from the plan actions alone."""
+    if actions == ['create']:
+        return 'create'
+    if actions == ['delete']:
+        return 'delete'
+    if actions == ['no-op']:
+        return 'no changes'
+    if actions == ['read']:
+        return 'read'
+    # update, delete+create / create+delete replacements and anything else
+    return 'update'
+
+_interned_actions: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+def intern_actions(actions: List[str]) -> Tuple[str, ...]:
+    key = tuple(actions)
+    return _interned_actions.setdefault(key, key)
+
+def split_address(addr: str, module_address: str) -> Tuple[str, str]:
+    """Split an address into its (interned) module prefix and the resource part."""
+    if not addr:
+        return '', ''
+    if module_address and addr.startswith(module_address + '.'):
+        cut = len(module_address) + 1
+        return sys.intern(addr[:cut]), addr[cut:]
+    return '', addr
+
+class ResourceSummary:
+    """Summary of one resource change.
+
+    Kept compact as a PR can aggregate 100k+ of these: module prefixes,
+    actions and diff paths are shared between records, and diff lines are
+    only formatted when read.
+    """
+    __slots__ = ('address_prefix', 'address_name', 'actions', 'change_type', 'tags_only', 'diff_items')
+
+    def __init__(self, address_prefix: str, address_name: str, actions: Tuple[str, ...], change_type: str,
+                 tags_only: bool, diff_items: Tuple[Tuple[str, str, str], ...]):
+        self.address_prefix = address_prefix
+        self.address_name = address_name
+        self.actions = actions
+        self.change_type = change_type
+        self.tags_only = tags_only
+        self.diff_items = diff_items
+
+    @property
+    def address(self) -> str:
+        return self.address_prefix + self.address_name
+
+    @property
+    def diffs(self) -> List[str]:
+        return [format_diff_item(*item) for item in self.diff_items]
+
+class PlanRow:
+    """One report row: a resource summary for a stage/environment."""
+    __slots__ = ('stage', 'env', 'location', 'summary')
+
+    def __init__(self, stage: str, env: str, location: str, summary: ResourceSummary):
+        self.stage = sys.intern(stage)
+        self.env = sys.intern(env)
+        self.location = sys.intern(location)
+        self.summary = summary
+
+def change_fingerprint(rc: Dict[str, Any]) -> bytes:
+    """Hash of everything a summary is computed from (address and change)."""
+    doc = json.dumps([rc.get('address') or rc.get('name'), rc.get('module_address'), rc.get('change')],
+                     sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(doc.encode('utf-8'), digest_size=16).digest()
+
+def summarize_resource_change_cached(rc: Dict[str, Any], cache: Dict[bytes, ResourceSummary],
+                                     noop_details: bool = False, list_diff: str = 'keyed') -> ResourceSummary:
+    """summarize_resource_change() that reuses the summary of an identical change seen before."""
+    actions = (rc.get('change') or {}).get('actions') or []
+    if classify_change(actions) in NO_DIFF_CHANGE_TYPES and not noop_details:
+        # nothing to diff, hashing would cost more than summarising
+        return summarize_resource_change(rc, noop_details, list_diff)
+    key = change_fingerprint(rc)
+    summary = cache.get(key)
+    if summary is None:
+        summary = cache[key] = summarize_resource_change(rc, noop_details, list_diff)
+    return summary
+
+def summary_group_key(stage: str, summary: ResourceSummary) -> Tuple[Any, ...]:
+    """Rows in the same stage with the same address and normalised diff are one change."""
+    return (stage, summary.address_prefix, summary.address_name, summary.change_type,
+            summary.tags_only, summary.diff_items)
+
+def summarize_resource_change(rc: Dict[str, Any], noop_details: bool = False,
+                              list_diff: str = 'keyed') -> ResourceSummary:
     addr = rc.get('address') or rc.get('name')
     change = rc.get('change') or {}
     actions = change.get('actions') or []
-    before = change.get('before')
-    after = change.get('after')
-    sensitive_paths = collect_sensitive_paths(change)
-    diffs = diff_before_after(before, after, sensitive_paths)
-    # Determine tags-only: all diffs start with 'tags' key path
-    tags_only = bool(diffs) and all(d.startswith('tags') or '.tags.' in d for d in diffs)
-    # Determine change type
-    change_type = 'update'
-    if actions == ['create']:
-        change_type = 'create'
-    elif actions == ['delete']:
-        change_type = 'delete'
-    elif actions == ['update']:
-        change_type = 'update'
-    elif actions == ['delete', 'create'] or actions == ['create', 'delete']:
-        change_type = 'update'
-    elif actions == ['no-op']:
-        change_type = 'no changes'
-    summary_lines = diffs[:25]  # cap to avoid huge prompts
-    return {
-        'address': addr,
-        'actions': actions,
-        'change_type': change_type,
-        'diffs': summary_lines,
-        'tags_only': tags_only
-    }
-
-def build_json_summary_text(summaries: List[Dict[str, Any]]) -> str:
+    change_type = classify_change(actions)
+    if change_type in NO_DIFF_CHANGE_TYPES and not noop_details:
+        diff_items = []
+    else:
+        before = change.get('before')
+        after = change.get('after')
+        sensitive_paths = collect_sensitive_paths_cached(change)
+        if ignore_rules is not None:
+            before, after = prune_change(before, after, change.get('after_unknown'), rc.get('type') or '')
+        if list_diff == 'keyed':
+            diff_items = memoised_diff_items(before, after, sensitive_paths, keyed_diff_items_before_after,
+                                             rc.get('type') or '')
+        else:
+            diff_items = memoised_diff_items(before, after, sensitive_paths, diff_items_before_after,
+                                             rc.get('type') or '')
+    # Determine tags-only: all diffs are under a 'tags' key path
+    tags_only = bool(diff_items) and all(path.startswith('tags') or '.tags.' in path for path, _, _ in diff_items)
+    address_prefix, address_name = split_address(addr, rc.get('module_address'))
+    return ResourceSummary(
+        address_prefix,
+        address_name,
+        intern_actions(actions),
+        change_type,
+        tags_only,
+        tuple(diff_items[:25]),  # cap to avoid huge prompts
+    )
+
+def build_json_summary_text(summaries: List[ResourceSummary]) -> str:
     parts = []
     for s in summaries:
-        parts.append(f"ADDRESS: {s['address']}\nCHANGE: {s['change_type']} TAGS_ONLY: {str(s['tags_only']).lower()}\nDIFFS:\n" + ("\n".join(s['diffs']) if s['diffs'] else "<no scalar diff details>"))
+        parts.append(f"ADDRESS: {s.address}\nCHANGE: {s.change_type} TAGS_ONLY: {str(s.tags_only).lower()}\nDIFFS:\n" + ("\n".join(s.diffs) if s.diff_items else "<no scalar diff details>"))
         parts.append("---")
     return '\n'.join(parts)
 
 ## Resource name now uses full address unchanged.
 
-def make_row_from_summary(stage: str, env: str, location: str, summary: Dict[str, Any]) -> str:
-    res_name = summary.get('address', '') or ''
-    tags_only = 'Yes' if (summary['tags_only'] and summary['change_type'] == 'update') else 'No'
+def make_row_from_summary(stage: str, env: str, location: str, summary: ResourceSummary, delta: str = '') -> str:
+    res_name = summary.address
+    change = f"{summary.change_type} ({delta})" if delta else summary.change_type
+    tags_only = 'Yes' if (summary.tags_only and summary.change_type == 'update') else 'No'
     # Combine up to first 3 diff lines for richer context
-    if summary['tags_only'] and summary['change_type'] == 'update':
+    if summary.tags_only and summary.change_type == 'update':
         details = 'tags updated'
-    elif summary['diffs']:
-        details = '; '.join(summary['diffs'][:3])
+    elif summary.diff_items:
+        details = '; '.join(format_diff_item(*item) for item in summary.diff_items[:3])
     else:
-        details = summary['change_type']
+        details = summary.change_type
     details = details.replace('<', '&lt;').replace('>', '&gt;')
-    return f"<tr><td>{stage}</td><td>{env}</td><td>{location}</td><td>{res_name}</td><td>{summary['change_type']}</td><td>{tags_only}</td><td>{details}</td></tr>"
+    return f"<tr><td>{stage}</td><td>{env}</td><td>{location}</td><td>{res_name}</td><td>{change}</td><td>{tags_only}</td><td>{details}</td></tr>"
 
-for pf in plan_files:
+# --groupEnvironments: summaries by change fingerprint, and the environments
+# of each distinct change keyed by summary_group_key()
+summary_cache: Dict[bytes, ResourceSummary] = {}
+grouped_rows: Dict[Tuple[Any, ...], Tuple[ResourceSummary, List[str]]] = {}
+
+print(f"Decoding plans with the {json_backend.name} JSON backend")
+
+# --profile: timings and counters of each plan file, the latest if summarised again
+file_profiles: Dict[str, Dict[str, Any]] = {}
+
+def peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def summarize_plan_file(pf: str):
+    """Return the interned stage and environment of a plan file and its resource summaries."""
     file_name = os.path.basename(pf)
-    raw = read_file_text(pf)
     stage_name, environment = derive_stage_and_env(file_name)
-    plan_obj = load_json_plan_variants(raw)
+    profile_counts.clear()
+    started = time.perf_counter()
+    plan_obj = load_plan_file(pf)
+    decoded = time.perf_counter()
     rc_list = plan_obj.get('resource_changes', []) or []
-    summaries = [summarize_resource_change(rc) for rc in rc_list]
+    if args.groupEnvironments:
+        summaries = [summarize_resource_change_cached(rc, summary_cache, args.noopDetails, args.listDiff) for rc in rc_list]
+    else:
+        summaries = [summarize_resource_change(rc, args.noopDetails, args.listDiff) for rc in rc_list]
     print(f"Processing {file_name}: {len(rc_list)} resource change(s)")
+    if args.profile:
+        file_profiles[pf] = {
+            'file': file_name,
+            'bytes': os.path.getsize(pf),
+            'codec': plan_codec(pf)[0],
+            'decode_path': plan_obj.get('decode_path'),
+            'decode_seconds': round(decoded - started, 4),
+            'summarise_seconds': round(time.perf_counter() - decoded, 4),
+            'resource_changes': len(rc_list),
+            'diff_lines': profile_counts['diff_lines'],
+            'masking_checks': profile_counts['masking_checks'],
+            'diff_cache_lookups': profile_counts['diff_cache_lookups'],
+            'diff_cache_hits': profile_counts['diff_cache_hits'],
+            'pruned_paths': profile_counts['pruned_paths'],
+            'rows': 0,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+    return sys.intern(stage_name), sys.intern(environment), summaries
+
+# Summaries per plan file. Rows are only built once every file is in, in
+# directory order, so --watch produces the same report as a run afterwards.
+file_summaries: Dict[str, Tuple[str, str, List[ResourceSummary]]] = {}
+if args.watch:
+    print(f"Watching {plans_dir} for plan files until {watch_done_file} exists")
+    for pf in watch_plan_files(plans_dir, watch_done_file, args.watchTimeout):
+        try:
+            file_summaries[pf] = summarize_plan_file(pf)
+        except FileNotFoundError:
+            # renamed or removed by the download since it was listed
+            file_summaries.pop(pf, None)
+    plan_files = [pf for pf in list_plan_files(plans_dir) if pf in file_summaries]
+else:
+    plan_files = list_plan_files(plans_dir)
+    for pf in plan_files:
+        file_summaries[pf] = summarize_plan_file(pf)
+
+# (stage, env, summary) of each change for --summaryDb
+db_records: List[Tuple[str, str, ResourceSummary]] = []
+
+for pf in plan_files:
+    stage_name, environment, summaries = file_summaries.pop(pf)
     for s in summaries:
-        rn = s.get('address', '') or ''
-        key = (stage_name, environment, rn)
+        key = (stage_name, environment, s.address_prefix, s.address_name)
         if key in seen_resources:
             continue
         seen_resources.add(key)
-        html_rows.append(make_row_from_summary(stage_name, environment, 'uksouth', s))
+        if args.summaryDb and s.change_type not in NO_DIFF_CHANGE_TYPES:
+            db_records.append((stage_name, environment, s))
+        if args.profile:
+            file_profiles[pf]['rows'] += 1
+        if args.groupEnvironments:
+            grouped_rows.setdefault(summary_group_key(stage_name, s), (s, []))[1].append(environment)
+        else:
+            plan_rows.append(PlanRow(stage_name, environment, 'uksouth', s))
+
+for group_key, (s, environments) in grouped_rows.items():
+    plan_rows.append(PlanRow(group_key[0], ', '.join(sorted(environments)), 'uksouth', s))
+if diff_cache is not None and diff_cache.hits + diff_cache.misses:
+    print(f"Reused {diff_cache.hits} of {diff_cache.hits + diff_cache.misses} changed attribute diff(s) "
+          f"({diff_cache.hit_rate:.0%}), {sensitive_paths_cache.hits} sensitive path set(s)")
+if ignore_rules is not None:
+    print(f"Left {pruned_paths_total} computed or unknown attribute path(s) out of the diffs (--ignoreRules)")
+if args.groupEnvironments:
+    print(f"Grouped {len(seen_resources)} resource change(s) across environments into {len(plan_rows)} row(s)")
 
-ai_rows = '\n'.join(html_rows)
-if not ai_rows.strip():
+if not plan_rows:
     print("[WARN] No rows produced from JSON plans.")
 
-# Load template
-template_path = args.templateFile
-if not os.path.isfile(template_path):
-    raise FileNotFoundError(f"Template file not found: {template_path}")
+SHARD_CHANGE_TYPES = ('create', 'update', 'delete', 'read', 'no changes')
+
+def load_template(template_path: str):
+    """Return the template text and the match of its <tbody> contents."""
+    if not os.path.isfile(template_path):
+        raise FileNotFoundError(f"Template file not found: {template_path}")
+    with open(template_path, 'r', encoding='utf-8') as tf:
+        template_html = tf.read()
+    # Locate tbody region
+    tbody_pattern = re.compile(r"(<tbody[^>]*>)([\s\S]*?)(</tbody>)", re.IGNORECASE)
+    m = tbody_pattern.search(template_html)
+    if not m:
+        raise RuntimeError("Could not locate <tbody>...</tbody> section in template")
+    return template_html, m
 
-with open(template_path, 'r', encoding='utf-8') as tf:
-    template_html = tf.read()
+def write_html(output_path: str, template, html_rows) -> None:
+    """Write template with html_rows (an iterable of <tr> strings) as its tbody.
 
-# Locate tbody region
-tbody_pattern = re.compile(r"(<tbody[^>]*>)([\s\S]*?)(</tbody>)", re.IGNORECASE)
-m = tbody_pattern.search(template_html)
-if not m:
-    raise RuntimeError("Could not locate <tbody>...</tbody> section in template")
+    With --compressOutput the same text is written to output_path + '.gz' in
+    the same pass.
+    """
+    template_html, m = template
+    # Rows are rendered while writing rather than joined into one large string
+    with contextlib.ExitStack() as stack:
+        outputs = [stack.enter_context(open(output_path, 'w', encoding='utf-8'))]
+        if args.compressOutput:
+            outputs.append(stack.enter_context(gzip.open(output_path + '.gz', 'wt', encoding='utf-8', compresslevel=6)))
+
+        def write(text: str) -> None:
+            for outf in outputs:
+                outf.write(text)
+
+        write(template_html[:m.start(2)])
+        write('\n      <!-- Generated rows -->\n')
+        for i, html_row in enumerate(html_rows):
+            if i:
+                write('\n')
+            write(html_row)
+        write('\n    ')
+        write(template_html[m.end(2):])
 
-existing_rows = m.group(2)  # not used now, but kept for potential logging/debug
-replacement_rows = '\n      <!-- Generated rows -->\n' + ai_rows + '\n    '
+def render_rows(rows: List[PlanRow]):
+    for row in rows:
+        yield make_row_from_summary(row.stage, row.env, row.location, row.summary)
 
-new_html = template_html[:m.start(2)] + replacement_rows + template_html[m.end(2):]
+def shard_name(stage: str, env: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', f"{stage}-{env}" if env else stage)
 
+def assign_shard_names(keys, existing: Dict[str, Dict[str, Any]]) -> Dict[Tuple[str, str], str]:
+    """
+    File names for (stage, env) shard keys. A key named by an earlier run in
+    the same output directory keeps its name; different keys whose sanitised
+    names collide (stages "a b" and "a_b", or stage "x-y" and stage "x" with
+    env "y") get -2, -3, ... suffixes.
+    """
+    names = {tuple(doc['key']): name for name, doc in existing.items() if 'key' in doc}
+    taken = set(names.values())
+    for key in sorted(keys):
+        if key in names:
+            continue
+        base = name = shard_name(*key)
+        suffix = 1
+        while name in taken:
+            suffix += 1
+            name = f"{base}-{suffix}"
+        names[key] = name
+        taken.add(name)
+    return names
+
+def shard_counts(rows: List[PlanRow]) -> Dict[str, int]:
+    counts = dict.fromkeys(SHARD_CHANGE_TYPES, 0)
+    counts['tags_only'] = 0
+    for row in rows:
+        counts[row.summary.change_type] = counts.get(row.summary.change_type, 0) + 1
+        if row.summary.tags_only and row.summary.change_type == 'update':
+            counts['tags_only'] += 1
+    counts['total'] = len(rows)
+    return counts
+
+def make_index_row(shard: Dict[str, Any]) -> str:
+    counts = shard['counts']
+    cells = ''.join(f'<td class="num">{counts.get(k, 0)}</td>' for k in (*SHARD_CHANGE_TYPES, 'tags_only', 'total'))
+    return (f'<tr><td><a href="shards/{shard["name"]}.html">{shard["name"]}</a></td>'
+            f'<td>{shard["stage"]}</td><td>{shard["env"]}</td>{cells}</tr>')
+
+def write_sharded_report(output_dir: str, rows: List[PlanRow], template, index_template) -> str:
+    """
+    Write shards/<stage>-<env>.html per stage/environment (per stage with
+    --groupEnvironments) next to a <shard>.json of its counts, then rebuild the
+    plan.html index from every shard's counts in output_dir. Shards from
+    earlier runs are kept in output_dir and stay in the index, so plans can be
+    analysed and uploaded as they arrive; clear shards/ to drop them.
+    """
+    shards_dir = os.path.join(output_dir, 'shards')
+    os.makedirs(shards_dir, exist_ok=True)
+    shards: Dict[str, Dict[str, Any]] = {}
+    for f in os.listdir(shards_dir):
+        if f.endswith('.json'):
+            with open(os.path.join(shards_dir, f), 'r', encoding='utf-8') as fh:
+                shards[f[:-len('.json')]] = json.load(fh)
+    by_shard: Dict[Tuple[str, str], List[PlanRow]] = {}
+    for row in rows:
+        shard_env = '' if args.groupEnvironments else row.env
+        by_shard.setdefault((row.stage, shard_env), []).append(row)
+    names = assign_shard_names(by_shard, shards)
+    for (stage, env), shard_rows in by_shard.items():
+        name = names[stage, env]
+        write_html(os.path.join(shards_dir, f'{name}.html'), template, render_rows(shard_rows))
+        envs = env or ', '.join(sorted({e for r in shard_rows for e in r.env.split(', ')}))
+        shards[name] = {'name': name, 'key': [stage, env], 'stage': stage, 'env': envs,
+                        'counts': shard_counts(shard_rows)}
+        with open(os.path.join(shards_dir, f'{name}.json'), 'w', encoding='utf-8') as fh:
+            json.dump(shards[name], fh)
+        print(f"Shard {name}: {len(shard_rows)} row(s)")
+
+    index_path = os.path.join(output_dir, 'plan.html')
+    write_html(index_path, index_template, (make_index_row(shards[name]) for name in sorted(shards)))
+    return index_path
+
+ROW_SUMMARIES_VERSION = 1
+
+def row_digest(summary: ResourceSummary) -> str:
+    """Hash of what a report row shows for a change, to compare rows across runs."""
+    # diff items are tuples of strings, so their repr is stable and much cheaper than JSON
+    doc = repr((summary.change_type, summary.tags_only, summary.diff_items))
+    return hashlib.blake2b(doc.encode('utf-8'), digest_size=8).hexdigest()
+
+def row_summaries(rows: List[PlanRow]) -> Dict[Tuple[str, str, str], List[str]]:
+    """(stage, env, address) -> [location, change type, digest] of each report row."""
+    return {(row.stage, row.env, row.summary.address): [row.location, row.summary.change_type, row_digest(row.summary)]
+            for row in rows}
+
+def write_row_summaries(path: str, summaries: Dict[Tuple[str, str, str], List[str]]) -> None:
+    # json.dumps() encodes in C; json.dump() to a file goes through the pure Python encoder
+    doc = json.dumps({'version': ROW_SUMMARIES_VERSION, 'rows': [[*key, *values] for key, values in summaries.items()]},
+                     separators=(',', ':'))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(doc)
+
+def load_row_summaries(path: str) -> Dict[Tuple[str, str, str], List[str]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        doc = json.load(f)
+    if doc.get('version') != ROW_SUMMARIES_VERSION:
+        raise ValueError(f"Unsupported plan summaries version {doc.get('version')} in {path}")
+    return {(row[0], row[1], row[2]): row[3:] for row in doc['rows']}
+
+def compute_delta(rows: List[PlanRow], current, previous):
+    """
+    Compare this run's rows with the previous run's summaries, one dict lookup
+    per row. Returns the (status, row, previous change type) of rows added or
+    changed, in report order, and the (key, values) of rows removed since.
+    """
+    changed = []
+    for row in rows:
+        key = (row.stage, row.env, row.summary.address)
+        before = previous.get(key)
+        if before is None:
+            changed.append(('added', row, None))
+        elif before[2] != current[key][2]:
+            changed.append(('changed', row, before[1]))
+    removed = [(key, values) for key, values in previous.items() if key not in current]
+    return changed, removed
+
+def render_delta_rows(changed, removed):
+    for status, row, previous_change_type in changed:
+        if previous_change_type is not None and previous_change_type != row.summary.change_type:
+            status = f"{status}, was {previous_change_type}"
+        yield make_row_from_summary(row.stage, row.env, row.location, row.summary, status)
+    for (stage, env, address), (location, change_type, _) in removed:
+        yield (f"<tr><td>{stage}</td><td>{env}</td><td>{location}</td><td>{address}</td>"
+               f"<td>{change_type} (removed)</td><td>No</td><td>no longer in the plan</td></tr>")
+
+SUMMARY_DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    repository TEXT NOT NULL,
+    pull_request TEXT NOT NULL,
+    build_id TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+CREATE TABLE IF NOT EXISTS resource_changes (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    stage TEXT NOT NULL,
+    env TEXT NOT NULL,
+    address TEXT NOT NULL,
+    change_type TEXT NOT NULL,
+    tags_only INTEGER NOT NULL,
+    diffs TEXT NOT NULL
+);
+-- per run and stage totals, so churn queries do not scan resource_changes
+CREATE TABLE IF NOT EXISTS stage_counts (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    stage TEXT NOT NULL,
+    changes INTEGER NOT NULL,
+    tags_only INTEGER NOT NULL,
+    PRIMARY KEY (stage, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS resource_changes_address ON resource_changes(address, run_id);
+CREATE INDEX IF NOT EXISTS resource_changes_run ON resource_changes(run_id);
+CREATE INDEX IF NOT EXISTS runs_pull_request ON runs(repository, pull_request);
+"""
+
+def write_summary_db(db_path: str, repository: str, pull_request: str, build_id: str,
+                     records: List[Tuple[str, str, ResourceSummary]]) -> int:
+    """Add one run and its resource changes to the SQLite summary database in one transaction; returns the run id."""
+    import sqlite3
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA cache_size=-65536')  # 64 MiB for the index updates
+        conn.executescript(SUMMARY_DB_SCHEMA)
+        # Inserting in address order keeps the address index updates local
+        records = sorted(records, key=lambda record: record[2].address)
+        with conn:
+            run_id = conn.execute('INSERT INTO runs (repository, pull_request, build_id) VALUES (?, ?, ?)',
+                                  (repository, pull_request, build_id)).lastrowid
+            conn.executemany(
+                'INSERT INTO resource_changes (run_id, stage, env, address, change_type, tags_only, diffs) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((run_id, stage, env, s.address, s.change_type, int(s.tags_only), '\n'.join(s.diffs))
+                 for stage, env, s in records),
+            )
+            conn.execute(
+                'INSERT INTO stage_counts (run_id, stage, changes, tags_only) '
+                'SELECT run_id, stage, COUNT(*), SUM(tags_only) FROM resource_changes WHERE run_id = ? GROUP BY stage',
+                (run_id,),
+            )
+        return run_id
+    finally:
+        conn.close()
+
+if args.summaryDb:
+    run_id = write_summary_db(args.summaryDb, args.repository, args.pullRequest, args.buildId, db_records)
+    print(f"Recorded {len(db_records)} resource change(s) as run {run_id} in {args.summaryDb}")
+    del db_records
+
+template = load_template(args.templateFile)
 os.makedirs(args.outputDir, exist_ok=True)
-output_path = os.path.join(args.outputDir, 'plan.html')
-with open(output_path, 'w', encoding='utf-8') as outf:
-    outf.write(new_html)
+if args.shardReport:
+    output_path = write_sharded_report(args.outputDir, plan_rows, template, load_template(args.indexTemplateFile))
+    print(f"Generated plan HTML index written to {output_path}")
+else:
+    output_path = os.path.join(args.outputDir, 'plan.html')
+    write_html(output_path, template, render_rows(plan_rows))
+    print(f"Generated plan HTML written to {output_path}")
+
+delta_seconds = None
+if args.deltaReport:
+    delta_started = time.perf_counter()
+    current_summaries = row_summaries(plan_rows)
+    previous_path = args.previousSummaries or os.path.join(args.outputDir, 'plan-summaries.previous.json')
+    if os.path.isfile(previous_path):
+        changed, removed = compute_delta(plan_rows, current_summaries, load_row_summaries(previous_path))
+        delta_path = os.path.join(args.outputDir, 'plan-delta.html')
+        write_html(delta_path, template, render_delta_rows(changed, removed))
+        added = sum(1 for status, _, _ in changed if status == 'added')
+        print(f"Delta since the previous analysis: {added} added, {len(changed) - added} changed, "
+              f"{len(removed)} removed row(s), written to {delta_path}")
+    else:
+        print(f"No previous plan summaries at {previous_path}, no delta report written")
+    write_row_summaries(os.path.join(args.outputDir, 'plan-summaries.json'), current_summaries)
+    delta_seconds = round(time.perf_counter() - delta_started, 4)
 
-print(f"Generated plan HTML written to {output_path}")
+if args.profile:
+    profiles = sorted(file_profiles.values(), key=lambda p: p['decode_seconds'] + p['summarise_seconds'], reverse=True)
+    profile_path = os.path.join(args.outputDir, 'plan-profile.json')
+    with open(profile_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'total_seconds': round(time.perf_counter() - run_started, 4),
+            'json_backend': json_backend.name,
+            'list_diff': args.listDiff,
+            'delta_seconds': delta_seconds,
+            'diff_cache_size': args.diffCacheSize,
+            'diff_cache_hit_rate': round(diff_cache.hit_rate, 4) if diff_cache is not None else None,
+            'pruned_paths': pruned_paths_total if ignore_rules is not None else None,
+            'peak_rss_mb': peak_rss_mb(),
+            'files': profiles,
+        }, f, indent=2)
+    if profiles:
+        slowest = profiles[0]
+        print(f"Slowest plan file: {slowest['file']} (decode {slowest['decode_seconds']:.2f} s, "
+              f"summarise {slowest['summarise_seconds']:.2f} s, {slowest['decode_path']})")
+    print(f"Plan profile written to {profile_path}")
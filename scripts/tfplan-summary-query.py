@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+from typing import Any, Dict, List, Sequence
+
+
+def parse_args(argv: Sequence[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query the plan summary database written by tfplan-parser.py --summaryDb")
+    parser.add_argument("--db", type=str, required=True, help="SQLite database written by tfplan-parser.py --summaryDb")
+    parser.add_argument("--json", action="store_true", help="Print rows as JSON instead of a table")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    address = commands.add_parser("address", help="Pull requests that changed a resource address")
+    address.add_argument("address", help="Resource address, e.g. module.app.azurerm_linux_web_app.this")
+    address.add_argument("--prefix", action="store_true", help="Match every address starting with ADDRESS")
+    address.add_argument("--limit", type=int, default=100, help="Most recent rows to show (default: 100)")
+
+    tags_only = commands.add_parser("tags-only", help="How often each stage's changes are tags-only")
+    tags_only.add_argument("--stage", type=str, default=None, help="Only this stage")
+
+    pull_request = commands.add_parser("pull-request", help="Changes recorded for a pull request")
+    pull_request.add_argument("repository", help="Repository, e.g. hmcts/azure-platform-terraform")
+    pull_request.add_argument("number", help="Pull request number")
+    pull_request.add_argument("--all-runs", action="store_true", help="Every run rather than only the latest")
+    return parser.parse_args(argv)
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    if not os.path.isfile(db_path):
+        raise FileNotFoundError(f"Summary database not found: {db_path}")
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def query_address(conn: sqlite3.Connection, address: str, prefix: bool = False, limit: int = 100) -> List[sqlite3.Row]:
+    # A range rather than LIKE so the address index is used
+    if prefix:
+        where, params = "c.address >= ? AND c.address < ?", (address, address + "\U0010ffff")
+    else:
+        where, params = "c.address = ?", (address,)
+    return conn.execute(
+        f"""SELECT r.repository, r.pull_request, r.build_id, r.created_at, c.stage, c.env, c.address,
+                   c.change_type, c.tags_only
+            FROM resource_changes c JOIN runs r ON r.id = c.run_id
+            WHERE {where}
+            ORDER BY c.run_id DESC LIMIT ?""",
+        (*params, limit),
+    ).fetchall()
+
+
+def query_tags_only(conn: sqlite3.Connection, stage: str = None) -> List[sqlite3.Row]:
+    where, params = ("WHERE stage = ?", (stage,)) if stage else ("", ())
+    return conn.execute(
+        f"""SELECT stage, SUM(tags_only) AS tags_only, SUM(changes) AS changes,
+                   ROUND(100.0 * SUM(tags_only) / SUM(changes), 1) AS tags_only_percent,
+                   COUNT(*) AS runs
+            FROM stage_counts {where}
+            GROUP BY stage ORDER BY tags_only DESC""",
+        params,
+    ).fetchall()
+
+
+def query_pull_request(conn: sqlite3.Connection, repository: str, number: str, all_runs: bool = False) -> List[sqlite3.Row]:
+    runs = conn.execute(
+        "SELECT id FROM runs WHERE repository = ? AND pull_request = ? ORDER BY id DESC",
+        (repository, number),
+    ).fetchall()
+    run_ids = [run["id"] for run in (runs if all_runs else runs[:1])]
+    if not run_ids:
+        return []
+    return conn.execute(
+        f"""SELECT r.build_id, r.created_at, c.stage, c.env, c.address, c.change_type, c.tags_only, c.diffs
+            FROM resource_changes c JOIN runs r ON r.id = c.run_id
+            WHERE c.run_id IN ({', '.join('?' * len(run_ids))})
+            ORDER BY c.run_id DESC, c.stage, c.env, c.address""",
+        run_ids,
+    ).fetchall()
+
+
+def print_rows(rows: List[sqlite3.Row], as_json: bool = False) -> None:
+    records: List[Dict[str, Any]] = [dict(row) for row in rows]
+    if as_json:
+        print(json.dumps(records, indent=2))
+        return
+    if not records:
+        print("No matching rows.")
+        return
+    columns = [c for c in records[0] if c != "diffs"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in records)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns).rstrip())
+    for record in records:
+        print("  ".join(str(record[c]).ljust(widths[c]) for c in columns).rstrip())
+        if record.get("diffs"):
+            for line in record["diffs"].split("\n"):
+                print(f"    {line}")
+
+
+def main(argv: Sequence[str] = None) -> int:
+    args = parse_args(argv)
+    conn = connect(args.db)
+    try:
+        if args.command == "address":
+            rows = query_address(conn, args.address, args.prefix, args.limit)
+        elif args.command == "tags-only":
+            rows = query_tags_only(conn, args.stage)
+        else:
+            rows = query_pull_request(conn, args.repository, args.number, args.all_runs)
+    finally:
+        conn.close()
+    print_rows(rows, args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())